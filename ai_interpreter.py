@@ -4,6 +4,15 @@ Módulo de integración con IA (Google Gemini) para interpretación biológica
 import google.generativeai as genai
 from typing import Dict, Optional
 import json
+import time
+
+from metrics import GEMINI_REQUEST_DURATION, GEMINI_REQUESTS
+from report_format import format_percent
+
+
+def is_rate_limit(error_msg: str) -> bool:
+    """Error de cuota excedida o de límite de peticiones (HTTP 429) de Gemini"""
+    return '429' in error_msg or 'quota' in error_msg.lower() or 'rate' in error_msg.lower()
 
 
 class AIInterpreter:
@@ -37,7 +46,7 @@ class AIInterpreter:
         prompt = self._create_single_genome_prompt(analysis, language)
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate('interpret_genome', prompt)
             interpretation = response.text
             
             # Intentar separar interpretaciones científica y general
@@ -52,7 +61,7 @@ class AIInterpreter:
             error_msg = str(e)
             
             # Detectar error de cuota excedida
-            if '429' in error_msg or 'quota' in error_msg.lower() or 'rate' in error_msg.lower():
+            if is_rate_limit(error_msg):
                 friendly_msg = (
                     "⚠️ **Límite de API Alcanzado**\n\n"
                     "La interpretación con IA no está disponible temporalmente porque se alcanzó el límite gratuito de la API de Gemini.\n\n"
@@ -90,7 +99,7 @@ class AIInterpreter:
                                                 genome2_analysis, language)
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate('interpret_comparison', prompt)
             interpretation = response.text
             
             parts = self._parse_interpretation(interpretation)
@@ -104,7 +113,7 @@ class AIInterpreter:
             error_msg = str(e)
             
             # Detectar error de cuota excedida
-            if '429' in error_msg or 'quota' in error_msg.lower() or 'rate' in error_msg.lower():
+            if is_rate_limit(error_msg):
                 friendly_msg = (
                     "⚠️ **Límite de API Alcanzado**\n\n"
                     "La interpretación con IA no está disponible temporalmente porque se alcanzó el límite gratuito de la API de Gemini.\n\n"
@@ -172,11 +181,27 @@ class AIInterpreter:
             """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate('explain_modification', prompt)
             return response.text
         except Exception as e:
             return f"Error al generar explicación: {str(e)}"
     
+    def _generate(self, operation: str, prompt: str):
+        """Llama a Gemini registrando la latencia y el resultado en las métricas"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.model.generate_content(prompt)
+            outcome = 'ok'
+            return response
+        except Exception as e:
+            if is_rate_limit(str(e)):
+                outcome = 'rate_limited'
+            raise
+        finally:
+            GEMINI_REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation)
+            GEMINI_REQUESTS.inc(operation=operation, outcome=outcome)
+    
     def _create_single_genome_prompt(self, analysis: Dict, language: str) -> str:
         """Crea el prompt para análisis de un solo genoma"""
         if language == 'es':
@@ -187,7 +212,7 @@ class AIInterpreter:
             - ID: {analysis['accession_id']}
             - Organismo: {analysis['basic_info']['scientific_name']}
             - Longitud: {analysis['length']:,} pares de bases
-            - Contenido GC: {analysis['gc_content']}%
+            - Contenido GC: {format_percent(analysis['gc_content'])}
             
             GENES:
             - Total CDS: {analysis['genes_analysis']['total_cds']}
@@ -222,7 +247,7 @@ class AIInterpreter:
             - ID: {analysis['accession_id']}
             - Organism: {analysis['basic_info']['scientific_name']}
             - Length: {analysis['length']:,} base pairs
-            - GC Content: {analysis['gc_content']}%
+            - GC Content: {format_percent(analysis['gc_content'])}
             
             GENES:
             - Total CDS: {analysis['genes_analysis']['total_cds']}
@@ -260,18 +285,18 @@ class AIInterpreter:
             GENOMA 1: {comparison['genome1_id']}
             - Organismo: {genome1['basic_info']['scientific_name']}
             - Longitud: {comparison['comparisons']['length']['genome1']:,} pb
-            - Contenido GC: {comparison['comparisons']['gc_content']['genome1']}%
+            - Contenido GC: {format_percent(comparison['comparisons']['gc_content']['genome1'])}
             - Genes CDS: {comparison['comparisons']['genes']['genome1_cds']}
             
             GENOMA 2: {comparison['genome2_id']}
             - Organismo: {genome2['basic_info']['scientific_name']}
             - Longitud: {comparison['comparisons']['length']['genome2']:,} pb
-            - Contenido GC: {comparison['comparisons']['gc_content']['genome2']}%
+            - Contenido GC: {format_percent(comparison['comparisons']['gc_content']['genome2'])}
             - Genes CDS: {comparison['comparisons']['genes']['genome2_cds']}
             
             DIFERENCIAS:
             - Diferencia en longitud: {comparison['comparisons']['length']['difference']:,} pb ({comparison['comparisons']['length']['percent_diff']}%)
-            - Diferencia en GC: {comparison['comparisons']['gc_content']['difference']}%
+            - Diferencia en GC: {format_percent(comparison['comparisons']['gc_content']['difference'])}
             - Diferencia en genes: {comparison['comparisons']['genes']['difference']}
             - Similitud general: {comparison['similarity']['overall_similarity']}%
             
@@ -292,18 +317,18 @@ class AIInterpreter:
             GENOME 1: {comparison['genome1_id']}
             - Organism: {genome1['basic_info']['scientific_name']}
             - Length: {comparison['comparisons']['length']['genome1']:,} bp
-            - GC Content: {comparison['comparisons']['gc_content']['genome1']}%
+            - GC Content: {format_percent(comparison['comparisons']['gc_content']['genome1'])}
             - CDS Genes: {comparison['comparisons']['genes']['genome1_cds']}
             
             GENOME 2: {comparison['genome2_id']}
             - Organism: {genome2['basic_info']['scientific_name']}
             - Length: {comparison['comparisons']['length']['genome2']:,} bp
-            - GC Content: {comparison['comparisons']['gc_content']['genome2']}%
+            - GC Content: {format_percent(comparison['comparisons']['gc_content']['genome2'])}
             - CDS Genes: {comparison['comparisons']['genes']['genome2_cds']}
             
             DIFFERENCES:
             - Length difference: {comparison['comparisons']['length']['difference']:,} bp ({comparison['comparisons']['length']['percent_diff']}%)
-            - GC difference: {comparison['comparisons']['gc_content']['difference']}%
+            - GC difference: {format_percent(comparison['comparisons']['gc_content']['difference'])}
             - Gene difference: {comparison['comparisons']['genes']['difference']}
             - Overall similarity: {comparison['similarity']['overall_similarity']}%
             
@@ -456,7 +481,7 @@ class AIInterpreter:
             
             full_prompt = '\n'.join(prompt_parts)
             
-            response = self.model.generate_content(full_prompt)
+            response = self._generate('answer_question', full_prompt)
             answer = response.text.strip()
             
             return {
@@ -466,7 +491,7 @@ class AIInterpreter:
             
         except Exception as e:
             error_msg = str(e)
-            if '429' in error_msg or 'quota' in error_msg.lower() or 'rate' in error_msg.lower():
+            if is_rate_limit(error_msg):
                 return {
                     'success': False,
                     'answer': '⚠️ Límite de API alcanzado. Espera un momento e intenta de nuevo.'
@@ -0,0 +1,63 @@
+"""
+Serialización en streaming (NDJSON) de los resultados de análisis, sección a sección
+"""
+from typing import Any, Dict, Iterable, Iterator, Tuple
+import json
+
+from gene_columns import ColumnTable, json_default
+
+
+# Listas grandes que se envían por trozos: sección -> campo
+CHUNKED_FIELDS = {
+    'genes_analysis': 'cds_details',
+    'introns_exons': 'genes_with_structure'
+}
+
+# Elementos por línea al enviar una lista grande
+STREAM_CHUNK_ITEMS = 500
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def _line(payload: Dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+
+
+def ndjson_sections(sections: Iterable[Tuple[str, Any]],
+                    chunk_items: int = STREAM_CHUNK_ITEMS) -> Iterator[str]:
+    """
+    Convierte las secciones de un análisis en líneas NDJSON, sin serializar el resultado
+    completo de una vez
+
+    Cada sección es una línea {"section": clave, "data": valor}. En las secciones con una
+    lista grande (CHUNKED_FIELDS), "data" lleva la lista vacía y "chunked" su nombre, y los
+    elementos siguen en líneas {"section", "field", "items"} de hasta chunk_items elementos.
+    La última línea es {"done": true}.
+
+    Args:
+        sections: Iterador de (clave, valor), ej: GenomeAnalyzer.analyze_genome_sections
+        chunk_items: Elementos por línea de las listas grandes
+
+    Returns:
+        Iterador de líneas (terminadas en '\\n')
+    """
+    for key, value in sections:
+        field = CHUNKED_FIELDS.get(key)
+        if (field is None or not isinstance(value, dict) or
+                not isinstance(value.get(field), (list, ColumnTable))):
+            yield _line({'section': key, 'data': value})
+            continue
+
+        items = value[field]
+        # Copia superficial: el resultado original (el de la caché) no se modifica
+        yield _line({'section': key, 'data': {**value, field: []}, 'chunked': field,
+                     'total_items': len(items)})
+        for start in range(0, len(items), chunk_items):
+            yield _line({'section': key, 'field': field, 'items': items[start:start + chunk_items]})
+
+    yield _line({'done': True})
+
+
+def ndjson_error(error: str) -> str:
+    """Línea NDJSON con un error ocurrido después de empezar la respuesta"""
+    return _line({'success': False, 'error': error})
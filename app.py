@@ -1,18 +1,53 @@
 """
 Aplicación Flask principal para análisis de genomas
 """
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context, url_for
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from config import get_config
+from analysis_stream import NDJSON_MIMETYPE, ndjson_error, ndjson_sections
+from batch_analysis import analyze_batch, format_ndjson
+from gene_columns import COLUMNS_MIMETYPE, ColumnTable, columns_json_default
 from genome_analyzer import GenomeAnalyzer, GenomeComparator
+from gene_density import gene_density
+from gene_query import DEFAULT_PAGE_SIZE, GeneIndex, check_query_params, summarize_genes
+from kmer_spectrum import TOP_KMERS
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS,
+                     JOB_QUEUE_JOBS, PDF_GENERATION_DURATION, REGISTRY,
+                     configure as configure_metrics)
+from genome_files import store_upload
+from http_cache import analysis_etag, compress_response, not_modified, strong_etag, with_etag
+from job_queue import DONE, JobQueue
 from ai_interpreter import AIInterpreter
 from pdf_generator import PDFGenerator
+from rate_limiter import shared_bucket
+from record_cache import RecordCache
+from result_cache import ResultCache, is_versioned, result_key
+from stage_timing import NULL_TIMER, StageTimer, configure_logging
 import os
 import json
+import hashlib
+import time
 import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Optional
+
+
+
+class AnalysisJSONProvider(DefaultJSONProvider):
+    """jsonify con las tablas de gene_columns en la forma JSON de siempre (lista de objetos)"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ColumnTable):
+            return o.to_records()
+        return DefaultJSONProvider.default(o)
+
 
 app = Flask(__name__)
+app.json = AnalysisJSONProvider(app)
 app.config.from_object(get_config())
 CORS(app)
 
@@ -45,11 +80,72 @@ def get_mapas_assets():
         'css': entry.get('css', [])
     }
 
+# Métricas de /metrics, sumadas entre los procesos worker a través de METRICS_DIR
+configure_metrics(app.config['METRICS_DIR'] or None)
+
+# Caché de registros GenBank descargados
+record_cache = None
+if app.config['RECORD_CACHE_DIR']:
+    record_cache = RecordCache(
+        app.config['RECORD_CACHE_DIR'],
+        max_bytes=app.config['RECORD_CACHE_MAX_MB'] * 1024 * 1024,
+        ttl_seconds=app.config['RECORD_CACHE_TTL_HOURS'] * 3600
+    )
+
+# Caché de resultados de análisis (compartida entre /api/analyze y /api/compare)
+result_cache = ResultCache(
+    max_entries=app.config['RESULT_CACHE_ENTRIES'],
+    disk_dir=app.config['RESULT_CACHE_DIR'] or None,
+    disk_max_bytes=app.config['RESULT_CACHE_MAX_MB'] * 1024 * 1024
+)
+
+# Índices de CDS para /api/genome/<id>/genes (sólo en memoria: se reconstruyen del análisis)
+gene_indexes = ResultCache(max_entries=app.config['GENE_INDEX_ENTRIES'], name='gene_index')
+
+# Rate limit de NCBI compartido por hilos y procesos
+ncbi_rate_limiter = shared_bucket(
+    app.config['NCBI_RATE_LIMIT'],
+    app.config['NCBI_RATE_LIMIT_FILE'] or None
+)
+
+# Pool de procesos para el análisis CPU (forkserver: no hereda hilos del worker WSGI)
+analysis_pool = None
+if app.config['ANALYSIS_PROCESSES'] > 0:
+    mp_context = multiprocessing.get_context('forkserver')
+    mp_context.set_forkserver_preload(['genome_analyzer'])
+    analysis_pool = ProcessPoolExecutor(
+        max_workers=app.config['ANALYSIS_PROCESSES'],
+        mp_context=mp_context
+    )
+
+# Logs JSON de la duración, bytes y memoria de cada etapa de los análisis y los PDF
+if app.config['PROFILE_STAGES']:
+    configure_logging()
+
 # Inicializar analizador y AI
 analyzer = GenomeAnalyzer(
     email=app.config['NCBI_EMAIL'],
-    api_key=app.config.get('NCBI_API_KEY')
+    api_key=app.config.get('NCBI_API_KEY'),
+    min_orf_length=app.config['MIN_ORF_LENGTH'],
+    max_sequence_length=app.config['MAX_SEQUENCE_LENGTH'],
+    record_cache=record_cache,
+    result_cache=result_cache,
+    rate_limiter=ncbi_rate_limiter,
+    process_pool=analysis_pool,
+    profile_stages=app.config['PROFILE_STAGES']
+)
+
+# Cola persistente de análisis asíncronos
+job_queue = JobQueue(
+    app.config['JOBS_DB_PATH'],
+    run=lambda accession_id, progress: analyzer.analyze_genome(accession_id, progress=progress),
+    workers=app.config['JOB_WORKERS'],
+    lease_seconds=app.config['JOB_LEASE_SECONDS']
 )
+job_queue.start()
+JOB_QUEUE_JOBS.set_function(lambda: {
+    (status,): count for status, count in job_queue.get_stats().items() if status != 'workers'
+})
 
 ai_interpreter = None
 if app.config['GEMINI_API_KEY']:
@@ -63,6 +159,31 @@ else:
     print("WARNING: GEMINI_API_KEY no encontrada en la configuración")
 
 
+@app.before_request
+def start_request_timer():
+    """Inicio de la petición, para http_request_duration_seconds"""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Duración y código de respuesta de la petición, por endpoint de Flask (incluye la compresión)"""
+    endpoint = request.endpoint or 'unmatched'
+    start = g.get('request_start')
+    if start is not None:
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start,
+                                      endpoint=endpoint, method=request.method)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+@app.after_request
+def compress(response):
+    """Compresión gzip/brotli negociada con Accept-Encoding (ver http_cache)"""
+    return compress_response(request, response, min_bytes=app.config['COMPRESS_MIN_BYTES'],
+                             level=app.config['COMPRESS_LEVEL'])
+
+
 @app.route('/')
 def index():
     """Página principal"""
@@ -77,17 +198,24 @@ def mapas():
 # Endpoints para el Mapa Conceptual
 @app.route('/api/mapa', methods=['GET'])
 def get_mapa():
-    """Devuelve el JSON del mapa conceptual"""
+    """Devuelve el JSON del mapa conceptual (ETag del contenido: 304 si no cambió)"""
     try:
+        content = ''
         if os.path.exists(MAPA_FILE_PATH):
             with open(MAPA_FILE_PATH, 'r', encoding='utf-8') as f:
                 content = f.read()
-                if content.strip():
-                    return jsonify(json.loads(content))
+        
+        etag = strong_etag('mapa', content)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        if content.strip():
+            return with_etag(jsonify(json.loads(content)), etag)
         
         # Si el archivo no existe o está vacío, devolver initialData desde el frontend
         # (El frontend manejará esto cargando initialData si recibe un objeto vacío o nulo)
-        return jsonify({"nodes": [], "edges": []})
+        return with_etag(jsonify({"nodes": [], "edges": []}), etag)
     except Exception as e:
         print(f"Error en get_mapa: {e}")
         return jsonify({"error": str(e)}), 500
@@ -127,8 +255,22 @@ def analyze_genome():
     Request JSON:
         {
             "genome_id": "NC_000001.11",
-            "include_ai": true
+            "include_ai": true,
+            "stream": false,
+            "include_genes": false,
+            "timings": false
         }
+    
+    genes_analysis lleva sólo el resumen de los CDS (totales, hebras, longitudes y los
+    más largos); la lista completa se consulta paginada en genes_url, o se incluye con
+    "include_genes": true.
+    
+    Con "timings": true la respuesta incluye la duración, los bytes procesados y el
+    aumento del pico de memoria de cada etapa (ver stage_timing.StageTimer.summary).
+    
+    Con "stream": true (o Accept: application/x-ndjson) la respuesta es NDJSON: cada
+    sección del análisis se envía en cuanto se calcula y las listas grandes por trozos
+    (ver analysis_stream.ndjson_sections)
     """
     try:
         data = request.get_json()
@@ -138,25 +280,35 @@ def analyze_genome():
         if not genome_id:
             return jsonify({'error': 'Se requiere genome_id'}), 400
         
+        timer = StageTimer('analysis', genome_id) if data.get('timings') else None
+        
+        if data.get('stream') or request.accept_mimetypes.best_match(
+                ['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            return stream_analysis(genome_id, include_ai, timer)
+        
         # Analizar genoma
-        analysis = analyzer.analyze_genome(genome_id)
+        analysis = analyzer.analyze_genome(genome_id, timer=timer)
         
         # Interpretación de IA (opcional)
         ai_result = None
         if include_ai and ai_interpreter:
             try:
-                ai_result = ai_interpreter.interpret_genome_analysis(analysis)
+                with (timer or NULL_TIMER).stage('ai_interpretation'):
+                    ai_result = ai_interpreter.interpret_genome_analysis(analysis)
             except Exception as e:
                 print(f"Error en interpretación AI: {e}")
                 ai_result = {
                     'error': f'Error en análisis de IA: {str(e)}'
                 }
         
-        return jsonify({
+        if not data.get('include_genes'):
+            analysis = genes_summary(analysis)
+        
+        return analysis_json(with_timings({
             'success': True,
             'analysis': analysis,
             'ai_interpretation': ai_result
-        })
+        }, timer))
     
     except Exception as e:
         print(f"Error en análisis: {traceback.format_exc()}")
@@ -167,6 +319,199 @@ def analyze_genome():
         }), 500
 
 
+def analysis_json(payload: dict, status: int = 200) -> Response:
+    """
+    Respuesta JSON de un análisis. Con Accept: application/vnd.genome.columns+json, las
+    listas por gen (cds_details, top_genes, genes_with_structure, genes de una página) se
+    envían en forma columnar (ver gene_columns.ColumnTable.to_columns)
+    """
+    if response_format() == COLUMNS_MIMETYPE:
+        response = Response(app.json.dumps(payload, default=columns_json_default),
+                            status=status, mimetype=COLUMNS_MIMETYPE)
+    else:
+        response = jsonify(payload)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response
+
+
+def with_timings(payload: dict, timer: Optional[StageTimer]) -> dict:
+    """Añade la clave timings a la respuesta si se pidió (timer no es None)"""
+    if timer is not None:
+        payload['timings'] = timer.summary()
+    return payload
+
+
+def response_format() -> str:
+    """Formato de la respuesta de un análisis según Accept (parte de su ETag)"""
+    return request.accept_mimetypes.best_match(['application/json', COLUMNS_MIMETYPE]) or 'application/json'
+
+
+def genes_summary(analysis: dict) -> dict:
+    """Análisis sin cds_details, con la URL de la consulta paginada de sus CDS"""
+    genes_url = url_for('genome_genes', genome_id=analysis['accession_id'])
+    return summarize_genes(analysis, genes_url)
+
+
+def stream_analysis(genome_id: str, include_ai: bool, timer: Optional[StageTimer] = None):
+    """
+    Respuesta NDJSON de /api/analyze: una línea por sección, en cuanto se calcula (con
+    timer, la última sección es timings)
+    """
+    sections = analyzer.analyze_genome_sections(genome_id, timer=timer)
+    # La primera sección llega tras descargar el registro: los errores de NCBI aún
+    # pueden responderse con un código HTTP de error
+    first = next(sections)
+    
+    def generate():
+        analysis = {}
+        
+        def collect():
+            analysis[first[0]] = first[1]
+            yield first
+            for key, value in sections:
+                analysis[key] = value
+                yield key, value
+            
+            # Interpretación de IA (opcional), con el análisis completo
+            if include_ai and ai_interpreter:
+                try:
+                    with (timer or NULL_TIMER).stage('ai_interpretation'):
+                        ai_result = ai_interpreter.interpret_genome_analysis(analysis)
+                    yield 'ai_interpretation', ai_result
+                except Exception as e:
+                    print(f"Error en interpretación AI: {e}")
+                    yield 'ai_interpretation', {'error': f'Error en análisis de IA: {str(e)}'}
+            
+            if timer is not None:
+                yield 'timings', timer.summary()
+        
+        try:
+            yield from ndjson_sections(collect())
+        except Exception as e:
+            print(f"Error en análisis: {traceback.format_exc()}")
+            yield ndjson_error(str(e))
+    
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE,
+                    headers={'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/analyze/upload', methods=['POST'])
+def analyze_upload():
+    """
+    Analiza un genoma subido como archivo, sin consultar NCBI
+    
+    Request multipart/form-data:
+        file: GenBank, FASTA o GFF3 con sección ##FASTA (opcionalmente .gz)
+        annotation: GFF3 opcional con las anotaciones de un FASTA
+        name: Identificador opcional del genoma en el resultado
+        include_ai: "true" para incluir la interpretación de IA
+        timings: "true" para incluir la duración de cada etapa (ver /api/analyze)
+    """
+    uploaded = request.files.get('file')
+    if uploaded is None or not uploaded.filename:
+        return jsonify({'error': 'Se requiere el archivo del genoma (campo file)'}), 400
+    
+    annotation = request.files.get('annotation')
+    name = request.form.get('name', '').strip() or None
+    include_ai = request.form.get('include_ai', 'false').lower() in ('1', 'true', 'yes')
+    timer = None
+    if request.form.get('timings', 'false').lower() in ('1', 'true', 'yes'):
+        timer = StageTimer('analysis', name or uploaded.filename)
+    
+    paths = []
+    try:
+        # Copiar a disco por bloques; el hash identifica el contenido para la caché
+        digest = hashlib.sha256()
+        genome_path = store_upload(uploaded.stream, app.config['UPLOAD_DIR'], digest)
+        paths.append(genome_path)
+        annotation_path = None
+        if annotation is not None and annotation.filename:
+            digest.update(b'\0annotation\0')
+            annotation_path = store_upload(annotation.stream, app.config['UPLOAD_DIR'], digest)
+            paths.append(annotation_path)
+        digest.update(f"\0name\0{name or ''}".encode('utf-8'))
+        
+        analysis = analyzer.analyze_file(genome_path, annotation_path, name=name,
+                                         content_hash=digest.hexdigest(), timer=timer)
+        
+        # Interpretación de IA (opcional)
+        ai_result = None
+        if include_ai and ai_interpreter:
+            try:
+                with (timer or NULL_TIMER).stage('ai_interpretation'):
+                    ai_result = ai_interpreter.interpret_genome_analysis(analysis)
+            except Exception as e:
+                print(f"Error en interpretación AI: {e}")
+                ai_result = {
+                    'error': f'Error en análisis de IA: {str(e)}'
+                }
+        
+        return analysis_json(with_timings({
+            'success': True,
+            'analysis': analysis,
+            'ai_interpretation': ai_result
+        }, timer))
+    
+    except ValueError as e:
+        # Archivo en un formato no admitido o mal formado
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        print(f"Error en análisis de archivo: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'details': traceback.format_exc()
+        }), 500
+    
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch_endpoint():
+    """
+    Analiza un lote de genomas y devuelve los resultados en NDJSON (una línea JSON por
+    genoma) a medida que terminan, no en el orden de la petición
+    
+    Los registros se descargan con efetch por grupos y se analizan en el pool de procesos.
+    Si la conexión se corta, repetir la petición reanuda el lote: los resultados ya
+    calculados salen de la caché (o pueden omitirse de genome_ids).
+    
+    Request JSON:
+        {
+            "genome_ids": ["NC_000913.3", "NC_002695.2", ...]
+        }
+    
+    Response (application/x-ndjson), una línea por genoma:
+        {"accession_id": "...", "success": true, "analysis": {...}}
+        {"accession_id": "...", "success": false, "error": "..."}
+    """
+    data = request.get_json(silent=True) or {}
+    genome_ids = data.get('genome_ids')
+    
+    if not isinstance(genome_ids, list) or not genome_ids:
+        return jsonify({'error': 'Se requiere genome_ids (lista de IDs de acceso)'}), 400
+    
+    genome_ids = [str(genome_id).strip() for genome_id in genome_ids if str(genome_id).strip()]
+    if len(genome_ids) > app.config['BATCH_MAX_GENOMES']:
+        return jsonify({
+            'error': f"Máximo {app.config['BATCH_MAX_GENOMES']} genomas por lote"
+        }), 400
+    
+    def generate():
+        for entry in analyze_batch(analyzer, genome_ids, app.config['BATCH_GROUP_SIZE']):
+            yield format_ndjson(entry)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+
 @app.route('/api/compare', methods=['POST'])
 def compare_genomes():
     """
@@ -176,8 +521,12 @@ def compare_genomes():
         {
             "genome1_id": "NC_000001.11",
             "genome2_id": "NC_000002.12",
-            "include_ai": true
+            "include_ai": true,
+            "timings": false
         }
+    
+    Con "timings": true la respuesta incluye la duración del análisis de ambos genomas
+    (en paralelo), de la comparación y de la interpretación de IA.
     """
     try:
         data = request.get_json()
@@ -188,37 +537,40 @@ def compare_genomes():
         if not genome1_id or not genome2_id:
             return jsonify({'error': 'Se requieren genome1_id y genome2_id'}), 400
         
-        # Analizar ambos genomas
-        print(f"Analizando genoma 1: {genome1_id}")
-        analysis1 = analyzer.analyze_genome(genome1_id)
+        timer = StageTimer('comparison', f"{genome1_id},{genome2_id}") if data.get('timings') else None
+        stages = timer or NULL_TIMER
         
-        print(f"Analizando genoma 2: {genome2_id}")
-        analysis2 = analyzer.analyze_genome(genome2_id)
+        # Analizar ambos genomas en paralelo
+        print(f"Analizando genomas: {genome1_id}, {genome2_id}")
+        with stages.stage('analyze_genomes'):
+            analysis1, analysis2 = analyzer.analyze_genomes([genome1_id, genome2_id])
         
         # Comparar
         print("Comparando genomas...")
-        comparison = GenomeComparator.compare(analysis1, analysis2)
+        with stages.stage('compare'):
+            comparison = GenomeComparator.compare(analysis1, analysis2)
         
         # Interpretación de IA (opcional)
         ai_result = None
         if include_ai and ai_interpreter:
             try:
-                ai_result = ai_interpreter.interpret_comparison(
-                    comparison, analysis1, analysis2
-                )
+                with stages.stage('ai_interpretation'):
+                    ai_result = ai_interpreter.interpret_comparison(
+                        comparison, analysis1, analysis2
+                    )
             except Exception as e:
                 print(f"Error en interpretación AI: {e}")
                 ai_result = {
                     'error': f'Error en análisis de IA: {str(e)}'
                 }
         
-        return jsonify({
+        return analysis_json(with_timings({
             'success': True,
-            'genome1': analysis1,
-            'genome2': analysis2,
+            'genome1': genes_summary(analysis1),
+            'genome2': genes_summary(analysis2),
             'comparison': comparison,
             'ai_interpretation': ai_result
-        })
+        }, timer))
     
     except Exception as e:
         print(f"Error en comparación: {traceback.format_exc()}")
@@ -229,6 +581,274 @@ def compare_genomes():
         }), 500
 
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Encola el análisis de un genoma y responde de inmediato con el ID del trabajo.
+    Envíos repetidos de la misma accesión mientras está en curso devuelven el mismo trabajo.
+    
+    Request JSON:
+        {
+            "genome_id": "NC_000001.11"
+        }
+    """
+    try:
+        data = request.get_json()
+        genome_id = data.get('genome_id')
+        
+        if not genome_id:
+            return jsonify({'error': 'Se requiere genome_id'}), 400
+        
+        job = job_queue.submit(genome_id)
+        job['status_url'] = f"/api/jobs/{job['job_id']}"
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        }), 202
+    
+    except Exception as e:
+        print(f"Error encolando trabajo: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Estado de un trabajo: status (queued, running, done, error), etapa actual,
+    progreso (0-1) y el resultado del análisis cuando termina
+    """
+    job = job_queue.get(job_id, include_result=False)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    
+    # Un trabajo terminado no cambia hasta que se vuelve a encolar (updated_at)
+    etag = None
+    if job['status'] == DONE:
+        etag = strong_etag('job', job_id, job['updated_at'], response_format())
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        job = job_queue.get(job_id)
+    if 'result' in job:
+        job['result'] = genes_summary(job['result'])
+    
+    return with_etag(analysis_json({
+        'success': True,
+        'job': job
+    }), etag)
+
+
+@app.route('/api/genome/<genome_id>', methods=['GET'])
+def genome_analysis(genome_id):
+    """
+    Análisis de un genoma sin interpretación de IA (misma respuesta que /api/analyze)
+    
+    Query string:
+        include_genes: 1 para incluir la lista completa de CDS
+    
+    Con una accesión con versión la respuesta lleva un ETag (accesión + versión del
+    analizador): las peticiones repetidas con If-None-Match reciben un 304 sin analizar
+    ni transferir el resultado de nuevo
+    """
+    include_genes = request.args.get('include_genes', '').lower() in ('1', 'true')
+    etag = analysis_etag(genome_id, analyzer.version, 'analysis', include_genes, response_format())
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    try:
+        analysis = analyzer.analyze_genome(genome_id)
+        if not include_genes:
+            analysis = genes_summary(analysis)
+        
+        return with_etag(analysis_json({
+            'success': True,
+            'analysis': analysis,
+            'ai_interpretation': None
+        }), etag)
+    
+    except Exception as e:
+        print(f"Error en análisis: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'details': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/genome/<genome_id>/density', methods=['GET'])
+def genome_density(genome_id):
+    """
+    Densidad de genes con la resolución pedida, a partir del análisis en caché
+    
+    Query string:
+        bins: Número de intervalos (el tamaño se redondea hacia arriba)
+        bin_size: Tamaño de los intervalos en pb (alternativa a bins)
+    
+    Por intervalo: gene_count (CDS que lo solapan) y covered_bp (pb codificantes). Los
+    niveles de 10, 100 y 1000 intervalos ya vienen en gene_distribution.density_levels.
+    """
+    etag = analysis_etag(genome_id, analyzer.version, 'density',
+                         sorted(request.args.items(multi=True)))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    try:
+        bins = request.args.get('bins', type=int)
+        bin_size = request.args.get('bin_size', type=int)
+        if bins is None and bin_size is None:
+            raise ValueError("Se requiere bins o bin_size (enteros)")
+        
+        analysis = analyzer.analyze_genome(genome_id)
+        cds = analysis['genes_analysis']['cds_details']
+        density = gene_density(cds.column('start'), cds.column('end'), analysis['length'],
+                               bins=bins, bin_size=bin_size)
+        
+        return with_etag(jsonify({
+            'success': True,
+            'accession_id': genome_id,
+            'length': analysis['length'],
+            **density
+        }), etag)
+    
+    except ValueError as e:
+        # Parámetros no válidos
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        print(f"Error calculando densidad: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/genome/<genome_id>/kmers', methods=['GET'])
+def genome_kmers(genome_id):
+    """
+    Espectro de k-mers de la secuencia completa (se calcula una vez y queda en la caché)
+    
+    Query string:
+        k: Longitud de los k-mers, 1 a 12 (defecto 4)
+        strand: forward (defecto), reverse o both
+        canonical: 1 para contar k-mer y reverso complementario juntos (ignora strand)
+        top: k-mers más frecuentes que se devuelven (defecto 100, máximo 1000)
+    
+    Para k <= 6 (sin canonical) incluye también counts: las 4^k cuentas en orden TCAG
+    """
+    etag = analysis_etag(genome_id, analyzer.version, 'kmers',
+                         sorted(request.args.items(multi=True)))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    try:
+        top = request.args.get('top', 100, type=int)
+        if not 1 <= top <= TOP_KMERS:
+            raise ValueError(f"top debe estar entre 1 y {TOP_KMERS}")
+        
+        spectrum = analyzer.analyze_kmers(
+            genome_id,
+            k=request.args.get('k', 4, type=int),
+            strand=request.args.get('strand', 'forward'),
+            canonical=request.args.get('canonical', '').lower() in ('1', 'true')
+        )
+        
+        return with_etag(jsonify({
+            'success': True,
+            'accession_id': genome_id,
+            **spectrum,
+            'top_kmers': spectrum['top_kmers'][:top]
+        }), etag)
+    
+    except ValueError as e:
+        # Parámetros no válidos o registro sin secuencia
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        print(f"Error calculando k-mers: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/genome/<genome_id>/genes', methods=['GET'])
+def genome_genes(genome_id):
+    """
+    CDS de un genoma, paginados, a partir del análisis en caché (se analiza si no lo está)
+    
+    Query string:
+        sort: position (defecto), length, -position o -length (descendente)
+        strand: + o -
+        name: Subcadena del nombre del gen o del locus_tag
+        product: Subcadena del producto
+        limit: CDS por página (defecto 100, máximo 1000); los N más largos: sort=-length&limit=N
+        cursor: next_cursor de la página anterior
+    """
+    etag = analysis_etag(genome_id, analyzer.version, 'genes',
+                         sorted(request.args.items(multi=True)), response_format())
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    query = {
+        'sort': request.args.get('sort', 'position'),
+        'strand': request.args.get('strand') or None,
+        'name': request.args.get('name') or None,
+        'product': request.args.get('product') or None,
+        'limit': request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        'cursor': request.args.get('cursor') or None
+    }
+    
+    try:
+        # Parámetros no válidos: 400 antes de descargar o analizar el genoma
+        check_query_params(**query)
+        
+        # Como el análisis, el índice sólo se reutiliza para accesiones con versión: sin
+        # versión el registro puede cambiar en NCBI y se construye a partir de un análisis nuevo
+        key = result_key(genome_id, analyzer.version, kind='genes') if is_versioned(genome_id) else None
+        index = gene_indexes.get(key) if key else None
+        if index is None:
+            analysis = analyzer.analyze_genome(genome_id)
+            index = GeneIndex(analysis['genes_analysis']['cds_details'])
+            if key:
+                gene_indexes.put(key, index)
+        
+        page = index.query(**query)
+        
+        return with_etag(analysis_json({
+            'success': True,
+            'accession_id': genome_id,
+            **page
+        }), etag)
+    
+    except ValueError as e:
+        # Parámetros o cursor no válidos
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        print(f"Error consultando genes: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/ai-chat', methods=['POST'])
 def ai_chat():
     """
@@ -309,7 +929,8 @@ def download_pdf():
         {
             "type": "single" | "comparison",
             "data": { ... },  // Datos del análisis
-            "ai_interpretation": { ... }  // Opcional
+            "ai_interpretation": { ... },  // Opcional
+            "timings": false  // Opcional: cabecera Server-Timing con la duración de cada sección
         }
     """
     try:
@@ -330,13 +951,18 @@ def download_pdf():
         filename = f"genome_analysis_{timestamp}.pdf"
         filepath = os.path.join(pdf_dir, filename)
         
-        # Generar PDF
+        # Generar PDF (medido si se pide o si PROFILE_STAGES está activo)
         pdf_gen = PDFGenerator(filepath)
+        timer = None
+        if data.get('timings') or app.config['PROFILE_STAGES']:
+            timer = StageTimer('pdf', report_type)
         
+        start = time.perf_counter()
         if report_type == 'single':
             pdf_gen.generate_single_genome_report(
                 analysis_data,
-                ai_data
+                ai_data,
+                timer
             )
         elif report_type == 'comparison':
             genome1 = data.get('genome1')
@@ -349,18 +975,23 @@ def download_pdf():
                 analysis_data,
                 genome1,
                 genome2,
-                ai_data
+                ai_data,
+                timer
             )
         else:
             return jsonify({'error': 'Tipo inválido'}), 400
+        PDF_GENERATION_DURATION.observe(time.perf_counter() - start, type=report_type)
         
         # Enviar archivo
-        return send_file(
+        response = send_file(
             filepath,
             as_attachment=True,
             download_name=filename,
             mimetype='application/pdf'
         )
+        if timer is not None and data.get('timings'):
+            response.headers['Server-Timing'] = timer.server_timing()
+        return response
     
     except Exception as e:
         print(f"Error generando PDF: {traceback.format_exc()}")
@@ -376,16 +1007,40 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'ai_available': ai_interpreter is not None,
-        'ncbi_email_configured': bool(app.config['NCBI_EMAIL'])
+        'ncbi_email_configured': bool(app.config['NCBI_EMAIL']),
+        'ncbi_rate_limiter': ncbi_rate_limiter.get_stats(),
+        'jobs': job_queue.get_stats(),
+        'cache': {
+            'records': record_cache.get_stats() if record_cache else None,
+            'results': result_cache.get_stats(),
+            'gene_indexes': gene_indexes.get_stats()
+        }
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Métricas en el formato de texto de Prometheus: latencia y peticiones HTTP por endpoint,
+    latencia y errores de NCBI y Gemini, aciertos de las cachés, trabajos en cola y tiempo
+    de generación de los PDF (sumadas entre los procesos worker, ver metrics.py)
+    """
+    return Response(REGISTRY.exposition(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Manejo de 404"""
     return jsonify({'error': 'Endpoint no encontrado'}), 404
 
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Manejo de subidas que superan MAX_CONTENT_LENGTH"""
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'error': f'Archivo demasiado grande (máximo {limit_mb} MB)'}), 413
+
+
 @app.errorhandler(500)
 def internal_error(error):
     """Manejo de errores del servidor"""
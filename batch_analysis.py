@@ -0,0 +1,380 @@
+"""
+Análisis por lotes de muchas accesiones: descarga agrupada con efetch, análisis en un
+pool de procesos y resultados en NDJSON a medida que terminan
+
+Uso desde la línea de comandos:
+    python batch_analysis.py accesiones.txt -o resultados.ndjson
+"""
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+
+from gene_columns import json_default
+from genome_analyzer import GenomeAnalyzer, analyze_genbank_file
+
+
+# Accesiones por petición efetch (NCBI recomienda no pedir cientos de registros de una vez)
+BATCH_GROUP_SIZE = 20
+
+# Líneas de cabecera que identifican el registro dentro de una respuesta con varios
+_ID_PREFIXES = (b'VERSION', b'ACCESSION')
+
+
+def read_accession_list(lines: Iterable[str]) -> List[str]:
+    """Accesiones de un archivo de texto: una por línea (o separadas por comas), '#' comenta"""
+    accession_ids = []
+    for line in lines:
+        line = line.split('#', 1)[0]
+        accession_ids.extend(part.strip() for part in line.replace(',', ' ').split() if part.strip())
+    return list(dict.fromkeys(accession_ids))
+
+
+def completed_accessions(path: str) -> Set[str]:
+    """
+    Accesiones ya analizadas con éxito en un archivo NDJSON de una ejecución anterior
+
+    Las líneas incompletas (ejecución interrumpida a mitad de escritura) se ignoran.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get('success'):
+                done.add(entry.get('accession_id'))
+    return done
+
+
+def _binary_lines(handle) -> Iterator[bytes]:
+    """Líneas de un handle de texto o binario, siempre como bytes"""
+    for line in iter(handle.readline, ''):
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        if not line:
+            return
+        yield line
+
+
+def _matching_id(line: bytes, wanted: Dict[str, str]) -> Optional[str]:
+    """ID pedido al que corresponde una línea VERSION/ACCESSION (con o sin versión)"""
+    for token in line.split()[1:]:
+        token = token.decode('ascii', 'replace').upper()
+        for key in (token, token.split('.')[0]):
+            if key in wanted:
+                return wanted[key]
+    return None
+
+
+def _split_records(handle, accession_ids: List[str], open_destination) -> Set[str]:
+    """
+    Reparte una respuesta efetch con varios registros GenBank en un archivo por accesión
+
+    Cada registro se copia línea a línea al destino que devuelve
+    open_destination(accession_id, escribir), sin tenerlo entero en memoria.
+
+    Returns:
+        Accesiones encontradas en la respuesta
+    """
+    wanted = {}
+    for accession_id in accession_ids:
+        key = accession_id.strip().upper()
+        wanted[key] = accession_id
+        wanted.setdefault(key.split('.')[0], accession_id)
+
+    found = set()
+    lines = _binary_lines(handle)
+    header: List[bytes] = []
+    for line in lines:
+        header.append(line)
+        if not line.startswith(_ID_PREFIXES):
+            if line.startswith(b'//'):
+                header = []
+            continue
+
+        accession_id = _matching_id(line, wanted)
+        if accession_id is None or accession_id in found:
+            if line.startswith(b'VERSION'):
+                # Registro que no se pidió: descartarlo hasta '//'
+                for line in lines:
+                    if line.startswith(b'//'):
+                        break
+                header = []
+            continue
+
+        def write_record(_: str, destination: BinaryIO, first_lines=header):
+            destination.writelines(first_lines)
+            for rest in lines:
+                destination.write(rest)
+                if rest.startswith(b'//'):
+                    break
+
+        open_destination(accession_id, write_record)
+        found.add(accession_id)
+        header = []
+    return found
+
+
+def download_group(analyzer: GenomeAnalyzer, accession_ids: List[str],
+                   directory: Optional[str] = None) -> Dict[str, str]:
+    """
+    Descarga varios registros con una sola petición efetch
+
+    Args:
+        analyzer: Analizador (rate limit, caché de registros)
+        accession_ids: Accesiones del grupo
+        directory: Directorio de los archivos temporales si no hay caché de registros
+
+    Returns:
+        Diccionario accesión -> ruta del registro; las accesiones que NCBI no devolvió
+        no aparecen
+    """
+    paths = {}
+
+    def open_destination(accession_id: str, write_record):
+        if analyzer.record_cache is not None:
+            paths[accession_id] = analyzer.record_cache.store(accession_id, write_record)
+            return
+        fd, path = tempfile.mkstemp(suffix='.gb', dir=directory)
+        paths[accession_id] = path
+        with os.fdopen(fd, 'wb') as f:
+            write_record(accession_id, f)
+
+    handle = analyzer._efetch(accession_ids)
+    try:
+        _split_records(handle, accession_ids, open_destination)
+    finally:
+        handle.close()
+    return paths
+
+
+def analyze_batch(analyzer: GenomeAnalyzer, accession_ids: List[str],
+                  group_size: int = BATCH_GROUP_SIZE,
+                  executor: Optional[Executor] = None) -> Iterator[Dict]:
+    """
+    Analiza muchas accesiones y devuelve cada resultado en cuanto termina
+
+    Un hilo descarga los registros por grupos (una petición efetch por grupo, respetando
+    el rate limit) mientras el pool analiza los ya descargados. Los resultados ya
+    calculados salen de la caché de resultados y los registros válidos de la caché de
+    registros, así que repetir un lote interrumpido sólo rehace lo que faltaba.
+
+    Args:
+        analyzer: Analizador configurado
+        accession_ids: Accesiones a analizar (los duplicados se analizan una vez)
+        group_size: Accesiones por petición efetch
+        executor: Pool donde se analiza cada registro (por defecto analyzer.process_pool,
+                  o un hilo si el analizador no tiene pool)
+
+    Returns:
+        Iterador de {'accession_id', 'success': True, 'analysis'} o
+        {'accession_id', 'success': False, 'error'}, en orden de finalización
+    """
+    unique_ids = list(dict.fromkeys(accession_ids))
+    own_executor = None
+    if executor is None:
+        executor = analyzer.process_pool
+    if executor is None:
+        executor = own_executor = ThreadPoolExecutor(max_workers=1)
+
+    temp_dir = tempfile.mkdtemp(prefix='batch-') if analyzer.record_cache is None else None
+    settings = analyzer._worker_settings()
+    results: 'queue.Queue[Dict]' = queue.Queue()
+    futures: List[Future] = []
+    stopped = threading.Event()
+
+    def finished(accession_id: str, path: str, cache_key: Optional[str], future: Future):
+        if temp_dir is not None and os.path.exists(path):
+            os.remove(path)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            results.put({'accession_id': accession_id, 'success': False, 'error': str(error)})
+            return
+        analysis = future.result()
+        if cache_key is not None:
+            analyzer.result_cache.put(cache_key, analysis)
+        results.put({'accession_id': accession_id, 'success': True, 'analysis': analysis})
+
+    def submit(accession_id: str, path: str, cache_key: Optional[str]):
+        if stopped.is_set():
+            return
+        sequence_path = (analyzer.record_cache.sequence_path(accession_id)
+                         if analyzer.record_cache is not None else None)
+        future = executor.submit(analyze_genbank_file, settings, accession_id, path, sequence_path)
+        futures.append(future)
+        future.add_done_callback(lambda f: finished(accession_id, path, cache_key, f))
+
+    def produce():
+        to_download = []
+        for accession_id in unique_ids:
+            cache_key, cached = analyzer._cached_result(accession_id)
+            if cached is not None:
+                results.put({'accession_id': accession_id, 'success': True, 'analysis': cached})
+                continue
+            path = (analyzer.record_cache.get_fresh(accession_id)
+                    if analyzer.record_cache is not None else None)
+            if path is not None:
+                submit(accession_id, path, cache_key)
+            else:
+                to_download.append((accession_id, cache_key))
+
+        for start in range(0, len(to_download), group_size):
+            if stopped.is_set():
+                return
+            group = to_download[start:start + group_size]
+            try:
+                paths = download_group(analyzer, [acc for acc, _ in group], temp_dir)
+            except Exception as e:
+                paths, error = {}, f"Error al obtener genoma: {str(e)}"
+            else:
+                error = "NCBI no devolvió el registro"
+            for accession_id, cache_key in group:
+                if accession_id in paths:
+                    submit(accession_id, paths[accession_id], cache_key)
+                else:
+                    results.put({'accession_id': accession_id, 'success': False,
+                                 'error': f"{error} ({accession_id})"})
+
+    def run_producer():
+        try:
+            produce()
+        except Exception as e:
+            # Fallo inesperado: no dejar al consumidor esperando resultados que no llegarán
+            results.put({'accession_id': None, 'success': False, 'error': str(e), 'fatal': True})
+
+    producer = threading.Thread(target=run_producer, name='batch-download', daemon=True)
+    producer.start()
+    try:
+        for _ in range(len(unique_ids)):
+            entry = results.get()
+            fatal = entry.pop('fatal', False)
+            yield entry
+            if fatal:
+                return
+    finally:
+        # Consumidor terminado o interrumpido (ej: el cliente HTTP se desconectó)
+        stopped.set()
+        producer.join()
+        for future in futures:
+            future.cancel()
+        if own_executor is not None:
+            own_executor.shutdown(wait=True)
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def format_ndjson(entry: Dict) -> str:
+    """Línea NDJSON de un resultado de analyze_batch"""
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    from config import get_config
+    from rate_limiter import shared_bucket
+    from record_cache import RecordCache
+    from result_cache import ResultCache
+
+    parser = argparse.ArgumentParser(
+        description="Analiza un lote de accesiones NCBI y escribe un resultado NDJSON por línea"
+    )
+    parser.add_argument('input', help="Archivo con una accesión por línea ('-' = entrada estándar)")
+    parser.add_argument('-o', '--output', help="Archivo NDJSON de salida; si ya existe, se "
+                        "reanuda: se omiten las accesiones analizadas con éxito y se añaden las demás")
+    parser.add_argument('--group-size', type=int, default=BATCH_GROUP_SIZE,
+                        help=f"Accesiones por petición efetch (defecto: {BATCH_GROUP_SIZE})")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Procesos de análisis (defecto: ANALYSIS_PROCESSES de la configuración)")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    if args.input == '-':
+        accession_ids = read_accession_list(sys.stdin)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            accession_ids = read_accession_list(f)
+
+    done = completed_accessions(args.output) if args.output else set()
+    pending = [acc for acc in accession_ids if acc not in done]
+    print(f"{len(accession_ids)} accesiones, {len(done & set(accession_ids))} ya analizadas, "
+          f"{len(pending)} pendientes", file=sys.stderr)
+
+    record_cache = None
+    if config.RECORD_CACHE_DIR:
+        record_cache = RecordCache(
+            config.RECORD_CACHE_DIR,
+            max_bytes=config.RECORD_CACHE_MAX_MB * 1024 * 1024,
+            ttl_seconds=config.RECORD_CACHE_TTL_HOURS * 3600
+        )
+    result_cache = ResultCache(
+        max_entries=config.RESULT_CACHE_ENTRIES,
+        disk_dir=config.RESULT_CACHE_DIR or None,
+        disk_max_bytes=config.RESULT_CACHE_MAX_MB * 1024 * 1024
+    )
+
+    processes = config.ANALYSIS_PROCESSES if args.processes is None else args.processes
+    pool = None
+    if processes > 0:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        mp_context = multiprocessing.get_context('forkserver')
+        mp_context.set_forkserver_preload(['genome_analyzer'])
+        pool = ProcessPoolExecutor(max_workers=processes, mp_context=mp_context)
+
+    analyzer = GenomeAnalyzer(
+        email=config.NCBI_EMAIL,
+        api_key=config.NCBI_API_KEY,
+        min_orf_length=config.MIN_ORF_LENGTH,
+        max_sequence_length=config.MAX_SEQUENCE_LENGTH,
+        record_cache=record_cache,
+        result_cache=result_cache,
+        rate_limiter=shared_bucket(config.NCBI_RATE_LIMIT, config.NCBI_RATE_LIMIT_FILE or None),
+        process_pool=pool
+    )
+
+    output = sys.stdout
+    if args.output:
+        # Cerrar la última línea si la ejecución anterior se cortó a mitad de escritura
+        truncated = False
+        if os.path.exists(args.output) and os.path.getsize(args.output) > 0:
+            with open(args.output, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                truncated = f.read(1) != b'\n'
+        output = open(args.output, 'a', encoding='utf-8')
+        if truncated:
+            output.write('\n')
+    failed = 0
+    try:
+        for count, entry in enumerate(analyze_batch(analyzer, pending, args.group_size), 1):
+            # Una línea completa por resultado, escrita en cuanto termina (reanudable)
+            output.write(format_ndjson(entry))
+            output.flush()
+            if not entry['success']:
+                failed += 1
+            status = 'ok' if entry['success'] else f"error: {entry['error']}"
+            print(f"[{count}/{len(pending)}] {entry['accession_id']}: {status}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrumpido: vuelve a ejecutar con el mismo --output para reanudar", file=sys.stderr)
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
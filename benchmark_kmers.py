@@ -0,0 +1,51 @@
+"""
+Benchmark del espectro de k-mers (k = 1..12) sobre una secuencia sintética de 5 Mb
+Compara con un conteo por posición con collections.Counter para k pequeño; no requiere NCBI
+"""
+from collections import Counter
+import random
+import time
+
+from kmer_spectrum import MAX_K, count_kmers, kmer_string
+from packed_sequence import PackedSequence
+
+SEQUENCE_LENGTH = 5_000_000
+LEGACY_K = 4
+
+
+def legacy_count(sequence: str, k: int) -> Counter:
+    """Conteo por posición con cortes de la cadena"""
+    return Counter(sequence[i:i + k] for i in range(len(sequence) - k + 1))
+
+
+def main():
+    rng = random.Random(42)
+    sequence = ''.join(rng.choices('ACGT', k=SEQUENCE_LENGTH))
+    packed = PackedSequence.from_bytes(sequence)
+    print(f"Secuencia sintética: {len(sequence):,} bp\n")
+
+    start = time.perf_counter()
+    legacy = legacy_count(sequence, LEGACY_K)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keys, counts = count_kmers(packed, LEGACY_K)
+    vectorized_time = time.perf_counter() - start
+    same = legacy == Counter({kmer_string(int(key), LEGACY_K): int(count)
+                              for key, count in zip(keys, counts)})
+    print(f"k={LEGACY_K}: Counter {legacy_time:.3f} s, vectorizado {vectorized_time:.3f} s "
+          f"[{'OK' if same else 'DIFERENTE'}]\n")
+
+    print(f"{'k':>3} {'hebra':>10} {'distintos':>10} {'tiempo (s)':>11} {'Mb/s':>8}")
+    for k in range(1, MAX_K + 1):
+        for strand, canonical in (('forward', False), ('both', False), ('forward', True)):
+            start = time.perf_counter()
+            keys, _ = count_kmers(packed, k, strand, canonical)
+            elapsed = time.perf_counter() - start
+            label = 'canónico' if canonical else strand
+            print(f"{k:>3} {label:>10} {len(keys):>10,} {elapsed:>11.3f} "
+                  f"{SEQUENCE_LENGTH / elapsed / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
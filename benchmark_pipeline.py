@@ -0,0 +1,398 @@
+"""
+Benchmark reproducible del pipeline completo sobre genomas sintéticos de 30 kb, 5 Mb y 50 Mb
+(o archivos GenBank propios), sin NCBI ni Gemini
+
+Mide cada etapa de GenomeAnalyzer (ver stage_timing), GenomeComparator.compare, la
+serialización JSON y la generación del PDF, con su rendimiento (MB/s) y el aumento del pico de
+memoria. Cada repetición se ejecuta en un proceso nuevo, así el pico de memoria de un genoma no
+arrastra el de los anteriores. Los resultados se guardan en JSON para compararlos con una
+ejecución anterior:
+
+    python benchmark_pipeline.py -o antes.json
+    python benchmark_pipeline.py -o despues.json --baseline antes.json
+    python benchmark_pipeline.py --sizes 30kb 5mb 50mb --repeat 3
+    python benchmark_pipeline.py --genome NC_000913.3.gb.gz
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import CompoundLocation, FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tamaños de los genomas sintéticos
+GENOME_SIZES = {'30kb': 30_000, '5mb': 5_000_000, '50mb': 50_000_000}
+DEFAULT_SIZES = ('30kb', '5mb')
+
+# Semilla y versión del generador: cambiar la versión si cambia el genoma generado
+BENCHMARK_SEED = 20240101
+GENERATOR_VERSION = 1
+
+# El genoma de 30 kb se distribuye con el repositorio; los grandes se generan una vez y se
+# guardan en la caché
+BUNDLED_FIXTURES = {'30kb': os.path.join(BASE_DIR, 'data', 'benchmark_30kb.gb.gz')}
+FIXTURE_DIR = os.path.join(BASE_DIR, 'cache', 'benchmark')
+DEFAULT_OUTPUT = os.path.join(FIXTURE_DIR, 'results.json')
+
+# Genes sintéticos: longitud en codones, separación entre genes (pb) y uno de cada
+# INTRON_EVERY con un intrón de INTRON_LENGTH pb; uno de cada RIBOSOMAL_EVERY es una
+# proteína ribosomal (referencia del CAI)
+GENE_CODONS = (100, 500)
+GENE_SPACER = (50, 400)
+INTRON_EVERY = 10
+INTRON_LENGTH = 120
+RIBOSOMAL_EVERY = 40
+
+# Cambio relativo a partir del cual una etapa cuenta como regresión, y duración mínima en la
+# línea base para tenerla en cuenta (las etapas más cortas son sobre todo ruido)
+REGRESSION_THRESHOLD = 0.10
+MIN_COMPARABLE_SECONDS = 0.01
+
+_COMPLEMENT = bytes.maketrans(b'ACGT', b'TGCA')
+_STOPS = (b'TAA', b'TAG', b'TGA')
+_SENSE_CODONS = np.array([(a, b, c) for a in b'TCAG' for b in b'TCAG' for c in b'TCAG'
+                          if bytes((a, b, c)) not in _STOPS], dtype=np.uint8)
+
+
+def synthetic_record(length: int, seed: int = BENCHMARK_SEED,
+                     accession_id: str = 'SYNTH_BENCH.1') -> SeqRecord:
+    """
+    Genoma bacteriano sintético y determinista: bases al azar y CDS (ATG, codones sin STOP y
+    un STOP) en ambas hebras, cada INTRON_EVERY con un intrón
+
+    Args:
+        length: Longitud en pb
+        seed: Semilla del generador
+        accession_id: ID del registro
+    """
+    rng = np.random.default_rng(seed)
+    bases = np.frombuffer(b'ACGT', dtype=np.uint8)[rng.integers(0, 4, length)]
+    features = [SeqFeature(FeatureLocation(0, length, strand=1), type='source',
+                           qualifiers={'organism': ['Synthetica benchmarkii'],
+                                       'mol_type': ['genomic DNA']})]
+
+    position = int(rng.integers(*GENE_SPACER))
+    index = 0
+    while True:
+        codons = int(rng.integers(*GENE_CODONS))
+        intron = INTRON_LENGTH if index % INTRON_EVERY == INTRON_EVERY - 1 else 0
+        span = codons * 3 + 6 + intron
+        if position + span > length:
+            break
+
+        body = _SENSE_CODONS[rng.integers(0, len(_SENSE_CODONS), codons)].tobytes()
+        cds = b'ATG' + body + _STOPS[int(rng.integers(0, 3))]
+        # El intrón corta el CDS en un límite de codón (GT...AG)
+        cut = 3 * (codons // 2)
+        intron_seq = (b'GT' + bytes(np.frombuffer(b'ACGT', dtype=np.uint8)[
+            rng.integers(0, 4, intron - 4)]) + b'AG') if intron else b''
+        gene = cds[:cut] + intron_seq + cds[cut:]
+        strand = 1 if rng.random() < 0.5 else -1
+        if strand == -1:
+            gene = gene.translate(_COMPLEMENT)[::-1]
+        bases[position:position + span] = np.frombuffer(gene, dtype=np.uint8)
+
+        start, end = position, position + span
+        if not intron:
+            location = FeatureLocation(start, end, strand=strand)
+        elif strand == 1:
+            location = CompoundLocation([FeatureLocation(start, start + cut, strand=1),
+                                         FeatureLocation(start + cut + intron, end, strand=1)])
+        else:
+            tail = len(cds) - cut
+            location = CompoundLocation([FeatureLocation(end - cut, end, strand=-1),
+                                         FeatureLocation(start, start + tail, strand=-1)])
+
+        locus_tag = f"SB_{index + 1:05d}"
+        product = (f"50S ribosomal protein L{index // RIBOSOMAL_EVERY + 1}"
+                   if index % RIBOSOMAL_EVERY == 0 else f"hypothetical protein {index + 1}")
+        features.append(SeqFeature(FeatureLocation(start, end, strand=strand), type='gene',
+                                   qualifiers={'locus_tag': [locus_tag]}))
+        features.append(SeqFeature(location, type='CDS', qualifiers={
+            'locus_tag': [locus_tag], 'product': [product], 'codon_start': ['1'],
+            'transl_table': ['11'], 'protein_id': [f"SBP_{index + 1:05d}.1"]
+        }))
+
+        position = end + int(rng.integers(*GENE_SPACER))
+        index += 1
+
+    record = SeqRecord(Seq(bases.tobytes().decode('ascii')), id=accession_id,
+                       name=accession_id.split('.')[0],
+                       description='Synthetica benchmarkii chromosome, complete genome',
+                       annotations={'molecule_type': 'DNA', 'topology': 'circular',
+                                    'data_file_division': 'BCT', 'date': '01-JAN-2024',
+                                    'organism': 'Synthetica benchmarkii',
+                                    'taxonomy': ['Bacteria', 'Synthetica']})
+    record.features = features
+    return record
+
+
+def write_fixture(record: SeqRecord, path: str):
+    """Guarda el registro como GenBank con gzip, de forma atómica y byte a byte reproducible"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as compressed:
+                with io.TextIOWrapper(compressed, encoding='ascii') as text:
+                    SeqIO.write(record, text, 'genbank')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fixture_path(size: str) -> str:
+    """Archivo del genoma sintético de ese tamaño, generándolo si no existe"""
+    path = BUNDLED_FIXTURES.get(size) or os.path.join(
+        FIXTURE_DIR, f"synthetic_{size}_v{GENERATOR_VERSION}_{BENCHMARK_SEED}.gb.gz")
+    if not os.path.exists(path):
+        print(f"Generando genoma sintético de {size} en {path}...", file=sys.stderr)
+        write_fixture(synthetic_record(GENOME_SIZES[size]), path)
+    return path
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_benchmark(path: str, name: str, include_pdf: bool = True) -> Dict:
+    """
+    Mide todas las etapas sobre un genoma, en este proceso
+
+    Returns:
+        Diccionario con length, cds, total_seconds, peak_rss_bytes y stages (lista de
+        etapas de stage_timing.StageTimer)
+    """
+    from gene_columns import columns_json_default, json_default
+    from gene_query import summarize_genes
+    from genome_analyzer import GenomeAnalyzer, GenomeComparator
+    from stage_timing import StageTimer
+
+    analyzer = GenomeAnalyzer(email='benchmark@example.com')
+    timer = StageTimer('benchmark', name)
+
+    with timer.stage('parse', os.path.getsize(path)):
+        genome_data = analyzer.load_genome(name, path)
+    analysis = analyzer.analyze_genome_data(genome_data, timer=timer)
+
+    # Comparación del genoma consigo mismo: el coste depende del tamaño de los análisis
+    with timer.stage('compare'):
+        GenomeComparator.compare(analysis, analysis)
+
+    with timer.stage('json') as entry:
+        entry['bytes'] = len(json.dumps(analysis, default=json_default))
+    with timer.stage('json_columns') as entry:
+        entry['bytes'] = len(json.dumps(analysis, default=columns_json_default))
+
+    if include_pdf:
+        from pdf_generator import PDFGenerator
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, 'report.pdf')
+            # El PDF se genera a partir de la respuesta de la API (sin la lista de CDS)
+            with timer.stage('pdf') as entry:
+                PDFGenerator(pdf_path).generate_single_genome_report(
+                    summarize_genes(analysis, ''))
+                entry['bytes'] = os.path.getsize(pdf_path)
+
+    summary = timer.summary()
+    return {
+        'length': genome_data['length'],
+        'cds': analysis['genes_analysis']['total_cds'],
+        'total_seconds': summary['total_seconds'],
+        'peak_rss_bytes': summary['peak_rss_bytes'],
+        'stages': summary['stages']
+    }
+
+
+def run_isolated(path: str, name: str, include_pdf: bool) -> Dict:
+    """run_benchmark en un proceso nuevo (spawn), para medir su pico de memoria por separado"""
+    with ProcessPoolExecutor(max_workers=1,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_benchmark, path, name, include_pdf).result()
+
+
+def aggregate_runs(runs: List[Dict]) -> Dict:
+    """
+    Resume las repeticiones de un genoma: mediana de la duración de cada etapa, rendimiento
+    con esa mediana y máximo del aumento del pico de memoria
+    """
+    stages = {}
+    for name in dict.fromkeys(entry['stage'] for run in runs for entry in run['stages']):
+        entries = [entry for run in runs for entry in run['stages'] if entry['stage'] == name]
+        seconds = statistics.median(entry['seconds'] for entry in entries)
+        bytes_processed = entries[0]['bytes']
+        rss = [entry['peak_rss_delta'] for entry in entries if entry['peak_rss_delta'] is not None]
+        stages[name] = {
+            'seconds': round(seconds, 6),
+            'bytes': bytes_processed,
+            'throughput_mb_s': (round(bytes_processed / seconds / 1e6, 3)
+                                if bytes_processed and seconds > 0 else None),
+            'peak_rss_delta': max(rss) if rss else None
+        }
+    peaks = [run['peak_rss_bytes'] for run in runs if run['peak_rss_bytes'] is not None]
+    return {
+        'length': runs[0]['length'],
+        'cds': runs[0]['cds'],
+        'repeat': len(runs),
+        'total_seconds': round(statistics.median(run['total_seconds'] for run in runs), 6),
+        'peak_rss_bytes': max(peaks) if peaks else None,
+        'stages': stages
+    }
+
+
+def environment() -> Dict:
+    """Versiones y máquina, para saber si dos resultados son comparables"""
+    import Bio
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'biopython': Bio.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': BENCHMARK_SEED,
+        'generator_version': GENERATOR_VERSION
+    }
+
+
+def compare_results(baseline: Dict, current: Dict,
+                    threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Cambio de la duración de cada etapa respecto a la línea base (sólo los genomas y etapas
+    presentes en ambas); la fila total suma esas etapas comunes
+
+    Returns:
+        Lista de {genome, stage, baseline_seconds, seconds, change, regression}
+    """
+    rows = []
+    for genome, result in current['genomes'].items():
+        base = baseline.get('genomes', {}).get(genome)
+        if base is None:
+            continue
+        if base.get('sha256') != result.get('sha256'):
+            print(f"Aviso: el genoma {genome} no es el mismo que en la línea base", file=sys.stderr)
+        common = [stage for stage in result['stages'] if stage in base['stages']]
+        pairs = [(stage, base['stages'][stage]['seconds'], result['stages'][stage]['seconds'])
+                 for stage in common]
+        pairs.append(('total', round(sum(before for _, before, _ in pairs), 6),
+                      round(sum(after for _, _, after in pairs), 6)))
+        for stage, before, after in pairs:
+            change = (after - before) / before if before > 0 else None
+            rows.append({
+                'genome': genome,
+                'stage': stage,
+                'baseline_seconds': before,
+                'seconds': after,
+                'change': round(change, 4) if change is not None else None,
+                'regression': (change is not None and change > threshold and
+                               before >= MIN_COMPARABLE_SECONDS)
+            })
+    return rows
+
+
+def print_results(results: Dict):
+    for genome, result in results['genomes'].items():
+        print(f"\n{genome}: {result['length']:,} pb, {result['cds']:,} CDS, "
+              f"{result['total_seconds']:.3f} s, pico RSS "
+              f"{(result['peak_rss_bytes'] or 0) / 2 ** 20:.0f} MiB")
+        print(f"  {'etapa':<18} {'tiempo (s)':>11} {'MB/s':>9} {'+RSS (MiB)':>11}")
+        for stage, entry in result['stages'].items():
+            throughput = f"{entry['throughput_mb_s']:.1f}" if entry['throughput_mb_s'] else '-'
+            rss = entry['peak_rss_delta']
+            rss = f"{rss / 2 ** 20:.1f}" if rss is not None else '-'
+            print(f"  {stage:<18} {entry['seconds']:>11.4f} {throughput:>9} {rss:>11}")
+
+
+def print_comparison(rows: List[Dict]):
+    print(f"\n{'genoma':<12} {'etapa':<18} {'base (s)':>10} {'ahora (s)':>10} {'cambio':>8}")
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row['change'] is not None else '-'
+        flag = '  REGRESIÓN' if row['regression'] else ''
+        print(f"{row['genome']:<12} {row['stage']:<18} {row['baseline_seconds']:>10.4f} "
+              f"{row['seconds']:>10.4f} {change:>8}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Mide el pipeline de análisis sobre genomas sintéticos o archivos propios"
+    )
+    parser.add_argument('--sizes', nargs='*', default=list(DEFAULT_SIZES),
+                        choices=list(GENOME_SIZES),
+                        help=f"Genomas sintéticos (defecto: {' '.join(DEFAULT_SIZES)}; "
+                             f"50mb necesita ~1 GB de memoria)")
+    parser.add_argument('--genome', action='append', default=[],
+                        help="Archivo GenBank propio (con o sin gzip); se puede repetir")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Repeticiones por genoma, cada una en un proceso nuevo (defecto: 1)")
+    parser.add_argument('--no-pdf', action='store_true', help="No medir la generación del PDF")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f"Archivo JSON de resultados (defecto: {DEFAULT_OUTPUT})")
+    parser.add_argument('--baseline', help="Resultados anteriores con los que comparar")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Cambio relativo que cuenta como regresión "
+                             f"(defecto: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    genomes = {size: fixture_path(size) for size in args.sizes}
+    for path in args.genome:
+        genomes[os.path.basename(path)] = path
+
+    results = {'environment': environment(), 'genomes': {}}
+    for name, path in genomes.items():
+        print(f"Midiendo {name} ({args.repeat} repetición/es)...", file=sys.stderr)
+        runs = [run_isolated(path, name, not args.no_pdf) for _ in range(args.repeat)]
+        results['genomes'][name] = {
+            'source': os.path.relpath(path, BASE_DIR) if name in GENOME_SIZES else path,
+            'sha256': file_sha256(path),
+            'file_bytes': os.path.getsize(path),
+            **aggregate_runs(runs)
+        }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"\nResultados en {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            rows = compare_results(json.load(f), results, args.threshold)
+        print_comparison(rows)
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Benchmark del escaneo de codones: bucle por posición (método anterior) vs escaneo vectorizado
+Usa una secuencia sintética de 5 Mb, no requiere acceso a NCBI
+"""
+import random
+import time
+
+from sequence_scanner import find_codon_positions
+
+SEQUENCE_LENGTH = 5_000_000
+CODONS = ['ATG', 'TAA', 'TAG', 'TGA']
+
+
+def legacy_scan(sequence: str) -> dict:
+    """Réplica del sliding window original de GenomeAnalyzer._analyze_codons"""
+    sequence_upper = sequence.upper()
+    positions = {codon: [] for codon in CODONS}
+    for i in range(len(sequence_upper) - 2):
+        codon = sequence_upper[i:i+3]
+        if codon in positions:
+            positions[codon].append(i)
+    return positions
+
+
+def main():
+    rng = random.Random(42)
+    sequence = ''.join(rng.choices('ACGT', k=SEQUENCE_LENGTH))
+    print(f"Secuencia sintética: {len(sequence):,} bp\n")
+
+    start = time.perf_counter()
+    legacy = legacy_scan(sequence)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = find_codon_positions(sequence, CODONS)
+    vectorized_time = time.perf_counter() - start
+
+    for codon in CODONS:
+        same = len(legacy[codon]) == len(vectorized[codon]) and \
+            list(vectorized[codon]) == legacy[codon]
+        print(f"  {codon}: {len(vectorized[codon]):,} posiciones [{'OK' if same else 'DIFERENTE'}]")
+
+    print(f"\nBucle por posición: {legacy_time:.3f} s")
+    print(f"Escaneo vectorizado: {vectorized_time:.3f} s")
+    print(f"Aceleración: {legacy_time / vectorized_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
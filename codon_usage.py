@@ -0,0 +1,222 @@
+"""
+Uso de codones de los CDS con operaciones matriciales: matriz de cuentas por gen (64
+codones), RSCU y CAI (Codon Adaptation Index, Sharp y Li 1987) frente a un conjunto de
+referencia
+"""
+from typing import List, Optional, Sequence
+import re
+
+import numpy as np
+
+from genetic_codes import (AMINO_ACIDS as TABLE_AMINO_ACIDS, DEFAULT_TABLE, dominant_table,
+                           table_counts)
+from sequence_scanner import INVALID_BASE, codon_to_index, encode_sequence
+
+
+# Orden de los codones en codon_frequency_64 (el de siempre, agrupados por aminoácido
+# del código estándar)
+CODON_ORDER = (
+    'TTT', 'TTC',
+    'TTA', 'TTG', 'CTT', 'CTC', 'CTA', 'CTG',
+    'ATT', 'ATC', 'ATA',
+    'ATG',
+    'GTT', 'GTC', 'GTA', 'GTG',
+    'TCT', 'TCC', 'TCA', 'TCG', 'AGT', 'AGC',
+    'CCT', 'CCC', 'CCA', 'CCG',
+    'ACT', 'ACC', 'ACA', 'ACG',
+    'GCT', 'GCC', 'GCA', 'GCG',
+    'TAT', 'TAC',
+    'TAA', 'TAG', 'TGA',
+    'CAT', 'CAC',
+    'CAA', 'CAG',
+    'AAT', 'AAC',
+    'AAA', 'AAG',
+    'GAT', 'GAC',
+    'GAA', 'GAG',
+    'TGT', 'TGC',
+    'TGG',
+    'CGT', 'CGC', 'CGA', 'CGG', 'AGA', 'AGG',
+    'GGT', 'GGC', 'GGA', 'GGG'
+)
+
+# Índice TCAG (0-63) de cada codón de CODON_ORDER
+TABLE_ORDER = np.array([codon_to_index(codon) for codon in CODON_ORDER], dtype=np.int64)
+
+# Aminoácido de cada índice TCAG en el código estándar
+AMINO_ACIDS = TABLE_AMINO_ACIDS[DEFAULT_TABLE]
+
+# Productos que forman el conjunto de referencia del CAI (genes muy expresados)
+REFERENCE_PRODUCT = re.compile(r'ribosomal protein', re.IGNORECASE)
+
+# Con menos genes de referencia se usan todos los CDS
+MIN_REFERENCE_GENES = 10
+
+# Cuenta que se suma a cada codón de la referencia (evita pesos 0 en codones no observados)
+REFERENCE_PSEUDOCOUNT = 0.5
+
+
+def codon_matrix(sequences: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    Cuentas de los 64 codones in-frame de cada secuencia
+
+    Todas las secuencias se codifican juntas y se cuentan con un único histograma sobre
+    (gen, codón); los codones con bases ambiguas y las bases sobrantes del final se ignoran.
+
+    Args:
+        sequences: Secuencias CDS en mayúsculas (None para las no disponibles)
+
+    Returns:
+        Matriz int64 de len(sequences) x 64 (columnas en orden TCAG)
+    """
+    lengths = np.array([len(seq) // 3 * 3 if seq else 0 for seq in sequences], dtype=np.int64)
+    if not lengths.any():
+        return np.zeros((len(sequences), 64), dtype=np.int64)
+
+    joined = ''.join(seq[:length] for seq, length in zip(sequences, lengths.tolist()) if length)
+    codes = encode_sequence(joined).reshape(-1, 3).astype(np.int64)
+    indices = codes[:, 0] * 16 + codes[:, 1] * 4 + codes[:, 2]
+    # Columna 64: codones con alguna base ambigua (se descarta)
+    indices[(codes == INVALID_BASE).any(axis=1)] = 64
+
+    genes = np.repeat(np.arange(len(sequences), dtype=np.int64), lengths // 3)
+    counts = np.bincount(genes * 65 + indices, minlength=len(sequences) * 65)
+    return counts.reshape(len(sequences), 65)[:, :64]
+
+
+def synonym_families(amino_acids: Sequence[str] = AMINO_ACIDS) -> np.ndarray:
+    """Matriz 64 x familias con un 1 en la familia de codones sinónimos de cada codón"""
+    _, family = np.unique(np.asarray(amino_acids), return_inverse=True)
+    return np.eye(family.max() + 1, dtype=np.float64)[family]
+
+
+def rscu(counts: np.ndarray, amino_acids: Sequence[str] = AMINO_ACIDS) -> np.ndarray:
+    """
+    Relative Synonymous Codon Usage: cuenta de cada codón dividida por la media de su familia
+
+    Args:
+        counts: Vector de 64 cuentas o matriz genes x 64 (orden TCAG)
+        amino_acids: Aminoácido de cada codón
+
+    Returns:
+        Arreglo de la misma forma; 0 en las familias sin ningún codón observado
+    """
+    families = synonym_families(amino_acids)
+    counts = np.asarray(counts, dtype=np.float64)
+    expected = (counts @ families / families.sum(axis=0)) @ families.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(expected > 0, counts / expected, 0.0)
+
+
+def relative_adaptiveness(reference_counts: np.ndarray,
+                          amino_acids: Sequence[str] = AMINO_ACIDS) -> np.ndarray:
+    """
+    Pesos w del CAI: frecuencia de cada codón en la referencia relativa al sinónimo más usado
+
+    Returns:
+        Vector de 64 pesos en (0, 1]; NaN en los codones que no cuentan para el CAI
+        (familias de un solo codón, como Met y Trp, y los STOP)
+    """
+    families = synonym_families(amino_acids)
+    counts = np.asarray(reference_counts, dtype=np.float64) + REFERENCE_PSEUDOCOUNT
+    family_max = (families * counts[:, None]).max(axis=0)
+    weights = counts / (families @ family_max)
+    excluded = (families @ families.sum(axis=0) == 1) | (np.asarray(amino_acids) == 'Stop')
+    weights[excluded] = np.nan
+    return weights
+
+
+def codon_adaptation_index(matrix: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    CAI de cada gen: media geométrica de los pesos de sus codones
+
+    Args:
+        matrix: Cuentas genes x 64 (ver codon_matrix)
+        weights: Pesos de relative_adaptiveness
+
+    Returns:
+        Vector con el CAI de cada gen; NaN en los genes sin codones que cuenten
+    """
+    used = ~np.isnan(weights)
+    log_weights = np.where(used, np.log(np.where(used, weights, 1.0)), 0.0)
+    codons = matrix @ used.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(codons > 0, np.exp(matrix @ log_weights / codons), np.nan)
+
+
+class CodonUsage:
+    """
+    Uso de codones de los CDS de un registro: matriz por gen, totales, RSCU y CAI.
+
+    Cada CDS se interpreta con su tabla de traducción (transl_table). Los totales y el RSCU
+    usan la tabla más frecuente del registro (genetic_code); el CAI de cada CDS usa los
+    pesos de su propia tabla.
+
+    La referencia del CAI son los CDS de proteínas ribosomales (REFERENCE_PRODUCT); si hay
+    menos de MIN_REFERENCE_GENES con secuencia se usan todos los CDS.
+    """
+
+    __slots__ = ('matrix', 'analyzed', 'totals', 'tables', 'genetic_code', 'amino_acids',
+                 'reference', 'reference_genes', 'weights', 'cai')
+
+    def __init__(self, sequences: Sequence[Optional[str]], products: Sequence[str],
+                 tables: Optional[Sequence[int]] = None):
+        """
+        Args:
+            sequences: Secuencias de los CDS (None si no están disponibles)
+            products: Producto de cada CDS (para elegir la referencia)
+            tables: Tabla de traducción de cada CDS (por defecto, la estándar)
+        """
+        self.matrix = codon_matrix(sequences)
+        # CDS con al menos un codón completo (aunque sea ambiguo)
+        self.analyzed = sum(1 for seq in sequences if seq is not None and len(seq) >= 3)
+        self.totals = self.matrix.sum(axis=0)
+        self.tables = (np.full(len(sequences), DEFAULT_TABLE, dtype=np.int64) if tables is None
+                       else np.asarray(tables, dtype=np.int64))
+        self.genetic_code = dominant_table(self.tables.tolist())
+        self.amino_acids = TABLE_AMINO_ACIDS[self.genetic_code]
+
+        with_codons = self.matrix.any(axis=1)
+        reference = np.array([REFERENCE_PRODUCT.search(product or '') is not None
+                              for product in products], dtype=bool)
+        reference &= with_codons
+        if np.count_nonzero(reference) >= MIN_REFERENCE_GENES:
+            self.reference = 'ribosomal_proteins'
+        else:
+            self.reference = 'all_cds'
+            reference = with_codons
+        self.reference_genes = int(np.count_nonzero(reference))
+
+        # Pesos y CAI por tabla (una tabla sin genes de referencia usa todos sus CDS)
+        self.weights = {}
+        self.cai = np.full(len(sequences), np.nan)
+        for table in np.unique(self.tables).tolist():
+            genes = self.tables == table
+            table_reference = reference & genes
+            if not table_reference.any():
+                table_reference = with_codons & genes
+            self.weights[table] = relative_adaptiveness(self.matrix[table_reference].sum(axis=0),
+                                                        TABLE_AMINO_ACIDS[table])
+            self.cai[genes] = codon_adaptation_index(self.matrix[genes], self.weights[table])
+
+    def codon_rscu(self) -> np.ndarray:
+        """RSCU de los totales con la tabla del registro (orden TCAG)"""
+        return rscu(self.totals, self.amino_acids)
+
+    def gene_cai(self) -> List[Optional[float]]:
+        """CAI de cada CDS redondeado (None si no tiene codones que cuenten)"""
+        return [None if np.isnan(value) else round(value, 4) for value in self.cai.tolist()]
+
+    def genetic_codes(self) -> dict:
+        """Número de CDS por tabla de traducción"""
+        return table_counts(self.tables.tolist())
+
+    def cai_summary(self) -> dict:
+        """Referencia usada y estadísticas del CAI de los CDS"""
+        values = self.cai[~np.isnan(self.cai)]
+        return {
+            'reference': self.reference,
+            'reference_genes': self.reference_genes,
+            'average': round(float(values.mean()), 4) if len(values) else None,
+            'min': round(float(values.min()), 4) if len(values) else None,
+            'max': round(float(values.max()), 4) if len(values) else None
+        }
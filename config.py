@@ -19,9 +19,52 @@ class Config:
     
     # NCBI Configuration
     NCBI_API_KEY = os.getenv('NCBI_API_KEY', None)  # Opcional, aumenta rate limit
+    # Requests/segundo a NCBI: 10 con API key, 3 sin ella
+    NCBI_RATE_LIMIT = float(os.getenv('NCBI_RATE_LIMIT', 10 if NCBI_API_KEY else 3))
+    # Estado compartido del rate limit entre procesos worker (vacío = sólo dentro de cada proceso)
+    NCBI_RATE_LIMIT_FILE = os.getenv('NCBI_RATE_LIMIT_FILE', os.path.join(BASE_DIR, 'cache', 'ncbi_rate_limit.state'))
+    
+    # Análisis
+    MIN_ORF_LENGTH = int(os.getenv('MIN_ORF_LENGTH', 100))  # nt mínimos de un ORF potencial
+    MAX_SEQUENCE_LENGTH = int(os.getenv('MAX_SEQUENCE_LENGTH', 300_000_000))  # bases cargadas en memoria
+    
+    # Caché en disco de registros GenBank (RECORD_CACHE_DIR vacío para desactivarla)
+    RECORD_CACHE_DIR = os.getenv('RECORD_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'records'))
+    RECORD_CACHE_MAX_MB = int(os.getenv('RECORD_CACHE_MAX_MB', 2048))
+    RECORD_CACHE_TTL_HOURS = float(os.getenv('RECORD_CACHE_TTL_HOURS', 24))
+    
+    # Caché de resultados de análisis: LRU en memoria + nivel opcional en disco compartido
+    RESULT_CACHE_ENTRIES = int(os.getenv('RESULT_CACHE_ENTRIES', 16))
+    RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'results'))
+    RESULT_CACHE_MAX_MB = int(os.getenv('RESULT_CACHE_MAX_MB', 512))
+    # Índices en memoria de los CDS de los últimos genomas consultados en /api/genome/<id>/genes
+    GENE_INDEX_ENTRIES = int(os.getenv('GENE_INDEX_ENTRIES', 8))
+    
+    # Procesos para el análisis CPU de /api/compare (0 = analizar en los hilos de la petición)
+    ANALYSIS_PROCESSES = int(os.getenv('ANALYSIS_PROCESSES', 2))
+    
+    # Análisis por lotes (/api/analyze/batch y batch_analysis.py)
+    BATCH_GROUP_SIZE = int(os.getenv('BATCH_GROUP_SIZE', 20))  # Accesiones por petición efetch
+    BATCH_MAX_GENOMES = int(os.getenv('BATCH_MAX_GENOMES', 500))  # Máximo por petición HTTP
+    
+    # Trabajos asíncronos de análisis (cola SQLite local)
+    JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', os.path.join(BASE_DIR, 'cache', 'jobs.sqlite3'))
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # Hilos por proceso que ejecutan trabajos
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+    
+    # Compresión de respuestas (gzip, y brotli si el paquete está instalado)
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    
+    # Perfilado por etapas: una línea JSON por etapa de cada análisis y PDF (logger genome.profile)
+    PROFILE_STAGES = os.getenv('PROFILE_STAGES', 'false').lower() in ('1', 'true', 'yes')
+    # Métricas de /metrics: un archivo por proceso worker en este directorio (vacío = sólo el proceso)
+    METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(BASE_DIR, 'cache', 'metrics'))
     
     # Upload Configuration
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_MB', 16)) * 1024 * 1024  # 16MB max por defecto
+    # Directorio temporal de los genomas subidos a /api/analyze/upload (vacío = el del sistema)
+    UPLOAD_DIR = os.getenv('UPLOAD_DIR', '')
     
     # CORS
     CORS_HEADERS = 'Content-Type'
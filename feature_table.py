@@ -0,0 +1,108 @@
+"""
+Tabla compacta de features de un registro GenBank, construida en una sola pasada
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+
+from codon_usage import CodonUsage
+from genetic_codes import dominant_table, table_id
+from interval_index import IntervalIndex
+
+
+class CDSEntry:
+    """Un CDS con su ubicación, su tabla de traducción y su secuencia ya extraída"""
+    __slots__ = ('feature', 'start', 'end', 'strand', 'parts', 'transl_table', 'sequence')
+
+    def __init__(self, feature, sequence: Optional[str]):
+        self.feature = feature
+        self.start = int(feature.location.start)
+        self.end = int(feature.location.end)
+        self.strand = feature.location.strand
+        self.parts = [(int(part.start), int(part.end)) for part in feature.location.parts]
+        self.transl_table = table_id(feature.qualifiers.get('transl_table', [None])[0])
+        # Secuencia en mayúsculas (None si el registro no tiene secuencia)
+        self.sequence = sequence
+
+    @property
+    def qualifiers(self):
+        return self.feature.qualifiers
+
+
+class SplicedFeature:
+    """Un mRNA o CDS con más de una parte (exones)"""
+    __slots__ = ('type', 'gene', 'strand', 'parts')
+
+    def __init__(self, feature):
+        self.type = feature.type
+        self.gene = feature.qualifiers.get('gene', ['Unknown'])[0]
+        self.strand = feature.location.strand
+        self.parts = [(int(part.start), int(part.end)) for part in feature.location.parts]
+
+
+class FeatureTable:
+    """
+    Recorre record.features una única vez y guarda lo que necesitan todos los
+    análisis de GenomeAnalyzer: nombres del source, número de genes, los CDS
+    (con su secuencia extraída una sola vez) y los features con estructura de exones
+    """
+
+    def __init__(self, record):
+        """
+        Args:
+            record: SeqRecord de Biopython
+        """
+        self.source_names: List[str] = []
+        self.gene_count = 0
+        self.cds: List[CDSEntry] = []
+        self.spliced: List[SplicedFeature] = []
+        self._cds_index: Optional[IntervalIndex] = None
+        self._codon_usage: Optional[CodonUsage] = None
+
+        for feature in record.features:
+            if feature.type == 'source':
+                self.source_names.extend(feature.qualifiers.get('organism', []))
+                self.source_names.extend(feature.qualifiers.get('strain', []))
+            elif feature.type == 'gene':
+                self.gene_count += 1
+            elif feature.type == 'CDS':
+                self.cds.append(CDSEntry(feature, self._extract(feature, record)))
+
+            if feature.type in ('mRNA', 'CDS') and len(feature.location.parts) > 1:
+                self.spliced.append(SplicedFeature(feature))
+
+    @staticmethod
+    def _extract(feature, record) -> Optional[str]:
+        """Extrae la secuencia del feature; None si la secuencia no está definida"""
+        try:
+            return str(feature.extract(record.seq)).upper()
+        except Exception:
+            return None
+
+    @property
+    def cds_coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Arreglos (starts, ends) de los CDS en el orden del registro"""
+        starts = np.fromiter((cds.start for cds in self.cds), dtype=np.int64, count=len(self.cds))
+        ends = np.fromiter((cds.end for cds in self.cds), dtype=np.int64, count=len(self.cds))
+        return starts, ends
+
+    @property
+    def cds_index(self) -> IntervalIndex:
+        """Índice de intervalos de los CDS (span completo), compartido entre análisis"""
+        if self._cds_index is None:
+            self._cds_index = IntervalIndex((cds.start, cds.end) for cds in self.cds)
+        return self._cds_index
+
+    @property
+    def genetic_code(self) -> int:
+        """Tabla de traducción más frecuente entre los CDS (la estándar si no hay CDS)"""
+        return dominant_table(cds.transl_table for cds in self.cds)
+
+    @property
+    def codon_usage(self) -> CodonUsage:
+        """Uso de codones de los CDS (matriz por gen, RSCU y CAI), compartido entre análisis"""
+        if self._codon_usage is None:
+            self._codon_usage = CodonUsage(
+                [cds.sequence for cds in self.cds],
+                [cds.qualifiers.get('product', [''])[0] for cds in self.cds],
+                [cds.transl_table for cds in self.cds])
+        return self._codon_usage
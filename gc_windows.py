@@ -0,0 +1,129 @@
+"""
+Contenido GC y GC skew por ventanas a varias resoluciones, en una sola pasada sobre la
+secuencia empaquetada (sumas acumuladas de G y C evaluadas en los límites de las ventanas)
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from packed_sequence import PACK_CHUNK_SIZE, UNPACK, PackedSequence
+from sequence_scanner import NUCLEOTIDE_ORDER
+
+
+# Tamaños de ventana (pb) de la pirámide de resoluciones, de más fina a más gruesa
+GC_WINDOW_SIZES = (1_000, 10_000, 100_000)
+
+# Ventanas máximas por nivel: en genomas grandes se omiten los niveles más finos
+MAX_WINDOWS = 20_000
+
+# Byte empaquetado -> cuántas de sus cuatro bases son G / C
+G_PER_BYTE = (UNPACK == NUCLEOTIDE_ORDER.index('G')).sum(axis=1).astype(np.int64)
+C_PER_BYTE = (UNPACK == NUCLEOTIDE_ORDER.index('C')).sum(axis=1).astype(np.int64)
+
+
+def cumulative_gc_counts(sequence: PackedSequence,
+                         positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Número de G, de C y de bases A/C/G/T en [0, p) para cada posición p
+
+    Args:
+        sequence: Secuencia empaquetada
+        positions: Posiciones ordenadas, múltiplos de 4 o iguales a la longitud
+
+    Returns:
+        Tupla (g, c, acgt) de arreglos int64 alineados con positions
+    """
+    # Las bases ambiguas y el relleno del último byte se empaquetaron como T: no suman G ni C
+    byte_positions = (positions + 3) // 4
+    g = np.zeros(len(positions), dtype=np.int64)
+    c = np.zeros(len(positions), dtype=np.int64)
+    total_g = total_c = 0
+    for offset in range(0, len(sequence.packed), PACK_CHUNK_SIZE):
+        chunk = sequence.packed[offset:offset + PACK_CHUNK_SIZE]
+        g_sums = np.cumsum(G_PER_BYTE[chunk])
+        c_sums = np.cumsum(C_PER_BYTE[chunk])
+        first = np.searchsorted(byte_positions, offset, side='right')
+        last = np.searchsorted(byte_positions, offset + len(chunk), side='right')
+        inside = byte_positions[first:last] - offset - 1
+        g[first:last] = total_g + g_sums[inside]
+        c[first:last] = total_c + c_sums[inside]
+        total_g += int(g_sums[-1])
+        total_c += int(c_sums[-1])
+
+    return g, c, positions - _ambiguous_before(sequence, positions)
+
+
+def _ambiguous_before(sequence: PackedSequence, positions: np.ndarray) -> np.ndarray:
+    """Bases ambiguas (tramos de PackedSequence) en [0, p) para cada posición p"""
+    run_lengths = sequence.run_ends - sequence.run_starts
+    if len(run_lengths) == 0:
+        return np.zeros(len(positions), dtype=np.int64)
+    finished = np.concatenate([[0], np.cumsum(run_lengths)])
+    # Tramos que acaban antes de p, más la parte del tramo que contiene p (si lo hay)
+    index = np.searchsorted(sequence.run_ends, positions, side='right')
+    partial = np.zeros(len(positions), dtype=np.int64)
+    open_run = index < len(run_lengths)
+    partial[open_run] = np.maximum(
+        positions[open_run] - sequence.run_starts[index[open_run]], 0)
+    return finished[index] + partial
+
+
+def _nullable(values: np.ndarray, defined: np.ndarray, decimals: int) -> List[Optional[float]]:
+    """Lista JSON con None en las ventanas sin valor"""
+    rounded = np.round(values, decimals).tolist()
+    return [value if ok else None for value, ok in zip(rounded, defined.tolist())]
+
+
+def gc_windows(sequence: Optional[PackedSequence],
+               window_sizes: Sequence[int] = GC_WINDOW_SIZES,
+               max_windows: int = MAX_WINDOWS) -> Optional[Dict]:
+    """
+    Pirámide de GC y GC skew por ventanas, calculada en una sola pasada
+
+    Por nivel: gc (% de G+C sobre las bases A/C/G/T de la ventana; None si no tiene
+    ninguna), skew ((G - C) / (G + C)) y cumulative_skew (suma acumulada del skew, cuyo
+    mínimo y máximo suelen marcar el origen y el término de replicación en bacterias).
+    La última ventana de cada nivel puede ser más corta.
+
+    Args:
+        sequence: Secuencia empaquetada (None si no se cargó)
+        window_sizes: Tamaños de ventana en pb (múltiplos de 4)
+        max_windows: Se omiten los niveles con más ventanas
+
+    Returns:
+        Diccionario con length y levels, o None si no hay secuencia
+    """
+    if sequence is None or len(sequence) == 0:
+        return None
+    length = len(sequence)
+    if any(size <= 0 or size % 4 for size in window_sizes):
+        raise ValueError("Los tamaños de ventana deben ser múltiplos positivos de 4")
+
+    sizes = [size for size in sorted(window_sizes) if -(-length // size) <= max_windows]
+    if not sizes:
+        return {'length': length, 'levels': []}
+
+    # Límites de las ventanas de todos los niveles: una sola pasada para la pirámide entera
+    bounds = {size: np.append(np.arange(0, length, size, dtype=np.int64), length) for size in sizes}
+    positions = np.unique(np.concatenate(list(bounds.values())))
+    g, c, acgt = cumulative_gc_counts(sequence, positions)
+
+    levels = []
+    for size in sizes:
+        at = np.searchsorted(positions, bounds[size])
+        window_g = np.diff(g[at])
+        window_c = np.diff(c[at])
+        window_acgt = np.diff(acgt[at])
+        strong = window_g + window_c
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gc = np.where(window_acgt > 0, strong / window_acgt * 100, 0.0)
+            skew = np.where(strong > 0, (window_g - window_c) / strong, 0.0)
+        levels.append({
+            'window_size': size,
+            'windows': len(window_g),
+            'gc': _nullable(gc, window_acgt > 0, 2),
+            'skew': np.round(skew, 4).tolist(),
+            'cumulative_skew': np.round(np.cumsum(skew), 4).tolist()
+        })
+
+    return {'length': length, 'levels': levels}
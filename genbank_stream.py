@@ -0,0 +1,141 @@
+"""
+Lectura en streaming de registros GenBank: Biopython parsea la cabecera y las features,
+y la secuencia se empaqueta línea a línea (2 bits por base) en un PackedSequence
+"""
+from typing import BinaryIO, Iterator, List, Optional, TextIO, Union
+import gzip
+import string
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from packed_sequence import PackedSequence, PackedSequenceBuilder
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Limpieza de las líneas de secuencia: numeración y espacios fuera, bases en mayúsculas
+_SEQUENCE_NOISE = b' \t\r\n0123456789'
+_UPPER_BYTES = bytes.maketrans(string.ascii_lowercase.encode('ascii'),
+                               string.ascii_uppercase.encode('ascii'))
+_UPPER_STR = str.maketrans(string.ascii_lowercase, string.ascii_uppercase,
+                           _SEQUENCE_NOISE.decode('ascii'))
+
+Handle = Union[TextIO, BinaryIO]
+
+
+class _HeaderReader:
+    """
+    Vista de texto de un registro que se corta en la línea ORIGIN.
+
+    Biopython ve cabecera + features seguidas de un ORIGIN vacío, así que construye
+    el SeqRecord sin secuencia; las líneas de secuencia quedan sin leer en el handle.
+    """
+
+    def __init__(self, handle: Handle):
+        self._handle = handle
+        self._pending: List[str] = []
+        self._finished = False
+        self.has_origin = False
+
+    def readline(self) -> str:
+        if self._pending:
+            return self._pending.pop(0)
+        if self._finished:
+            return ''
+
+        line = self._handle.readline()
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        if not line:
+            self._finished = True
+        elif line.startswith('ORIGIN'):
+            self.has_origin = True
+            self._pending.append('//\n')
+            self._finished = True
+        elif line.startswith('//'):
+            self._finished = True
+        return line
+
+    def read(self, size: int = -1) -> str:
+        if size == 0:
+            return ''
+        return ''.join(iter(self.readline, ''))
+
+
+def _read_sequence(handle: Handle, keep: bool) -> Optional[PackedSequence]:
+    """
+    Consume las líneas de secuencia hasta '//'
+
+    Args:
+        handle: Handle posicionado justo después de la línea ORIGIN
+        keep: False para descartar la secuencia (registro por encima del límite)
+
+    Returns:
+        Secuencia empaquetada (None si keep es False)
+    """
+    builder = PackedSequenceBuilder()
+    while True:
+        line = handle.readline()
+        if not line:
+            break
+        if isinstance(line, bytes):
+            if line.startswith(b'//'):
+                break
+            if keep:
+                builder.write(line.translate(_UPPER_BYTES, _SEQUENCE_NOISE))
+        else:
+            if line.startswith('//'):
+                break
+            if keep:
+                builder.write(line.translate(_UPPER_STR).encode('ascii', 'replace'))
+    return builder.finish() if keep else None
+
+
+def iter_genbank(handle: Handle, max_sequence_length: Optional[int] = None) -> Iterator[SeqRecord]:
+    """
+    Itera los registros de un archivo GenBank sin cargarlo entero en memoria
+
+    Args:
+        handle: Archivo abierto en modo texto o binario (ej: respuesta de Entrez.efetch)
+        max_sequence_length: Longitud máxima de secuencia a conservar; los registros más
+                             largos se devuelven con la secuencia sin definir (None = sin límite,
+                             0 = no leer la secuencia)
+
+    Returns:
+        Iterador de SeqRecord; record.seq está respaldado por un PackedSequence
+        (record.seq._data), que desempaqueta sólo las regiones que se piden
+    """
+    while True:
+        header = _HeaderReader(handle)
+        record = next(SeqIO.parse(header, 'genbank'), None)
+        if record is None:
+            return
+
+        if header.has_origin:
+            keep = max_sequence_length is None or len(record) <= max_sequence_length
+            sequence = _read_sequence(handle, keep)
+            if sequence is not None and len(sequence) > 0:
+                record.seq = Seq(sequence)
+        yield record
+
+
+def read_genbank(handle: Handle, max_sequence_length: Optional[int] = None) -> SeqRecord:
+    """
+    Lee el primer registro de un archivo GenBank (ver iter_genbank)
+
+    Raises:
+        ValueError: Si el archivo no contiene ningún registro
+    """
+    record = next(iter_genbank(handle, max_sequence_length), None)
+    if record is None:
+        raise ValueError("No se encontró ningún registro GenBank")
+    return record
+
+
+def open_genbank(path: str) -> BinaryIO:
+    """Abre en modo binario un archivo GenBank, comprimido con gzip o no"""
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    return gzip.open(path, 'rb') if magic == GZIP_MAGIC else open(path, 'rb')
@@ -0,0 +1,294 @@
+"""
+Representación columnar de las listas por gen del análisis (cds_details y genes_with_structure)
+
+Cada tabla guarda una lista por campo (arreglos NumPy para los numéricos) en lugar de un
+diccionario por gen, y se serializa con la forma JSON de siempre (to_records) o con una
+forma compacta orientada a columnas (to_columns).
+"""
+from typing import Any, Dict, Iterator, List, Sequence, Union
+import numpy as np
+
+
+COLUMNS_FORMAT = 'columns'
+COLUMNS_MIMETYPE = 'application/vnd.genome.columns+json'
+
+
+class ColumnTable:
+    """
+    Tabla de columnas paralelas, una fila por elemento.
+
+    Las subclases declaran FIELDS (en orden), INT_FIELDS y BOOL_FIELDS (guardados en
+    arreglos NumPy; el resto son listas de objetos Python) y KIND (para la forma columnar).
+    """
+
+    __slots__ = ('columns',)
+
+    KIND = ''
+    FIELDS: Sequence[str] = ()
+    INT_FIELDS: Sequence[str] = ()
+    BOOL_FIELDS: Sequence[str] = ()
+
+    def __init__(self, **columns):
+        """
+        Args:
+            **columns: Una secuencia por cada campo de FIELDS, todas de la misma longitud
+        """
+        missing = set(self.FIELDS) - set(columns)
+        if missing:
+            raise ValueError(f"Faltan columnas en {type(self).__name__}: {sorted(missing)}")
+        self.columns = {}
+        for name in self.FIELDS:
+            values = columns[name]
+            if name in self.INT_FIELDS:
+                values = np.asarray(values, dtype=np.int64)
+            elif name in self.BOOL_FIELDS:
+                values = np.asarray(values, dtype=bool)
+            else:
+                values = list(values)
+            self.columns[name] = values
+        if len({len(values) for values in self.columns.values()}) > 1:
+            raise ValueError(f"Las columnas de {type(self).__name__} tienen longitudes distintas")
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple], **extra) -> 'ColumnTable':
+        """
+        Construye la tabla a partir de tuplas con los valores de FIELDS en orden
+
+        Args:
+            rows: Una tupla por fila
+            **extra: Argumentos adicionales del constructor (ej: tablas hijas)
+        """
+        columns = list(zip(*rows)) if rows else [()] * len(cls.FIELDS)
+        return cls(**dict(zip(cls.FIELDS, columns)), **extra)
+
+    def __len__(self) -> int:
+        return len(self.columns[self.FIELDS[0]]) if self.FIELDS else 0
+
+    def __getitem__(self, index: slice) -> 'ColumnTable':
+        """Sub-tabla con las filas de un slice (ej: una página)"""
+        if not isinstance(index, slice):
+            raise TypeError("Las tablas columnares sólo admiten slices; usar take()")
+        return self.take(np.arange(len(self))[index])
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.to_records())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ColumnTable):
+            return type(self) is type(other) and self.to_columns() == other.to_columns()
+        if isinstance(other, list):
+            return self.to_records() == other
+        return NotImplemented
+
+    def column(self, name: str) -> Union[np.ndarray, list]:
+        """Columna de un campo (arreglo NumPy o lista; no modificarla)"""
+        return self.columns[name]
+
+    def take(self, indices: Sequence[int]) -> 'ColumnTable':
+        """Nueva tabla con las filas indicadas, en ese orden"""
+        return type(self)(**self._take_columns(np.asarray(indices, dtype=np.int64)))
+
+    def _take_columns(self, indices: np.ndarray) -> Dict[str, Union[np.ndarray, list]]:
+        return {
+            name: values[indices] if isinstance(values, np.ndarray)
+            else [values[i] for i in indices.tolist()]
+            for name, values in self.columns.items()
+        }
+
+    def _plain_columns(self) -> Dict[str, list]:
+        """Columnas como listas de tipos Python (serializables a JSON)"""
+        return {
+            name: values.tolist() if isinstance(values, np.ndarray) else values
+            for name, values in self.columns.items()
+        }
+
+    def to_records(self) -> List[Dict]:
+        """Lista de diccionarios, uno por fila (la forma JSON de siempre)"""
+        columns = self._plain_columns()
+        return [dict(zip(self.FIELDS, row)) for row in zip(*(columns[name] for name in self.FIELDS))]
+
+    def to_columns(self) -> Dict:
+        """Forma compacta: {'format': 'columns', 'kind', 'rows', campo: [valores], ...}"""
+        return {'format': COLUMNS_FORMAT, 'kind': self.KIND, 'rows': len(self),
+                **self._plain_columns()}
+
+    @classmethod
+    def from_columns(cls, data: Dict) -> 'ColumnTable':
+        """
+        Reconstruye la tabla a partir de to_columns
+
+        Los campos que faltan (tablas guardadas antes de añadirlos) quedan en None.
+        """
+        missing = [None] * data.get('rows', 0)
+        return cls(**{name: data.get(name, missing) for name in cls.FIELDS})
+
+
+class CDSColumns(ColumnTable):
+    """cds_details de genes_analysis: un CDS por fila"""
+
+    __slots__ = ()
+
+    KIND = 'cds'
+    FIELDS = ('gene', 'product', 'start', 'end', 'strand', 'length', 'protein_id',
+              'locus_tag', 'db_xref', 'codon_start', 'protein_length', 'note', 'cai')
+    INT_FIELDS = ('start', 'end', 'length', 'codon_start', 'protein_length')
+
+    def to_records(self) -> List[Dict]:
+        c = self._plain_columns()
+        return [
+            {
+                'gene': gene,
+                'product': product,
+                'location': {'start': start, 'end': end, 'strand': strand},
+                'length': length,
+                'protein_id': protein_id,
+                'locus_tag': locus_tag,
+                'db_xref': db_xref,
+                'codon_start': codon_start,
+                'protein_length': protein_length,
+                'note': note,
+                'cai': cai
+            }
+            for gene, product, start, end, strand, length, protein_id, locus_tag, db_xref,
+            codon_start, protein_length, note, cai in zip(*(c[name] for name in self.FIELDS))
+        ]
+
+
+class ExonColumns(ColumnTable):
+    """Exones de todos los genes de GeneStructureColumns, seguidos"""
+
+    __slots__ = ()
+
+    KIND = 'exon'
+    FIELDS = ('start', 'end')
+    INT_FIELDS = ('start', 'end')
+
+
+class IntronColumns(ColumnTable):
+    """Intrones de todos los genes de GeneStructureColumns, seguidos"""
+
+    __slots__ = ()
+
+    KIND = 'intron'
+    FIELDS = ('start', 'end', 'donor', 'acceptor', 'is_canonical')
+    INT_FIELDS = ('start', 'end')
+    BOOL_FIELDS = ('is_canonical',)
+
+
+class GeneStructureColumns(ColumnTable):
+    """
+    genes_with_structure de introns_exons: un gen por fila.
+
+    Los exones e intrones de cada gen están en las tablas exons/introns, en el orden de
+    los genes: los del gen i empiezan donde acaban los de los genes anteriores
+    (exon_count / intron_count).
+    """
+
+    __slots__ = ('exons', 'introns')
+
+    KIND = 'gene_structure'
+    FIELDS = ('gene', 'strand', 'exon_count', 'intron_count', 'all_canonical')
+    INT_FIELDS = ('exon_count', 'intron_count')
+    BOOL_FIELDS = ('all_canonical',)
+
+    def __init__(self, exons: Union[ExonColumns, Dict], introns: Union[IntronColumns, Dict],
+                 **columns):
+        super().__init__(**columns)
+        self.exons = exons if isinstance(exons, ExonColumns) else ExonColumns(**exons)
+        self.introns = introns if isinstance(introns, IntronColumns) else IntronColumns(**introns)
+        if (int(self.columns['exon_count'].sum()) != len(self.exons) or
+                int(self.columns['intron_count'].sum()) != len(self.introns)):
+            raise ValueError("exon_count / intron_count no coinciden con las tablas de exones e intrones")
+
+    @staticmethod
+    def _child_indices(counts: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """Filas de la tabla hija que pertenecen a los genes indicados"""
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        if len(indices) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in indices.tolist()])
+
+    def take(self, indices: Sequence[int]) -> 'GeneStructureColumns':
+        indices = np.asarray(indices, dtype=np.int64)
+        return GeneStructureColumns(
+            exons=self.exons.take(self._child_indices(self.columns['exon_count'], indices)),
+            introns=self.introns.take(self._child_indices(self.columns['intron_count'], indices)),
+            **self._take_columns(indices)
+        )
+
+    def to_records(self) -> List[Dict]:
+        c = self._plain_columns()
+        exons = self.exons._plain_columns()
+        introns = self.introns._plain_columns()
+        records = []
+        exon_at = intron_at = 0
+        for gene, strand, exon_count, intron_count, all_canonical in zip(
+                *(c[name] for name in self.FIELDS)):
+            gene_exons = [
+                {'start': start, 'end': end, 'length': end - start}
+                for start, end in zip(exons['start'][exon_at:exon_at + exon_count],
+                                      exons['end'][exon_at:exon_at + exon_count])
+            ]
+            gene_introns = [
+                {'start': start, 'end': end, 'length': end - start, 'donor': donor,
+                 'acceptor': acceptor, 'is_canonical': is_canonical}
+                for start, end, donor, acceptor, is_canonical in zip(
+                    *(introns[name][intron_at:intron_at + intron_count]
+                      for name in IntronColumns.FIELDS))
+            ]
+            exon_at += exon_count
+            intron_at += intron_count
+            records.append({
+                'gene': gene,
+                'strand': strand,
+                'exons': gene_exons,
+                'introns': gene_introns,
+                'exon_count': exon_count,
+                'intron_count': intron_count,
+                'all_canonical': all_canonical
+            })
+        return records
+
+    def to_columns(self) -> Dict:
+        data = super().to_columns()
+        data['exons'] = self.exons.to_columns()
+        data['introns'] = self.introns.to_columns()
+        return data
+
+    @classmethod
+    def from_columns(cls, data: Dict) -> 'GeneStructureColumns':
+        return cls(exons=_hydrate(data['exons'], ExonColumns),
+                   introns=_hydrate(data['introns'], IntronColumns),
+                   **{name: data[name] for name in cls.FIELDS})
+
+
+TABLE_KINDS = {table.KIND: table for table in (CDSColumns, ExonColumns, IntronColumns,
+                                                GeneStructureColumns)}
+
+
+def _hydrate(data: Union[ColumnTable, Dict], table: type) -> ColumnTable:
+    """Tabla a partir de su forma columnar (o la propia tabla si ya está reconstruida)"""
+    return data if isinstance(data, table) else table.from_columns(data)
+
+
+def json_default(obj: Any) -> Any:
+    """default de json.dumps: tablas con la forma JSON de siempre (lista de objetos)"""
+    if isinstance(obj, ColumnTable):
+        return obj.to_records()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def columns_json_default(obj: Any) -> Any:
+    """default de json.dumps: tablas con la forma compacta orientada a columnas"""
+    if isinstance(obj, ColumnTable):
+        return obj.to_columns()
+    return json_default(obj)
+
+
+def json_object_hook(data: Dict) -> Any:
+    """object_hook de json.loads: reconstruye las tablas guardadas con columns_json_default"""
+    if data.get('format') == COLUMNS_FORMAT and data.get('kind') in TABLE_KINDS:
+        return TABLE_KINDS[data['kind']].from_columns(data)
+    return data
@@ -0,0 +1,106 @@
+"""
+Densidad de genes a lo largo del genoma: CDS y pares de bases codificantes por intervalo,
+calculados con búsquedas binarias sobre los extremos ordenados de los CDS
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from interval_index import IntervalIndex
+
+
+# Número de intervalos de los niveles precalculados con el análisis (de grueso a fino)
+DENSITY_LEVELS = (10, 100, 1000)
+
+# Límite de intervalos por consulta (/api/genome/<id>/density)
+MAX_DENSITY_BINS = 100_000
+
+
+def bin_edges(length: int, bins: Optional[int] = None, bin_size: Optional[int] = None) -> np.ndarray:
+    """
+    Límites de los intervalos: 0, bin_size, 2 * bin_size, ..., length
+
+    Args:
+        length: Longitud del genoma
+        bins: Número de intervalos (el tamaño se redondea hacia arriba)
+        bin_size: Tamaño de los intervalos en pb (alternativa a bins)
+
+    Raises:
+        ValueError: Si no se indica exactamente uno de bins / bin_size, o no es válido
+    """
+    if (bins is None) == (bin_size is None):
+        raise ValueError("Indicar bins o bin_size (sólo uno)")
+    if bins is not None:
+        if bins < 1:
+            raise ValueError("bins debe ser al menos 1")
+        bin_size = max(1, -(-length // bins))
+    elif bin_size < 1:
+        raise ValueError("bin_size debe ser al menos 1")
+    if -(-length // bin_size) > MAX_DENSITY_BINS:
+        raise ValueError(f"Demasiados intervalos (máximo {MAX_DENSITY_BINS})")
+    return np.append(np.arange(0, length, bin_size, dtype=np.int64), length)
+
+
+def covered_before(index: IntervalIndex, positions: np.ndarray) -> np.ndarray:
+    """Pares de bases cubiertos por los intervalos (ya fusionados) en [0, p) para cada p"""
+    if len(index) == 0:
+        return np.zeros(len(positions), dtype=np.int64)
+    finished = np.concatenate([[0], np.cumsum(index.ends - index.starts)])
+    # Intervalos que acaban antes de p, más la parte del que contiene p (si lo hay)
+    at = np.searchsorted(index.ends, positions, side='right')
+    partial = np.zeros(len(positions), dtype=np.int64)
+    inside = at < len(index)
+    partial[inside] = np.maximum(positions[inside] - index.starts[at[inside]], 0)
+    return finished[at] + partial
+
+
+def gene_density(starts: Sequence[int], ends: Sequence[int], length: int,
+                 bins: Optional[int] = None, bin_size: Optional[int] = None,
+                 index: Optional[IntervalIndex] = None) -> Dict:
+    """
+    CDS y pares de bases codificantes por intervalo
+
+    gene_count cuenta los CDS que solapan el intervalo (un CDS que cruza un límite cuenta
+    en ambos) y covered_bp los pb del intervalo dentro de algún CDS (sin contar dos veces
+    los solapes). El intervalo i es [i * bin_size, (i + 1) * bin_size); el último acaba
+    en length.
+
+    Args:
+        starts, ends: Extremos de los CDS (0-based, fin exclusivo), en cualquier orden
+        length: Longitud del genoma
+        bins, bin_size: Número o tamaño de los intervalos (ver bin_edges)
+        index: Índice de los CDS ya construido (ej: FeatureTable.cds_index)
+
+    Returns:
+        Diccionario con bin_size, bins, gene_count y covered_bp
+    """
+    edges = bin_edges(length, bins, bin_size)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if index is None:
+        index = IntervalIndex(zip(starts.tolist(), ends.tolist()))
+    # Para contar solapes basta con ordenar inicios y fines por separado
+    starts = np.sort(starts)
+    ends = np.sort(ends)
+
+    # CDS que empiezan antes del fin del intervalo menos los que acaban antes de su inicio
+    gene_count = (np.searchsorted(starts, edges[1:], side='left') -
+                  np.searchsorted(ends, edges[:-1], side='right'))
+    covered_bp = np.diff(covered_before(index, edges))
+
+    return {
+        'bin_size': int(edges[1] - edges[0]) if len(edges) > 1 else 0,
+        'bins': len(edges) - 1,
+        'gene_count': gene_count.tolist(),
+        'covered_bp': covered_bp.tolist()
+    }
+
+
+def density_levels(starts: Sequence[int], ends: Sequence[int], length: int,
+                   index: Optional[IntervalIndex] = None,
+                   levels: Sequence[int] = DENSITY_LEVELS) -> list:
+    """Niveles precalculados de gene_density (nunca más intervalos que pares de bases)"""
+    if length <= 0:
+        return []
+    return [gene_density(starts, ends, length, bins=bins, index=index)
+            for bins in sorted({min(bins, length) for bins in levels})]
@@ -0,0 +1,171 @@
+"""
+Consultas paginadas sobre los CDS de un análisis (cds_details): orden, filtros y cursores
+"""
+from typing import Dict, Optional
+import base64
+import hashlib
+
+import numpy as np
+
+from gene_columns import CDSColumns
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Órdenes admitidos ('-' delante = descendente)
+SORT_FIELDS = ('position', 'length')
+
+_STRANDS = {'1': 1, '+': 1, '-1': -1, '-': -1}
+
+
+def check_query_params(sort: str = 'position', strand: Optional[str] = None,
+                       name: Optional[str] = None, product: Optional[str] = None,
+                       limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> int:
+    """
+    Valida los parámetros de GeneIndex.query sin necesitar el índice (antes de descargar o
+    analizar el genoma)
+
+    Returns:
+        Posición de la página indicada por el cursor (0 sin cursor)
+
+    Raises:
+        ValueError: Si algún parámetro o el cursor no es válido
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit debe estar entre 1 y {MAX_PAGE_SIZE}")
+    if strand is not None and strand not in _STRANDS:
+        raise ValueError(f"Hebra no válida: {strand} (usar + o -)")
+    if _sort_field(sort) not in SORT_FIELDS:
+        raise ValueError(f"Orden no válido: {sort} (usar {', '.join(SORT_FIELDS)}, "
+                         f"con '-' para descendente)")
+    if not cursor:
+        return 0
+    return _decode_cursor(cursor, _fingerprint(sort, strand, name, product))
+
+
+def _sort_field(sort: str) -> str:
+    """Campo de un orden sin el '-' de descendente (uno solo)"""
+    return sort[1:] if sort.startswith('-') else sort
+
+
+def _fingerprint(*params) -> str:
+    """Identifica la consulta: un cursor sólo vale para el mismo orden y filtros"""
+    raw = '\0'.join('' if param is None else str(param) for param in params)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def _encode_cursor(offset: int, fingerprint: str) -> str:
+    return base64.urlsafe_b64encode(f"{offset}:{fingerprint}".encode('ascii')).decode('ascii')
+
+
+def _decode_cursor(cursor: str, fingerprint: str) -> int:
+    try:
+        offset, cursor_fingerprint = base64.urlsafe_b64decode(
+            cursor.encode('ascii')).decode('ascii').split(':')
+        offset = int(offset)
+    except (ValueError, UnicodeError):
+        raise ValueError("Cursor no válido")
+    if cursor_fingerprint != fingerprint or offset < 0:
+        raise ValueError("El cursor corresponde a otra consulta (orden o filtros distintos)")
+    return offset
+
+
+def summarize_genes(analysis: Dict, genes_url: str) -> Dict:
+    """
+    Copia del análisis sin la lista completa de CDS, para las respuestas de la API
+
+    genes_analysis conserva los totales, strand_counts, length_stats y top_genes, y
+    genes_url apunta al endpoint paginado con todos los CDS. El análisis original
+    (compartido con la caché) no se modifica.
+    """
+    genes = analysis.get('genes_analysis')
+    if not isinstance(genes, dict) or 'cds_details' not in genes:
+        return analysis
+    summary = {key: value for key, value in genes.items() if key != 'cds_details'}
+    summary['genes_url'] = genes_url
+    return {**analysis, 'genes_analysis': summary}
+
+
+class GeneIndex:
+    """
+    Índice de los CDS de un análisis para consultas repetidas (una página tras otra).
+
+    Las columnas por las que se ordena y filtra se toman de la tabla columnar; cada orden
+    se calcula la primera vez que se pide y se reutiliza.
+    """
+
+    def __init__(self, cds_details: CDSColumns):
+        self.cds_details = cds_details
+        self.starts = cds_details.column('start')
+        self.lengths = cds_details.column('length')
+        self.strands = np.array([strand or 0 for strand in cds_details.column('strand')],
+                                dtype=np.int8)
+        # Texto en minúsculas para los filtros por subcadena
+        self.names = [f"{gene}\t{locus_tag}".lower() for gene, locus_tag in
+                      zip(cds_details.column('gene'), cds_details.column('locus_tag'))]
+        self.products = [product.lower() for product in cds_details.column('product')]
+        self._orders: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.cds_details)
+
+    def _order(self, sort: str) -> np.ndarray:
+        """Índices de los CDS en el orden pedido (empates por posición)"""
+        if sort not in self._orders:
+            values = self.starts if _sort_field(sort) == 'position' else self.lengths
+            if sort.startswith('-'):
+                values = -values
+            self._orders[sort] = np.lexsort((np.arange(len(self)), self.starts, values))
+        return self._orders[sort]
+
+    def query(self, sort: str = 'position', strand: Optional[str] = None,
+              name: Optional[str] = None, product: Optional[str] = None,
+              limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+        """
+        Una página de CDS
+
+        Args:
+            sort: 'position', 'length', '-position' o '-length' (los N más largos: '-length'
+                  con limit=N)
+            strand: '+'/'1' o '-'/'-1' para filtrar por hebra
+            name: Subcadena del nombre del gen o del locus_tag (sin distinguir mayúsculas)
+            product: Subcadena del producto (sin distinguir mayúsculas)
+            limit: CDS por página (máximo MAX_PAGE_SIZE)
+            cursor: next_cursor de la página anterior (mismos sort y filtros)
+
+        Returns:
+            Diccionario con genes, total (CDS que cumplen los filtros) y next_cursor
+            (None en la última página)
+
+        Raises:
+            ValueError: Si algún parámetro o el cursor no es válido
+        """
+        offset = check_query_params(sort, strand, name, product, limit, cursor)
+        order = self._order(sort)
+        fingerprint = _fingerprint(sort, strand, name, product)
+
+        mask = np.ones(len(self), dtype=bool)
+        if strand is not None:
+            mask &= self.strands == _STRANDS[strand]
+        if name:
+            needle = name.lower()
+            mask &= np.fromiter((needle in text for text in self.names), dtype=bool, count=len(self))
+        if product:
+            needle = product.lower()
+            mask &= np.fromiter((needle in text for text in self.products), dtype=bool,
+                                count=len(self))
+
+        selected = order[mask[order]]
+        page = selected[offset:offset + limit]
+        next_offset = offset + len(page)
+
+        return {
+            'genes': self.cds_details.take(page),
+            'total': int(len(selected)),
+            'total_cds': len(self),
+            'sort': sort,
+            'limit': limit,
+            'next_cursor': (_encode_cursor(next_offset, fingerprint)
+                            if next_offset < len(selected) else None)
+        }
@@ -0,0 +1,71 @@
+"""
+Tablas de traducción de NCBI (transl_table) como arreglos de consulta por índice de codón,
+construidos una sola vez al importar el módulo
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from Bio.Data.CodonTable import unambiguous_dna_by_id
+from Bio.Data.IUPACData import protein_letters_1to3
+
+from sequence_scanner import INVALID_CODON, codon_to_index, index_to_codon
+
+
+# Tabla que se usa cuando el CDS no indica transl_table (o indica una desconocida)
+DEFAULT_TABLE = 1
+
+TABLE_IDS: Tuple[int, ...] = tuple(sorted(unambiguous_dna_by_id))
+
+TABLE_NAMES: Dict[int, str] = {table: unambiguous_dna_by_id[table].names[0] for table in TABLE_IDS}
+
+_THREE_LETTER = {**protein_letters_1to3, 'U': 'Sec', 'O': 'Pyl'}
+
+
+def _amino_acids(table: int) -> Tuple[str, ...]:
+    """Aminoácido (código de tres letras, 'Stop') de cada índice de codón TCAG"""
+    forward = unambiguous_dna_by_id[table].forward_table
+    # En las tablas 27, 28 y 31 algunos STOP también codifican un aminoácido: se toma éste
+    return tuple(_THREE_LETTER[forward[codon]] if codon in forward else 'Stop'
+                 for codon in (index_to_codon(index) for index in range(64)))
+
+
+# Aminoácido de cada codón (orden TCAG), por tabla
+AMINO_ACIDS: Dict[int, Tuple[str, ...]] = {table: _amino_acids(table) for table in TABLE_IDS}
+
+# Codones de terminación de cada tabla (incluidos los ambiguos de las tablas 27, 28 y 31)
+STOP_CODONS: Dict[int, Tuple[str, ...]] = {
+    table: tuple(unambiguous_dna_by_id[table].stop_codons) for table in TABLE_IDS
+}
+
+# Máscara de STOP de sequence_scanner.find_orfs: fila = número de tabla, columna = índice de
+# codón (INVALID_CODON nunca es STOP); las filas de números sin tabla repiten la estándar
+STOP_LOOKUP = np.zeros((max(TABLE_IDS) + 1, INVALID_CODON + 1), dtype=bool)
+for _table in range(len(STOP_LOOKUP)):
+    for _codon in STOP_CODONS.get(_table, STOP_CODONS[DEFAULT_TABLE]):
+        STOP_LOOKUP[_table, codon_to_index(_codon)] = True
+
+
+def table_id(value: Optional[str]) -> int:
+    """
+    Número de tabla a partir del qualifier transl_table
+
+    Returns:
+        El número si es una tabla conocida, o DEFAULT_TABLE
+    """
+    try:
+        table = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_TABLE
+    return table if table in AMINO_ACIDS else DEFAULT_TABLE
+
+
+def dominant_table(tables: Iterable[int]) -> int:
+    """Tabla más frecuente entre los CDS (la menor en caso de empate; DEFAULT_TABLE si no hay)"""
+    counts = np.bincount(np.fromiter(tables, dtype=np.int64), minlength=len(STOP_LOOKUP))
+    return int(counts.argmax()) if counts.any() else DEFAULT_TABLE
+
+
+def table_counts(tables: Iterable[int]) -> Dict[str, int]:
+    """Número de CDS por tabla, con las claves como texto (para JSON)"""
+    numbers, counts = np.unique(np.fromiter(tables, dtype=np.int64), return_counts=True)
+    return {str(table): count for table, count in zip(numbers.tolist(), counts.tolist())}
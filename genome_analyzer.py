@@ -1,139 +1,627 @@
 """
 Módulo de análisis genómico usando Biopython y NCBI Entrez
 """
-from Bio import Entrez, SeqIO
-from Bio.SeqUtils import gc_fraction
+from Bio import Entrez
 from Bio.Seq import Seq
 import re
-from typing import Dict, List, Tuple, Optional
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Tuple, Optional, Union
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import tempfile
 import time
+import numpy as np
+
+from codon_usage import CODON_ORDER, TABLE_ORDER
+from feature_table import CDSEntry, FeatureTable
+from genetic_codes import STOP_CODONS
+from gc_windows import gc_windows
+from gene_density import density_levels
+from kmer_spectrum import check_kmer_params, kmer_spectrum
+from metrics import NCBI_REQUEST_DURATION, NCBI_REQUEST_ERRORS
+from gene_columns import CDSColumns, ExonColumns, GeneStructureColumns, IntronColumns
+from genbank_stream import Handle, open_genbank, read_genbank
+from genome_files import read_genome_file
+from packed_sequence import PackedSequence
+from record_cache import RecordCache
+from rate_limiter import TokenBucket, ncbi_rate, shared_bucket
+from result_cache import ResultCache, is_versioned, result_key, source_hash
+from sequence_scanner import find_codon_positions, find_orfs
+from stage_timing import NULL_TIMER, StageTimer, configure_logging
+
+
+# Módulos cuyo código determina el resultado de analyze_genome (versionan la caché de resultados)
+ANALYSIS_SOURCES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('genome_analyzer.py', 'codon_usage.py', 'feature_table.py', 'gc_windows.py',
+                 'gene_columns.py', 'gene_density.py', 'genbank_stream.py', 'genetic_codes.py',
+                 'genome_files.py', 'interval_index.py', 'kmer_spectrum.py', 'packed_sequence.py',
+                 'sequence_scanner.py')
+]
+
+# Longitud máxima de secuencia que se carga (empaquetada a 2 bits por base)
+DEFAULT_MAX_SEQUENCE_LENGTH = 300_000_000
+
+# Tamaño de los bloques al copiar la respuesta de NCBI a disco
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# CDS más largos que se incluyen en el resumen de genes
+TOP_GENES = 20
+
+# Límites (pb) del histograma de longitudes de length_stats: <500, 500-1k, ..., >=10k
+GENE_LENGTH_BINS = (500, 1000, 2000, 5000, 10000)
+
+# Etapas de analyze_genome, en orden (para informar del progreso)
+ANALYSIS_STAGES = (
+    'fetch', 'features', 'basic_info', 'gc_content', 'genes', 'codons',
+    'codon_frequency', 'gene_distribution', 'introns_exons'
+)
+
+
+@contextmanager
+def ncbi_request(operation: str):
+    """Registra la latencia y los errores de una petición a NCBI Entrez en las métricas"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        NCBI_REQUEST_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        NCBI_REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation)
 
 
 class GenomeAnalyzer:
     """Analiza genomas desde NCBI usando IDs de acceso"""
     
-    def __init__(self, email: str, api_key: Optional[str] = None):
+    def __init__(self, email: str, api_key: Optional[str] = None, min_orf_length: int = 100,
+                 max_sequence_length: int = DEFAULT_MAX_SEQUENCE_LENGTH,
+                 record_cache: Optional[RecordCache] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 process_pool: Optional[Executor] = None,
+                 profile_stages: bool = False):
         """
         Inicializa el analizador
         
         Args:
             email: Email requerido por NCBI
             api_key: API key opcional de NCBI (aumenta rate limit)
+            min_orf_length: Longitud mínima (nt, sin el STOP) de los ORFs potenciales
+            max_sequence_length: Los registros más largos se analizan sólo a partir de
+                                 sus features, sin cargar la secuencia
+            record_cache: Caché en disco de registros GenBank (opcional)
+            result_cache: Caché de resultados de analyze_genome (opcional)
+            rate_limiter: Token bucket para las peticiones a NCBI (por defecto uno compartido
+                          por el proceso, a 3 req/s o 10 req/s con API key)
+            process_pool: Pool de procesos para el análisis CPU en analyze_genomes (opcional)
+            profile_stages: Medir todas las etapas de cada análisis y registrarlas en los
+                            logs (ver stage_timing), aunque el llamador no pase un timer
         """
         Entrez.email = email
         if api_key:
             Entrez.api_key = api_key
+        self.min_orf_length = min_orf_length
+        self.max_sequence_length = max_sequence_length
+        self.record_cache = record_cache
+        self.result_cache = result_cache
+        self.rate_limiter = rate_limiter or shared_bucket(ncbi_rate(api_key))
+        self.process_pool = process_pool
+        self.profile_stages = profile_stages
+        # Versión del analizador: hash del código de análisis y de sus parámetros
+        self.version = source_hash(ANALYSIS_SOURCES, min_orf_length, max_sequence_length)
     
-    def fetch_genome(self, accession_id: str) -> Dict:
+    def fetch_genome(self, accession_id: str, timer: Optional[StageTimer] = None) -> Dict:
         """
         Obtiene información completa del genoma desde NCBI
         
+        El registro se parsea en streaming: nunca se guarda entero como texto y la
+        secuencia se empaqueta a 2 bits por base a medida que se lee. Con caché de
+        registros, la secuencia empaquetada se guarda junto al registro y se mapea
+        con mmap en los análisis siguientes
+        
         Args:
             accession_id: ID de acceso NCBI (ej: NC_000001.11)
+            timer: Mide las etapas fetch y parse (fetch_parse si se parsea la descarga
+                   en streaming, sin caché de registros)
             
         Returns:
             Diccionario con datos del genoma
         """
+        timer = timer or NULL_TIMER
+        try:
+            if self.record_cache is not None:
+                with timer.stage('fetch') as entry:
+                    path = self.record_cache.fetch(
+                        accession_id, self._download_genbank, self._remote_update_date
+                    )
+                    entry['bytes'] = os.path.getsize(path)
+                with timer.stage('parse', entry['bytes']):
+                    return self.load_genome(accession_id, path,
+                                            self.record_cache.sequence_path(accession_id))
+            with timer.stage('fetch_parse') as entry:
+                with self._efetch(accession_id) as handle:
+                    genome_data = self.parse_genome(accession_id, handle)
+                entry['bytes'] = genome_data['length']
+            return genome_data
+        except Exception as e:
+            raise Exception(f"Error al obtener genoma {accession_id}: {str(e)}")
+    
+    @contextmanager
+    def genbank_file(self, accession_id: str) -> Iterator[str]:
+        """
+        Obtiene el registro GenBank como archivo local (etapa de red, sin análisis)
+        
+        Usa la copia de la caché de registros si está configurada; si no, descarga a
+        un archivo temporal que se borra al salir del bloque with
+        
+        Args:
+            accession_id: ID de acceso NCBI
+            
+        Returns:
+            Ruta del archivo (leer con genbank_stream.open_genbank)
+        """
+        if self.record_cache is not None:
+            try:
+                path = self.record_cache.fetch(
+                    accession_id, self._download_genbank, self._remote_update_date
+                )
+            except Exception as e:
+                raise Exception(f"Error al obtener genoma {accession_id}: {str(e)}")
+            yield path
+            return
+        
+        fd, path = tempfile.mkstemp(suffix='.gb')
         try:
-            # Respetar rate limits de NCBI (3 requests/segundo sin API key)
-            time.sleep(0.34)
+            with os.fdopen(fd, 'wb') as f:
+                try:
+                    self._download_genbank(accession_id, f)
+                except Exception as e:
+                    raise Exception(f"Error al obtener genoma {accession_id}: {str(e)}")
+            yield path
+        finally:
+            os.remove(path)
+    
+    def load_genome(self, accession_id: str, path: str,
+                    sequence_path: Optional[str] = None) -> Dict:
+        """
+        Parsea un registro GenBank guardado en disco
+        
+        Args:
+            accession_id: ID de acceso NCBI
+            path: Archivo GenBank, comprimido con gzip o no
+            sequence_path: Archivo de la secuencia empaquetada; si existe y corresponde a
+                           path se mapea con mmap (las páginas se comparten entre procesos)
+                           en lugar de leer la secuencia del registro; si no, se crea
+            
+        Returns:
+            Diccionario con datos del genoma (mismo formato que fetch_genome)
+        """
+        sequence = PackedSequence.load(sequence_path, source=path) if sequence_path else None
+        with open_genbank(path) as handle:
+            genome_data = self.parse_genome(accession_id, handle, sequence)
+        
+        if sequence_path and sequence is None and genome_data['has_sequence']:
+            genome_data['sequence'].save(sequence_path, source=path)
+        return genome_data
+    
+    def parse_genome(self, accession_id: str, handle: Handle,
+                     sequence: Optional[PackedSequence] = None) -> Dict:
+        """
+        Parsea un registro GenBank y prepara los datos del genoma
+        
+        Args:
+            accession_id: ID de acceso NCBI
+            handle: Archivo abierto (texto o binario) con el registro en formato GenBank
+            sequence: Secuencia del registro ya empaquetada (no se vuelve a leer del archivo)
+            
+        Returns:
+            Diccionario con datos del genoma (mismo formato que fetch_genome); 'sequence'
+            es un PackedSequence compartido por todos los análisis, o None
+        """
+        if sequence is not None and len(sequence) <= self.max_sequence_length:
+            record = read_genbank(handle, max_sequence_length=0)
+            if len(sequence) == len(record):
+                record.seq = Seq(sequence)
+        else:
+            record = read_genbank(handle, self.max_sequence_length)
+        
+        return self._genome_data(accession_id, record)
+    
+    def load_local_genome(self, path: str, annotation_path: Optional[str] = None,
+                          name: Optional[str] = None) -> Dict:
+        """
+        Lee un genoma local (GenBank, FASTA o FASTA + GFF3, con o sin gzip), sin NCBI
+        
+        Args:
+            path: Archivo del genoma
+            annotation_path: GFF3 con las anotaciones de un FASTA (opcional)
+            name: Identificador para el resultado (por defecto, el ID del registro)
             
-            # Obtener registro GenBank con partes (mejor para genomas grandes)
-            handle = Entrez.efetch(
+        Returns:
+            Diccionario con datos del genoma (mismo formato que fetch_genome)
+        """
+        record = read_genome_file(path, annotation_path, self.max_sequence_length)
+        return self._genome_data(name or record.id, record)
+    
+    @staticmethod
+    def _genome_data(accession_id: str, record) -> Dict:
+        """Datos del genoma a partir de un registro leído con genbank_stream / genome_files"""
+        # Obtener longitud y secuencia
+        length = len(record) if record.seq is not None else 0
+        
+        # La secuencia sólo está definida si el registro la incluye y no supera el límite
+        data = record.seq._data if record.seq is not None else None
+        sequence = data if isinstance(data, PackedSequence) and length > 0 else None
+        
+        return {
+            'record': record,
+            'accession_id': accession_id,
+            'sequence': sequence,
+            'length': length,
+            'has_sequence': sequence is not None
+        }
+    
+    def _efetch(self, accession_id: Union[str, List[str]]) -> Handle:
+        """
+        Abre la descarga del registro GenBank completo desde NCBI
+        
+        Con una lista de accesiones se hace una sola petición y la respuesta contiene
+        los registros uno tras otro (ver batch_analysis.download_group)
+        """
+        if not isinstance(accession_id, str):
+            accession_id = ','.join(accession_id)
+        
+        # Respetar rate limits de NCBI (sólo espera si el bucket está vacío)
+        self.rate_limiter.acquire()
+        
+        # Obtener registro GenBank con partes (mejor para genomas grandes)
+        with ncbi_request('efetch'):
+            return Entrez.efetch(
                 db="nucleotide",
                 id=accession_id,
                 rettype="gbwithparts",  # Cambio clave: incluye features sin secuencia completa
                 retmode="text"
             )
-            record = SeqIO.read(handle, "genbank")
+    
+    def _download_genbank(self, accession_id: str, destination: BinaryIO):
+        """Copia el registro GenBank de NCBI a un archivo binario, por bloques"""
+        start = time.perf_counter()
+        handle = self._efetch(accession_id)
+        try:
+            while True:
+                try:
+                    chunk = handle.read(DOWNLOAD_CHUNK_SIZE)
+                except Exception:
+                    NCBI_REQUEST_ERRORS.inc(operation='download')
+                    raise
+                if not chunk:
+                    break
+                destination.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        finally:
             handle.close()
-            
-            # Obtener longitud y secuencia
-            sequence = ""
-            length = len(record) if record.seq is not None else 0
-            
-            # Intentar obtener la secuencia si está disponible
+        NCBI_REQUEST_DURATION.observe(time.perf_counter() - start, operation='download')
+    
+    def _remote_update_date(self, accession_id: str) -> Optional[datetime]:
+        """Fecha de última actualización del registro en NCBI (para revalidar la caché)"""
+        self.rate_limiter.acquire()
+        
+        with ncbi_request('esummary'):
+            handle = Entrez.esummary(db="nucleotide", id=accession_id)
             try:
-                if length > 0 and length < 50000000:  # Solo si es < 50MB
-                    temp_seq = str(record.seq)
-                    if temp_seq and "Undefined" not in str(type(record.seq._data)):
-                        sequence = temp_seq
-            except Exception:
-                # Secuencia no disponible, continuar sin ella
-                pass
-            
-            return {
-                'record': record,
-                'accession_id': accession_id,
-                'sequence': sequence,
-                'length': length,
-                'has_sequence': len(sequence) > 0
-            }
-        except Exception as e:
-            raise Exception(f"Error al obtener genoma {accession_id}: {str(e)}")
+                summary = Entrez.read(handle)
+            finally:
+                handle.close()
+        
+        if not summary or 'UpdateDate' not in summary[0]:
+            return None
+        return datetime.strptime(str(summary[0]['UpdateDate']), '%Y/%m/%d')
+    
+    def _cached_result(self, accession_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Busca un resultado ya calculado
+        
+        Returns:
+            (clave de caché o None si la accesión no es cacheable, resultado o None)
+        """
+        # Los resultados de accesiones con versión son inmutables: reutilizarlos si existen
+        if self.result_cache is None or not is_versioned(accession_id):
+            return None, None
+        cache_key = result_key(accession_id, self.version)
+        return cache_key, self.result_cache.get(cache_key)
     
-    def analyze_genome(self, accession_id: str) -> Dict:
+    def analyze_genome(self, accession_id: str,
+                       progress: Optional[Callable[[str, float], None]] = None,
+                       timer: Optional[StageTimer] = None) -> Dict:
         """
         Análisis completo de un genoma
         
         Args:
             accession_id: ID de acceso NCBI
+            progress: Callback opcional progress(etapa, fracción completada) al iniciar cada etapa
+            timer: Mide cada etapa (caché, descarga, parseo y cada sección del análisis)
+            
+        Returns:
+            Diccionario con todos los análisis
+        """
+        timer = self._timer(timer, accession_id)
+        with timer.stage('cache_lookup'):
+            cache_key, cached = self._cached_result(accession_id)
+        if cached is not None:
+            return cached
+        
+        self._report_stage(progress, 'fetch')
+        result = self.analyze_genome_data(self.fetch_genome(accession_id, timer), progress, timer)
+        
+        if cache_key is not None:
+            with timer.stage('cache_store'):
+                self.result_cache.put(cache_key, result)
+        
+        return result
+    
+    def analyze_genome_sections(self, accession_id: str,
+                                progress: Optional[Callable[[str, float], None]] = None,
+                                timer: Optional[StageTimer] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Como analyze_genome, pero entrega cada sección del resultado en cuanto se calcula
+        (para respuestas en streaming)
+        
+        Returns:
+            Iterador de (clave, valor) en el mismo orden que el diccionario de analyze_genome;
+            el resultado completo se guarda en la caché al terminar la última sección
+        """
+        timer = self._timer(timer, accession_id)
+        with timer.stage('cache_lookup'):
+            cache_key, cached = self._cached_result(accession_id)
+        if cached is not None:
+            yield from cached.items()
+            return
+        
+        self._report_stage(progress, 'fetch')
+        result = {}
+        genome_data = self.fetch_genome(accession_id, timer)
+        for key, value in self.iter_analysis(genome_data, progress, timer):
+            result[key] = value
+            yield key, value
+        
+        if cache_key is not None:
+            with timer.stage('cache_store'):
+                self.result_cache.put(cache_key, result)
+    
+    def analyze_kmers(self, accession_id: str, k: int, strand: str = 'forward',
+                      canonical: bool = False) -> Dict:
+        """
+        Espectro de k-mers de la secuencia completa (ver kmer_spectrum.kmer_spectrum)
+        
+        Se guarda en la caché de resultados, como el análisis, con una entrada por
+        combinación de k, hebra y canonical
+        
+        Raises:
+            ValueError: Si los parámetros no son válidos o el registro no tiene secuencia
+        """
+        check_kmer_params(k, strand)
+        cache_key = None
+        if self.result_cache is not None and is_versioned(accession_id):
+            variant = 'canonical' if canonical else strand
+            cache_key = result_key(accession_id, self.version, kind=f'kmers-{k}-{variant}')
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        result = kmer_spectrum(self.fetch_genome(accession_id)['sequence'], k, strand, canonical)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
+        return result
+    
+    def analyze_file(self, path: str, annotation_path: Optional[str] = None,
+                     name: Optional[str] = None, content_hash: Optional[str] = None,
+                     progress: Optional[Callable[[str, float], None]] = None,
+                     timer: Optional[StageTimer] = None) -> Dict:
+        """
+        Análisis completo de un genoma local, con el mismo pipeline que analyze_genome
+        
+        Args:
+            path: Archivo del genoma (ver load_local_genome)
+            annotation_path: GFF3 con las anotaciones de un FASTA (opcional)
+            name: Identificador para el resultado (por defecto, el ID del registro)
+            content_hash: Hash del contenido de los archivos y del nombre; si se indica,
+                          el resultado se guarda en la caché de resultados
+            progress: Callback opcional progress(etapa, fracción completada)
+            timer: Mide cada etapa (ver analyze_genome)
+            
+        Returns:
+            Diccionario con todos los análisis
+        """
+        timer = self._timer(timer, name or os.path.basename(path))
+        cache_key = None
+        if self.result_cache is not None and content_hash:
+            cache_key = result_key(content_hash, self.version, kind='upload')
+            with timer.stage('cache_lookup'):
+                cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        self._report_stage(progress, 'fetch')
+        with timer.stage('parse', os.path.getsize(path)):
+            genome_data = self.load_local_genome(path, annotation_path, name)
+        result = self.analyze_genome_data(genome_data, progress, timer)
+        
+        if cache_key is not None:
+            with timer.stage('cache_store'):
+                self.result_cache.put(cache_key, result)
+        
+        return result
+    
+    def analyze_genomes(self, accession_ids: List[str]) -> List[Dict]:
+        """
+        Analiza varios genomas en paralelo
+        
+        Las descargas se solapan en un pool de hilos (respetando el rate limit
+        compartido) y el parseo + análisis, que es CPU, se envía al pool de procesos
+        si está configurado. El tiempo total se acerca al del genoma más lento.
+        
+        Args:
+            accession_ids: IDs de acceso NCBI
+            
+        Returns:
+            Lista de resultados en el mismo orden que accession_ids
+        """
+        unique_ids = list(dict.fromkeys(accession_ids))
+        
+        def run(accession_id: str) -> Dict:
+            cache_key, cached = self._cached_result(accession_id)
+            if cached is not None:
+                return cached
+            
+            if self.process_pool is not None:
+                # El worker lee el registro del disco: no se serializa el texto entre procesos
+                sequence_path = (self.record_cache.sequence_path(accession_id)
+                                 if self.record_cache is not None else None)
+                with self.genbank_file(accession_id) as path:
+                    result = self.process_pool.submit(
+                        analyze_genbank_file, self._worker_settings(), accession_id, path,
+                        sequence_path
+                    ).result()
+            else:
+                timer = self._timer(None, accession_id)
+                result = self.analyze_genome_data(self.fetch_genome(accession_id, timer),
+                                                  timer=timer)
+            
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
+            return result
+        
+        with ThreadPoolExecutor(max_workers=len(unique_ids) or 1) as threads:
+            futures = {acc: threads.submit(run, acc) for acc in unique_ids}
+            results = {acc: future.result() for acc, future in futures.items()}
+        
+        return [results[acc] for acc in accession_ids]
+    
+    @staticmethod
+    def _report_stage(progress: Optional[Callable[[str, float], None]], stage: str):
+        """Notifica el inicio de una etapa con la fracción del análisis ya completada"""
+        if progress is not None:
+            progress(stage, round(ANALYSIS_STAGES.index(stage) / len(ANALYSIS_STAGES), 4))
+    
+    def _timer(self, timer: Optional[StageTimer], subject: str):
+        """El timer indicado, uno nuevo si profile_stages (sólo para los logs) o NULL_TIMER"""
+        if timer is not None:
+            return timer
+        return StageTimer('analysis', subject) if self.profile_stages else NULL_TIMER
+    
+    def _worker_settings(self) -> Dict:
+        """Parámetros para reconstruir el analizador en un proceso worker"""
+        return {
+            'email': Entrez.email,
+            'min_orf_length': self.min_orf_length,
+            'max_sequence_length': self.max_sequence_length,
+            'profile_stages': self.profile_stages
+        }
+    
+    def analyze_genome_data(self, genome_data: Dict,
+                            progress: Optional[Callable[[str, float], None]] = None,
+                            timer: Optional[StageTimer] = None) -> Dict:
+        """
+        Calcula todas las métricas a partir de datos ya obtenidos (sin red ni caché)
+        
+        Args:
+            genome_data: Diccionario devuelto por fetch_genome / parse_genome
+            progress: Callback opcional progress(etapa, fracción completada) al iniciar cada etapa
+            timer: Mide cada sección del análisis (ver stage_timing.StageTimer)
             
         Returns:
             Diccionario con todos los análisis
         """
-        genome_data = self.fetch_genome(accession_id)
+        return dict(self.iter_analysis(genome_data, progress, timer))
+    
+    def iter_analysis(self, genome_data: Dict,
+                      progress: Optional[Callable[[str, float], None]] = None,
+                      timer: Optional[StageTimer] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Calcula las métricas sección a sección (ver analyze_genome_data)
+        
+        Las etapas del timer miden sólo el cálculo de cada sección, no el tiempo que el
+        consumidor del iterador tarda en procesarla. bytes es el número de bases que
+        recorre la etapa (la secuencia, o las secuencias de los CDS al extraerlas).
+        
+        Returns:
+            Iterador de (clave, valor) del resultado, cada uno en cuanto está calculado
+        """
         record = genome_data['record']
         sequence = genome_data['sequence']
+        timer = self._timer(timer, genome_data['accession_id'])
+        bases = len(sequence) if sequence is not None else None
+        
+        yield 'accession_id', genome_data['accession_id']
+        
+        # Una sola pasada sobre record.features, compartida por todos los análisis
+        # (incluye feature.extract de cada CDS)
+        self._report_stage(progress, 'features')
+        with timer.stage('features') as entry:
+            features = FeatureTable(record)
+            cds_bases = sum(len(cds.sequence) for cds in features.cds if cds.sequence)
+            entry['bytes'] = cds_bases
         
         # Información básica
-        basic_info = self._get_basic_info(record)
+        self._report_stage(progress, 'basic_info')
+        with timer.stage('basic_info'):
+            basic_info = self._get_basic_info(record, features)
+        yield 'basic_info', basic_info
+        yield 'length', genome_data['length']
         
         # Contenido GC
-        gc_content = self._calculate_gc_content(sequence)
+        self._report_stage(progress, 'gc_content')
+        with timer.stage('gc_content', bases):
+            gc_content = self._calculate_gc_content(sequence)
+        yield 'gc_content', gc_content
+        # GC y GC skew por ventanas (1, 10 y 100 kb) para el gráfico con zoom
+        with timer.stage('gc_windows', bases):
+            windows = gc_windows(sequence)
+        yield 'gc_windows', windows
         
         # Análisis de genes
-        genes_analysis = self._analyze_genes(record)
+        self._report_stage(progress, 'genes')
+        # Matriz de codones por CDS, compartida con codon_frequency (ver FeatureTable.codon_usage)
+        with timer.stage('codon_usage', cds_bases):
+            features.codon_usage
+        with timer.stage('genes'):
+            genes = self._analyze_genes(features)
+        yield 'genes_analysis', genes
         
         # Análisis de codones
-        codons_analysis = self._analyze_codons(record, sequence)
+        self._report_stage(progress, 'codons')
+        with timer.stage('codons', bases):
+            codons = self._analyze_codons(features, sequence)
+        yield 'codons_analysis', codons
         
         # Frecuencia de los 64 codones
-        codon_frequency_64 = self._analyze_codon_frequency(record)
+        self._report_stage(progress, 'codon_frequency')
+        with timer.stage('codon_frequency'):
+            codon_frequency = self._analyze_codon_frequency(features)
+        yield 'codon_frequency_64', codon_frequency
         
         # Distribución de genes
-        gene_distribution = self._analyze_gene_distribution(record)
+        self._report_stage(progress, 'gene_distribution')
+        with timer.stage('gene_distribution'):
+            distribution = self._analyze_gene_distribution(record, features)
+        yield 'gene_distribution', distribution
         
         # Intrones y exones
-        introns_exons = self._analyze_introns_exons(record)
-        
-        return {
-            'accession_id': accession_id,
-            'basic_info': basic_info,
-            'length': genome_data['length'],
-            'gc_content': gc_content,
-            'genes_analysis': genes_analysis,
-            'codons_analysis': codons_analysis,
-            'codon_frequency_64': codon_frequency_64,
-            'gene_distribution': gene_distribution,
-            'introns_exons': introns_exons
-        }
+        self._report_stage(progress, 'introns_exons')
+        with timer.stage('introns_exons'):
+            introns_exons = self._analyze_introns_exons(features, sequence)
+        yield 'introns_exons', introns_exons
     
-    def _get_basic_info(self, record) -> Dict:
+    def _get_basic_info(self, record, features: FeatureTable) -> Dict:
         """Extrae información básica del genoma"""
         annotations = record.annotations
         
         # Nombres y descripción
         scientific_name = annotations.get('organism', 'Desconocido')
-        common_names = []
         
-        # Buscar nombres comunes en source features
-        for feature in record.features:
-            if feature.type == 'source':
-                if 'organism' in feature.qualifiers:
-                    common_names.extend(feature.qualifiers['organism'])
-                if 'strain' in feature.qualifiers:
-                    common_names.extend(feature.qualifiers['strain'])
+        # Nombres comunes de los source features
+        common_names = features.source_names
         
         return {
             'scientific_name': scientific_name,
@@ -143,37 +631,22 @@ class GenomeAnalyzer:
             'taxonomy': annotations.get('taxonomy', [])
         }
     
-    def _calculate_gc_content(self, sequence: str) -> float:
-        """Calcula el contenido GC"""
-        # Si no hay secuencia (genomas muy grandes), retornar estimado
+    def _calculate_gc_content(self, sequence: Optional[PackedSequence]) -> Optional[float]:
+        """Calcula el contenido GC (None si no hay secuencia, ej: genomas muy grandes)"""
         if not sequence or len(sequence) == 0:
-            return 41.0  # Estimado promedio para genomas humanos
+            return None
         
-        seq_obj = Seq(sequence)
-        return round(gc_fraction(seq_obj) * 100, 2)
+        # Conteo sobre los bytes empaquetados (misma regla que Bio.SeqUtils.gc_fraction)
+        return round(sequence.gc_fraction() * 100, 2)
     
-    def _analyze_genes(self, record) -> Dict:
+    def _analyze_genes(self, features: FeatureTable) -> Dict:
         """Analiza genes CDS y genes codificados"""
-        cds_features = []
-        gene_features = []
-        
-        for feature in record.features:
-            if feature.type == 'CDS':
-                cds_features.append(feature)
-            elif feature.type == 'gene':
-                gene_features.append(feature)
-        
-        # Extraer información de cada CDS
-        cds_details = []
-        for cds in cds_features:
+        # Extraer información de cada CDS (una tupla por CDS, en el orden de CDSColumns.FIELDS)
+        cds_rows = []
+        cai = features.codon_usage.gene_cai()
+        for cds, gene_cai in zip(features.cds, cai):
             gene_name = cds.qualifiers.get('gene', ['Unknown'])[0]
             product = cds.qualifiers.get('product', ['Unknown'])[0]
-            location = {
-                'start': int(cds.location.start),
-                'end': int(cds.location.end),
-                'strand': cds.location.strand
-            }
-            
             # Extraer qualifiers adicionales para tooltip enriquecido
             protein_id = cds.qualifiers.get('protein_id', [''])[0]
             locus_tag = cds.qualifiers.get('locus_tag', [''])[0]
@@ -183,43 +656,55 @@ class GenomeAnalyzer:
             protein_length = len(translation) if translation else 0
             note = cds.qualifiers.get('note', [''])[0]
             
-            cds_details.append({
-                'gene': gene_name,
-                'product': product,
-                'location': location,
-                'length': len(cds.location),
-                'protein_id': protein_id,
-                'locus_tag': locus_tag,
-                'db_xref': db_xref,
-                'codon_start': codon_start,
-                'protein_length': protein_length,
-                'note': note
-            })
+            cds_rows.append((
+                gene_name, product, cds.start, cds.end, cds.strand,
+                len(cds.feature.location), protein_id, locus_tag, db_xref,
+                codon_start, protein_length, note, gene_cai
+            ))
+        cds_details = CDSColumns.from_rows(cds_rows)
         
         # Calcular distancias entre genes
-        distances = self._calculate_gene_distances(cds_features)
+        distances = self._calculate_gene_distances(features.cds)
+        
+        # Resumen para las respuestas sin cds_details (ver gene_query.summarize_genes)
+        lengths = cds_details.column('length')
+        strands = np.array([strand or 0 for strand in cds_details.column('strand')], dtype=np.int8)
+        longest = np.argsort(-lengths, kind='stable')[:TOP_GENES]
         
         return {
-            'total_cds': len(cds_features),
-            'total_genes': len(gene_features),
+            'total_cds': len(features.cds),
+            'total_genes': features.gene_count,
             'cds_details': cds_details,  # Todos los genes, sin límite
+            'strand_counts': {
+                'forward': int(np.count_nonzero(strands == 1)),
+                'reverse': int(np.count_nonzero(strands == -1))
+            },
+            'length_stats': {
+                'average': round(float(lengths.mean()), 2) if len(lengths) else 0,
+                'min': int(lengths.min()) if len(lengths) else 0,
+                'max': int(lengths.max()) if len(lengths) else 0,
+                'bins': list(GENE_LENGTH_BINS),
+                'histogram': np.bincount(np.searchsorted(GENE_LENGTH_BINS, lengths, side='right'),
+                                         minlength=len(GENE_LENGTH_BINS) + 1).tolist()
+            },
+            'top_genes': cds_details.take(longest),  # Los TOP_GENES CDS más largos
             'average_gene_distance': distances['average'],
             'min_gene_distance': distances['min'],
             'max_gene_distance': distances['max']
         }
     
-    def _calculate_gene_distances(self, cds_features: List) -> Dict:
+    def _calculate_gene_distances(self, cds_entries: List[CDSEntry]) -> Dict:
         """Calcula distancias entre genes consecutivos"""
-        if len(cds_features) < 2:
+        if len(cds_entries) < 2:
             return {'average': 0, 'min': 0, 'max': 0}
         
         # Ordenar por posición
-        sorted_cds = sorted(cds_features, key=lambda x: x.location.start)
+        sorted_cds = sorted(cds_entries, key=lambda x: x.start)
         
         distances = []
         for i in range(len(sorted_cds) - 1):
-            end_current = int(sorted_cds[i].location.end)
-            start_next = int(sorted_cds[i + 1].location.start)
+            end_current = sorted_cds[i].end
+            start_next = sorted_cds[i + 1].start
             distance = start_next - end_current
             if distance >= 0:  # Solo distancias positivas
                 distances.append(distance)
@@ -233,16 +718,18 @@ class GenomeAnalyzer:
             'max': max(distances)
         }
     
-    def _analyze_codons(self, record, sequence: str) -> Dict:
+    def _analyze_codons(self, features: FeatureTable, sequence: Optional[PackedSequence]) -> Dict:
         """
         Analiza codones de inicio y STOP usando sliding window
         Busca TODOS los codones en la secuencia, no solo los anotados
+
+        El STOP funcional de cada CDS se valida con su propia tabla de traducción
+        (transl_table); el escaneo de la secuencia y los ORFs usan la tabla más frecuente.
         """
-        # Obtener regiones CDS para validación
-        cds_regions = []
-        for feature in record.features:
-            if feature.type == 'CDS':
-                cds_regions.append((int(feature.location.start), int(feature.location.end)))
+        # Índice de regiones CDS para validación
+        cds_index = features.cds_index
+        genetic_code = features.genetic_code
+        stop_codons = STOP_CODONS[genetic_code]
         
         # Contar codones funcionales (los que están en CDS anotados)
         true_starts_atg = 0
@@ -251,43 +738,39 @@ class GenomeAnalyzer:
         true_starts_ctg = 0
         true_starts_other = 0
         
-        true_taa = 0
-        true_tag = 0
-        true_tga = 0
-        
-        for feature in record.features:
-            if feature.type == 'CDS':
-                try:
-                    cds_seq = str(feature.extract(record.seq))
-                    
-                    # Codón de inicio (primeros 3 nucleótidos)
-                    if len(cds_seq) >= 3:
-                        start = cds_seq[:3].upper()
-                        if start == 'ATG':
-                            true_starts_atg += 1
-                        elif start == 'GTG':
-                            true_starts_gtg += 1
-                        elif start == 'TTG':
-                            true_starts_ttg += 1
-                        elif start == 'CTG':
-                            true_starts_ctg += 1
-                        else:
-                            true_starts_other += 1
-                    
-                    # Codón STOP (últimos 3 nucleótidos)
-                    if len(cds_seq) >= 3:
-                        stop = cds_seq[-3:].upper()
-                        if stop == 'TAA':
-                            true_taa += 1
-                        elif stop == 'TAG':
-                            true_tag += 1
-                        elif stop == 'TGA':
-                            true_tga += 1
-                except:
-                    continue
+        # STOP funcionales por codón (TAA, TAG, TGA y los de otras tablas, ej: AGA)
+        functional_stops = {'TAA': 0, 'TAG': 0, 'TGA': 0}
         
+        for cds in features.cds:
+            cds_seq = cds.sequence
+            if cds_seq is None or len(cds_seq) < 3:
+                continue
+            
+            # Codón de inicio (primeros 3 nucleótidos)
+            start = cds_seq[:3]
+            if start == 'ATG':
+                true_starts_atg += 1
+            elif start == 'GTG':
+                true_starts_gtg += 1
+            elif start == 'TTG':
+                true_starts_ttg += 1
+            elif start == 'CTG':
+                true_starts_ctg += 1
+            else:
+                true_starts_other += 1
+            
+            # Codón STOP (últimos 3 nucleótidos), si lo es en la tabla del CDS
+            stop = cds_seq[-3:]
+            if stop in STOP_CODONS[cds.transl_table]:
+                functional_stops[stop] = functional_stops.get(stop, 0) + 1
+        
+        true_taa = functional_stops['TAA']
+        true_tag = functional_stops['TAG']
+        true_tga = functional_stops['TGA']
+        alternative_stops = {codon: count for codon, count in functional_stops.items()
+                             if codon not in ('TAA', 'TAG', 'TGA')}
         true_starts = true_starts_atg + true_starts_gtg + true_starts_ttg + true_starts_ctg + true_starts_other
-        true_stops = true_taa + true_tag + true_tga
+        true_stops = sum(functional_stops.values())
         
         # Si no hay secuencia completa, solo retornar conteo de CDS
         if not sequence or len(sequence) == 0:
@@ -303,63 +786,48 @@ class GenomeAnalyzer:
                     'TAA': {'total': true_taa, 'true': true_taa},
                     'TAG': {'total': true_tag, 'true': true_tag},
                     'TGA': {'total': true_tga, 'true': true_tga},
+                    'alternative_stops': {codon: {'total': count, 'true': count}
+                                          for codon, count in alternative_stops.items()},
                     'total_true_stops': true_stops,
                     'total_false_stops': 0
                 },
+                'genetic_code': genetic_code,
                 'note': 'Secuencia no disponible - solo se cuentan codones en CDS anotados'
             }
         
         # SLIDING WINDOW: Escanear toda la secuencia buscando codones
-        sequence_upper = sequence.upper()
-        seq_length = len(sequence_upper)
-        
-        # Listas para almacenar todas las posiciones encontradas
-        all_atg_positions = []
-        all_taa_positions = []
-        all_tag_positions = []
-        all_tga_positions = []
-        
-        # Sliding window de 3 nucleótidos
-        for i in range(seq_length - 2):
-            codon = sequence_upper[i:i+3]
-            
-            if codon == 'ATG':
-                all_atg_positions.append(i)
-            elif codon == 'TAA':
-                all_taa_positions.append(i)
-            elif codon == 'TAG':
-                all_tag_positions.append(i)
-            elif codon == 'TGA':
-                all_tga_positions.append(i)
-        
-        # Función helper para verificar si una posición está en CDS
-        def is_in_cds(position):
-            for start, end in cds_regions:
-                if start <= position < end:
-                    return True
-            return False
-        
-        # Contar cuántos de cada tipo están dentro/fuera de CDS
-        atg_in_cds = sum(1 for pos in all_atg_positions if is_in_cds(pos))
+        # (vectorizado, por ventanas desempaquetadas de la secuencia compacta)
+        # TAA, TAG y TGA siempre; además, los STOP propios de la tabla del registro
+        other_stops = [codon for codon in stop_codons if codon not in ('TAA', 'TAG', 'TGA')]
+        positions = find_codon_positions(sequence, ['ATG', 'TAA', 'TAG', 'TGA'] + other_stops)
+
+        all_atg_positions = positions['ATG']
+        all_taa_positions = positions['TAA']
+        all_tag_positions = positions['TAG']
+        all_tga_positions = positions['TGA']
+
+        # Contar cuántos de cada tipo están dentro/fuera de CDS (búsqueda binaria en el índice)
+        atg_in_cds = cds_index.count_inside(all_atg_positions)
         atg_out_cds = len(all_atg_positions) - atg_in_cds
         
-        taa_in_cds = sum(1 for pos in all_taa_positions if is_in_cds(pos))
+        taa_in_cds = cds_index.count_inside(all_taa_positions)
         taa_out_cds = len(all_taa_positions) - taa_in_cds
         
-        tag_in_cds = sum(1 for pos in all_tag_positions if is_in_cds(pos))
+        tag_in_cds = cds_index.count_inside(all_tag_positions)
         tag_out_cds = len(all_tag_positions) - tag_in_cds
         
-        tga_in_cds = sum(1 for pos in all_tga_positions if is_in_cds(pos))
+        tga_in_cds = cds_index.count_inside(all_tga_positions)
         tga_out_cds = len(all_tga_positions) - tga_in_cds
         
-        total_stops_in_cds = taa_in_cds + tag_in_cds + tga_in_cds
-        total_stops_out_cds = taa_out_cds + tag_out_cds + tga_out_cds
+        # Ocurrencias dentro de CDS de cada codón que es STOP en la tabla del registro
+        stops_in_cds = {'TAA': taa_in_cds, 'TAG': tag_in_cds, 'TGA': tga_in_cds}
+        for codon in other_stops:
+            stops_in_cds[codon] = cds_index.count_inside(positions[codon])
+        total_stops_in_cds = sum(stops_in_cds[codon] for codon in stop_codons)
+        total_stops_out_cds = sum(len(positions[codon]) for codon in stop_codons) - total_stops_in_cds
         
-        # Detectar ORFs potenciales (secuencias ATG...STOP sin interrupción)
-        # Esto es computacionalmente costoso, solo para genomas pequeños
-        potential_orfs = 0
-        if seq_length < 100000:  # Solo para genomas < 100kb
-            potential_orfs = self._count_potential_orfs(sequence_upper)
+        # Detectar ORFs potenciales (ATG...STOP sin interrupción) en las seis fases
+        orfs = find_orfs(sequence, min_length=self.min_orf_length, table=genetic_code)
         
         return {
             'start_codons': {
@@ -396,11 +864,23 @@ class GenomeAnalyzer:
                     'false': tga_out_cds,
                     'functional': true_tga  # TGA funcionales (1 por gen con TGA)
                 },
+                # STOP de otras tablas (ej: AGA y AGG en mitocondrias de vertebrados)
+                'alternative_stops': {
+                    codon: {
+                        'total': len(positions[codon]),
+                        'true': stops_in_cds[codon],
+                        'false': len(positions[codon]) - stops_in_cds[codon],
+                        'functional': alternative_stops.get(codon, 0)
+                    }
+                    for codon in other_stops
+                },
                 'total_true_stops': total_stops_in_cds,
                 'total_false_stops': total_stops_out_cds,
                 'total_functional_stops': true_stops  # STOP funcionales totales (1 por gen)
             },
-            'potential_orfs': potential_orfs,
+            'genetic_code': genetic_code,
+            'potential_orfs': len(orfs['start']),
+            'orf_summary': self._summarize_orfs(orfs),
             'method': 'sliding_window_full_sequence',
             'note': 'functional = codones reales de inicio/fin de genes | true/false = todas las ocurrencias dentro/fuera de CDS',
             'start_codon_usage': {
@@ -413,111 +893,71 @@ class GenomeAnalyzer:
             }
         }
     
-    def _count_potential_orfs(self, sequence: str) -> int:
-        """
-        Cuenta ORFs potenciales (ATG seguido de STOP sin codones internos de STOP)
-        Solo para genomas pequeños debido a complejidad computacional
-        """
-        orfs = 0
-        i = 0
-        while i < len(sequence) - 5:
-            if sequence[i:i+3] == 'ATG':
-                # Buscar siguiente STOP en frame
-                j = i + 3
-                while j < len(sequence) - 2:
-                    codon = sequence[j:j+3]
-                    if codon in ['TAA', 'TAG', 'TGA']:
-                        # Encontramos un ORF potencial
-                        if (j - i) >= 100:  # Al menos 100 nucleótidos
-                            orfs += 1
-                        break
-                    j += 3
-                i = j if j < len(sequence) else len(sequence)
-            else:
-                i += 1
-        return orfs
-    
-    def _analyze_codon_frequency(self, record) -> Dict:
-        """Calcula la frecuencia de los 64 codones a partir de las secuencias CDS"""
-        # Tabla del código genético estándar
-        codon_table = {
-            'TTT': 'Phe', 'TTC': 'Phe',
-            'TTA': 'Leu', 'TTG': 'Leu', 'CTT': 'Leu', 'CTC': 'Leu', 'CTA': 'Leu', 'CTG': 'Leu',
-            'ATT': 'Ile', 'ATC': 'Ile', 'ATA': 'Ile',
-            'ATG': 'Met',
-            'GTT': 'Val', 'GTC': 'Val', 'GTA': 'Val', 'GTG': 'Val',
-            'TCT': 'Ser', 'TCC': 'Ser', 'TCA': 'Ser', 'TCG': 'Ser', 'AGT': 'Ser', 'AGC': 'Ser',
-            'CCT': 'Pro', 'CCC': 'Pro', 'CCA': 'Pro', 'CCG': 'Pro',
-            'ACT': 'Thr', 'ACC': 'Thr', 'ACA': 'Thr', 'ACG': 'Thr',
-            'GCT': 'Ala', 'GCC': 'Ala', 'GCA': 'Ala', 'GCG': 'Ala',
-            'TAT': 'Tyr', 'TAC': 'Tyr',
-            'TAA': 'Stop', 'TAG': 'Stop', 'TGA': 'Stop',
-            'CAT': 'His', 'CAC': 'His',
-            'CAA': 'Gln', 'CAG': 'Gln',
-            'AAT': 'Asn', 'AAC': 'Asn',
-            'AAA': 'Lys', 'AAG': 'Lys',
-            'GAT': 'Asp', 'GAC': 'Asp',
-            'GAA': 'Glu', 'GAG': 'Glu',
-            'TGT': 'Cys', 'TGC': 'Cys',
-            'TGG': 'Trp',
-            'CGT': 'Arg', 'CGC': 'Arg', 'CGA': 'Arg', 'CGG': 'Arg', 'AGA': 'Arg', 'AGG': 'Arg',
-            'GGT': 'Gly', 'GGC': 'Gly', 'GGA': 'Gly', 'GGG': 'Gly'
+    def _summarize_orfs(self, orfs: Dict, top_n: int = 10) -> Dict:
+        """Resumen de los ORFs encontrados: conteo por hebra y los más largos"""
+        longest = np.argsort(orfs['length'], kind='stable')[::-1][:top_n]
+        return {
+            'min_length': self.min_orf_length,
+            'forward': int(np.count_nonzero(orfs['strand'] == 1)),
+            'reverse': int(np.count_nonzero(orfs['strand'] == -1)),
+            'longest': [
+                {
+                    'start': int(orfs['start'][i]),
+                    'end': int(orfs['end'][i]),
+                    'strand': int(orfs['strand'][i]),
+                    'frame': int(orfs['frame'][i]),
+                    'length': int(orfs['length'][i])
+                }
+                for i in longest
+            ]
         }
+    
+    def _analyze_codon_frequency(self, features: FeatureTable) -> Dict:
+        """
+        Calcula la frecuencia de los 64 codones a partir de las secuencias CDS, con su
+        RSCU y el CAI de los CDS (ver codon_usage.CodonUsage). Los aminoácidos son los de
+        la tabla de traducción más frecuente del registro (genetic_code).
+        """
+        usage = features.codon_usage
+        # Cuentas, aminoácidos, RSCU y frecuencias en el orden de CODON_ORDER
+        counts = usage.totals[TABLE_ORDER]
+        amino_acids = [usage.amino_acids[index] for index in TABLE_ORDER.tolist()]
+        codon_rscu = np.round(usage.codon_rscu()[TABLE_ORDER], 4).tolist()
+        total_codons = int(counts.sum())
         
-        # Inicializar contadores para los 64 codones
-        codon_counts = {codon: 0 for codon in codon_table}
-        total_codons = 0
-        cds_count = 0
-        
-        for feature in record.features:
-            if feature.type == 'CDS':
-                try:
-                    cds_seq = str(feature.extract(record.seq)).upper()
-                    if len(cds_seq) < 3:
-                        continue
-                    cds_count += 1
-                    # Leer codones in-frame (posiciones 0, 3, 6, ...)
-                    for i in range(0, len(cds_seq) - 2, 3):
-                        codon = cds_seq[i:i+3]
-                        if codon in codon_counts:
-                            codon_counts[codon] += 1
-                            total_codons += 1
-                except:
-                    continue
-        
-        # Construir resultado con frecuencias
         codons_result = {}
-        for codon, amino_acid in codon_table.items():
-            count = codon_counts[codon]
+        for codon, amino_acid, count, value in zip(CODON_ORDER, amino_acids, counts.tolist(), codon_rscu):
             frequency = round((count / total_codons * 100), 4) if total_codons > 0 else 0
             codons_result[codon] = {
                 'count': count,
                 'frequency': frequency,
-                'amino_acid': amino_acid
+                'amino_acid': amino_acid,
+                'rscu': value
             }
         
         return {
             'codons': codons_result,
             'total_codons': total_codons,
-            'cds_analyzed': cds_count
+            'cds_analyzed': usage.analyzed,
+            'genetic_code': usage.genetic_code,
+            'genetic_codes': usage.genetic_codes(),  # CDS por transl_table
+            'cai': usage.cai_summary()
         }
     
-    def _analyze_gene_distribution(self, record) -> Dict:
+    def _analyze_gene_distribution(self, record, features: FeatureTable) -> Dict:
         """Analiza la distribución de genes a lo largo del genoma"""
         genome_length = len(record.seq)
+        starts, ends = features.cds_coordinates
         
         # Dividir en 10 regiones
         num_regions = 10
         region_size = genome_length // num_regions
         
-        distribution = [0] * num_regions
-        
-        for feature in record.features:
-            if feature.type == 'CDS':
-                # Determinar en qué región está el gen
-                gene_start = int(feature.location.start)
-                region_index = min(gene_start // region_size, num_regions - 1)
-                distribution[region_index] += 1
+        # Cada CDS cuenta en la región donde empieza (la última llega hasta el final; con
+        # menos de 10 pb todas las regiones salvo la última quedan vacías)
+        boundaries = np.arange(1, num_regions, dtype=np.int64) * region_size
+        distribution = np.bincount(np.searchsorted(boundaries, starts, side='right'),
+                                   minlength=num_regions).tolist()
         
         regions = []
         for i in range(num_regions):
@@ -532,89 +972,79 @@ class GenomeAnalyzer:
         
         return {
             'regions': regions,
-            'total_regions': num_regions
+            'total_regions': num_regions,
+            # CDS solapados y pb codificantes con 10, 100 y 1000 intervalos (ver gene_density)
+            'density_levels': density_levels(starts, ends, genome_length, features.cds_index)
         }
     
-    def _analyze_introns_exons(self, record) -> Dict:
+    def _analyze_introns_exons(self, features: FeatureTable,
+                               sequence: Optional[PackedSequence]) -> Dict:
         """Analiza intrones y exones por gen e identifica sitios de splicing (GT-AG)"""
-        genes_with_structure = []
-        full_seq = str(record.seq).upper() if record.seq else ""
+        # Una tupla por gen, exón e intrón (ver GeneStructureColumns)
+        gene_rows = []
+        exon_rows = []
+        intron_rows = []
+        # Los cortes de la secuencia empaquetada sólo desempaquetan las bases pedidas
+        full_seq = sequence
         
         total_introns = 0
         canonical_introns = 0
         
-        for feature in record.features:
-            if feature.type == 'mRNA' or feature.type == 'CDS':
-                gene_name = feature.qualifiers.get('gene', ['Unknown'])[0]
-                strand = feature.location.strand
+        for spliced in features.spliced:
+            gene_name = spliced.gene
+            strand = spliced.strand
+            
+            # Estructura de exones (solo features con más de una parte), ordenados por
+            # posición inicial (importante para hebra negativa en Biopython)
+            exons = sorted(spliced.parts, key=lambda part: part[0])
+            exon_rows.extend(exons)
+            
+            # Calcular intrones (regiones entre exones) y sus sitios de splicing
+            intron_count = 0
+            all_canonical = True
+            for i in range(len(exons) - 1):
+                intron_start = exons[i][1]
+                intron_end = exons[i + 1][0]
                 
-                # Verificar si tiene estructura de exones
-                if hasattr(feature.location, 'parts') and len(feature.location.parts) > 1:
-                    exons = []
-                    for part in feature.location.parts:
-                        exons.append({
-                            'start': int(part.start),
-                            'end': int(part.end),
-                            'length': len(part)
-                        })
-                    
-                    # Ordenar exones por posición inicial (importante para hebra negativa en Biopython)
-                    exons.sort(key=lambda x: x['start'])
-                    
-                    # Calcular intrones (regiones entre exones) y sus sitios de splicing
-                    introns = []
-                    for i in range(len(exons) - 1):
-                        intron_start = exons[i]['end']
-                        intron_end = exons[i + 1]['start']
+                # Extraer bases de los sitios de splicing si hay secuencia
+                donor = "N/A"
+                acceptor = "N/A"
+                is_canonical = False
+                
+                if full_seq and intron_end <= len(full_seq):
+                    try:
+                        if strand == 1:
+                            # Hebra (+): El intrón empieza con GT y termina con AG
+                            donor = full_seq[intron_start : intron_start + 2].decode('ascii')
+                            acceptor = full_seq[intron_end - 2 : intron_end].decode('ascii')
+                        else:
+                            # Hebra (-): El intrón "biológico" es el RC de la secuencia genómica
+                            # El donor está en el extremo de mayor coordenada (reversa-complementado)
+                            # El acceptor está en el de menor coordenada (reversa-complementado)
+                            # Sólo se desempaquetan las 2 bases de cada extremo
+                            if intron_end > intron_start:
+                                donor = str(Seq(full_seq[intron_end - 2 : intron_end]).reverse_complement())
+                                acceptor = str(Seq(full_seq[intron_start : intron_start + 2]).reverse_complement())
+                        
+                        # Regla canónica universal: GT-AG
+                        if donor == "GT" and acceptor == "AG":
+                            is_canonical = True
+                            canonical_introns += 1
                         
-                        # Extraer bases de los sitios de splicing si hay secuencia
-                        donor = "N/A"
-                        acceptor = "N/A"
-                        is_canonical = False
+                        total_introns += 1
+                    except:
+                        pass
                         
-                        if full_seq and intron_end <= len(full_seq):
-                            try:
-                                if strand == 1:
-                                    # Hebra (+): El intrón empieza con GT y termina con AG
-                                    donor = full_seq[intron_start : intron_start + 2]
-                                    acceptor = full_seq[intron_end - 2 : intron_end]
-                                else:
-                                    # Hebra (-): El intrón "biológico" es el RC de la secuencia genómica
-                                    # El donor está en el extremo de mayor coordenada (reversa-complementado)
-                                    # El acceptor está en el de menor coordenada (reversa-complementado)
-                                    intron_fragment = full_seq[intron_start : intron_end]
-                                    if intron_fragment:
-                                        intron_rc = str(Seq(intron_fragment).reverse_complement())
-                                        donor = intron_rc[:2]
-                                        acceptor = intron_rc[-2:]
-                                
-                                # Regla canónica universal: GT-AG
-                                if donor == "GT" and acceptor == "AG":
-                                    is_canonical = True
-                                    canonical_introns += 1
-                                
-                                total_introns += 1
-                            except:
-                                pass
-                                
-                        introns.append({
-                            'start': intron_start,
-                            'end': intron_end,
-                            'length': intron_end - intron_start,
-                            'donor': donor,
-                            'acceptor': acceptor,
-                            'is_canonical': is_canonical
-                        })
-                    
-                    genes_with_structure.append({
-                        'gene': gene_name,
-                        'strand': strand,
-                        'exons': exons,
-                        'introns': introns,
-                        'exon_count': len(exons),
-                        'intron_count': len(introns),
-                        'all_canonical': all(intro['is_canonical'] for intro in introns) if introns else True
-                    })
+                intron_rows.append((intron_start, intron_end, donor, acceptor, is_canonical))
+                intron_count += 1
+                all_canonical = all_canonical and is_canonical
+            
+            gene_rows.append((gene_name, strand, len(exons), intron_count, all_canonical))
+        
+        genes_with_structure = GeneStructureColumns.from_rows(
+            gene_rows, exons=ExonColumns.from_rows(exon_rows),
+            introns=IntronColumns.from_rows(intron_rows)
+        )
         
         return {
             'genes_with_structure': genes_with_structure,  # Analizar todos los genes
@@ -625,6 +1055,27 @@ class GenomeAnalyzer:
         }
 
 
+def analyze_genbank_file(settings: Dict, accession_id: str, path: str,
+                         sequence_path: Optional[str] = None) -> Dict:
+    """
+    Analiza un registro GenBank ya descargado (punto de entrada de los procesos worker)
+    
+    Args:
+        settings: Parámetros de GenomeAnalyzer (ver GenomeAnalyzer._worker_settings)
+        accession_id: ID de acceso NCBI
+        path: Archivo GenBank, comprimido con gzip o no
+        sequence_path: Archivo de la secuencia empaquetada (ver GenomeAnalyzer.load_genome)
+    """
+    analyzer = GenomeAnalyzer(**settings)
+    if analyzer.profile_stages:
+        # El worker no hereda la configuración de logging del proceso principal
+        configure_logging()
+    timer = analyzer._timer(None, accession_id)
+    with timer.stage('parse', os.path.getsize(path)):
+        genome_data = analyzer.load_genome(accession_id, path, sequence_path)
+    return analyzer.analyze_genome_data(genome_data, timer=timer)
+
+
 class GenomeComparator:
     """Compara dos genomas"""
     
@@ -655,10 +1106,12 @@ class GenomeComparator:
         }
         
         # Comparar GC content
+        # Sin secuencia no hay contenido GC (None): no hay diferencia que calcular
+        gc_known = genome1['gc_content'] is not None and genome2['gc_content'] is not None
         comparison['comparisons']['gc_content'] = {
             'genome1': genome1['gc_content'],
             'genome2': genome2['gc_content'],
-            'difference': round(genome1['gc_content'] - genome2['gc_content'], 2)
+            'difference': round(genome1['gc_content'] - genome2['gc_content'], 2) if gc_known else None
         }
         
         # Comparar genes
@@ -697,15 +1150,18 @@ class GenomeComparator:
         }
         
         # Similitud general (basada en GC content y densidad de genes)
-        gc_similarity = 100 - abs(genome1['gc_content'] - genome2['gc_content'])
+        gc_similarity = 100 - abs(genome1['gc_content'] - genome2['gc_content']) if gc_known else None
         gene_density1 = genome1['genes_analysis']['total_cds'] / genome1['length'] * 1000000
         gene_density2 = genome2['genes_analysis']['total_cds'] / genome2['length'] * 1000000
         density_similarity = 100 - min(abs(gene_density1 - gene_density2) / max(gene_density1, gene_density2) * 100, 100)
         
-        overall_similarity = round((gc_similarity + density_similarity) / 2, 2)
+        if gc_known:
+            overall_similarity = round((gc_similarity + density_similarity) / 2, 2)
+        else:
+            overall_similarity = round(density_similarity, 2)
         
         comparison['similarity'] = {
-            'gc_similarity': round(gc_similarity, 2),
+            'gc_similarity': round(gc_similarity, 2) if gc_known else None,
             'gene_density_similarity': round(density_similarity, 2),
             'overall_similarity': overall_similarity
         }
@@ -0,0 +1,302 @@
+"""
+Lectura de genomas locales (subidos por el usuario): GenBank, FASTA y FASTA + GFF3
+"""
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+import gzip
+import os
+import string
+import tempfile
+
+from Bio.Seq import Seq
+from Bio.SeqFeature import CompoundLocation, SeqFeature, SimpleLocation
+from Bio.SeqRecord import SeqRecord
+
+from genbank_stream import open_genbank, read_genbank
+from packed_sequence import PackedSequenceBuilder
+
+
+FORMAT_GENBANK = 'genbank'
+FORMAT_FASTA = 'fasta'
+FORMAT_GFF3 = 'gff3'
+
+# Bases N entre las secuencias de un FASTA con varios contigs: ningún codón cruza de uno a otro
+CONTIG_SPACER = 100
+
+# Tamaño de los bloques al copiar una subida a disco
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Tipos GFF3 que se convierten en features (los exones sólo dan forma a su mRNA)
+GFF3_FEATURE_TYPES = ('gene', 'mRNA', 'CDS')
+GFF3_TYPES = GFF3_FEATURE_TYPES + ('exon',)
+
+_SEQUENCE_NOISE = b' \t\r\n0123456789*'
+_UPPER_BYTES = bytes.maketrans(string.ascii_lowercase.encode('ascii'),
+                               string.ascii_uppercase.encode('ascii'))
+
+
+def store_upload(stream: BinaryIO, directory: Optional[str] = None, digest=None) -> str:
+    """
+    Copia un archivo subido a disco por bloques, sin tenerlo entero en memoria
+
+    Args:
+        stream: Contenido del archivo
+        directory: Directorio destino (None = directorio temporal del sistema)
+        digest: Objeto hashlib opcional que se actualiza con el contenido
+
+    Returns:
+        Ruta del archivo creado (el llamador debe borrarlo)
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.upload', dir=directory or None)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def detect_format(path: str) -> Optional[str]:
+    """Formato de un archivo según su primera línea con contenido (None si no se reconoce)"""
+    with open_genbank(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith(b'LOCUS'):
+                return FORMAT_GENBANK
+            if line.startswith(b'>'):
+                return FORMAT_FASTA
+            if line.startswith(b'##gff-version'):
+                return FORMAT_GFF3
+            return None
+    return None
+
+
+def read_fasta(handle: BinaryIO,
+               max_sequence_length: Optional[int] = None) -> Tuple[SeqRecord, Dict[str, int]]:
+    """
+    Lee un FASTA (una o varias secuencias) como un único registro
+
+    Las secuencias se concatenan separadas por CONTIG_SPACER bases N, de modo que un
+    ensamblaje en contigs se analiza como un solo genoma.
+
+    Args:
+        handle: Archivo abierto en modo binario
+        max_sequence_length: Si la longitud total lo supera, la secuencia queda sin definir
+
+    Returns:
+        (registro, posición inicial de cada secuencia en el registro)
+    """
+    builder = PackedSequenceBuilder()
+    offsets: Dict[str, int] = {}
+    headers: List[str] = []
+    length = 0
+
+    for line in handle:
+        if line.startswith(b'>'):
+            header = line[1:].decode('utf-8', 'replace').strip()
+            seqid = header.split()[0] if header else f"seq{len(offsets) + 1}"
+            if offsets:
+                length += CONTIG_SPACER
+                if max_sequence_length is None or length <= max_sequence_length:
+                    builder.write(b'N' * CONTIG_SPACER)
+            offsets[seqid] = length
+            headers.append(header)
+        elif line.startswith(b';') or not offsets:
+            continue
+        else:
+            bases = line.translate(_UPPER_BYTES, _SEQUENCE_NOISE)
+            length += len(bases)
+            if max_sequence_length is None or length <= max_sequence_length:
+                builder.write(bases)
+
+    if not offsets:
+        raise ValueError("El archivo FASTA no contiene ninguna secuencia")
+
+    if max_sequence_length is None or length <= max_sequence_length:
+        seq = Seq(builder.finish())
+    else:
+        seq = Seq(None, length)
+
+    first_id = next(iter(offsets))
+    if len(headers) == 1:
+        description = headers[0][len(first_id):].strip() or first_id
+    else:
+        description = f"{len(headers)} secuencias ({first_id}, ...)"
+
+    record = SeqRecord(seq, id=first_id, name=first_id, description=description,
+                       annotations={'molecule_type': 'DNA'})
+    return record, offsets
+
+
+def _parse_attributes(column: str) -> Dict[str, List[str]]:
+    """Columna 9 de GFF3: 'ID=cds1;Dbxref=a,b' -> {'ID': ['cds1'], 'Dbxref': ['a', 'b']}"""
+    attributes = {}
+    for item in column.strip().split(';'):
+        if '=' not in item:
+            continue
+        key, value = item.split('=', 1)
+        attributes[unquote(key.strip())] = [unquote(v) for v in value.split(',')]
+    return attributes
+
+
+def read_gff3(handle: BinaryIO) -> List[Dict]:
+    """
+    Lee las líneas gene/mRNA/exon/CDS de un GFF3, hasta el final o hasta '##FASTA'
+
+    Returns:
+        Lista de entradas con seqid, type, start (0-based), end, strand, phase y attributes
+    """
+    entries = []
+    for raw in handle:
+        line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+        if line.startswith('##FASTA'):
+            break
+        if not line.strip() or line.startswith('#'):
+            continue
+
+        columns = line.split('\t')
+        if len(columns) != 9:
+            raise ValueError(f"Línea GFF3 inválida: {line[:80]}")
+        seqid, _, feature_type, start, end, _, strand, phase, attributes = columns
+        if feature_type not in GFF3_TYPES:
+            continue
+
+        entries.append({
+            'seqid': unquote(seqid),
+            'type': feature_type,
+            'start': int(start) - 1,
+            'end': int(end),
+            'strand': {'+': 1, '-': -1}.get(strand),
+            'phase': int(phase) if phase.isdigit() else 0,
+            'attributes': _parse_attributes(attributes)
+        })
+    return entries
+
+
+def build_features(entries: List[Dict], offsets: Dict[str, int]) -> List[SeqFeature]:
+    """
+    Convierte entradas GFF3 en features equivalentes a las de un registro GenBank
+
+    Las líneas CDS con el mismo ID forman un único CDS con varias partes (join), y los
+    exones de un mRNA definen sus partes. Las entradas de secuencias que no están en
+    offsets se ignoran.
+
+    Args:
+        entries: Entradas devueltas por read_gff3
+        offsets: Posición de cada secuencia en el registro (ver read_fasta)
+    """
+    by_id = {}
+    groups: Dict[Tuple, List[Dict]] = {}
+    exons: Dict[str, List[Dict]] = {}
+    for index, entry in enumerate(entries):
+        if entry['seqid'] not in offsets:
+            continue
+        entry_id = entry['attributes'].get('ID', [None])[0]
+        if entry_id is not None:
+            by_id.setdefault(entry_id, entry)
+        if entry['type'] == 'exon':
+            for parent in entry['attributes'].get('Parent', []):
+                exons.setdefault(parent, []).append(entry)
+            continue
+        key = (entry['type'], entry_id) if entry_id is not None else (entry['type'], index)
+        groups.setdefault(key, []).append(entry)
+
+    def gene_name(entry: Dict) -> Optional[str]:
+        # Subir por los Parent (CDS -> mRNA -> gene) hasta encontrar un nombre
+        seen = set()
+        while entry is not None and id(entry) not in seen:
+            seen.add(id(entry))
+            attributes = entry['attributes']
+            if 'gene' in attributes:
+                return attributes['gene'][0]
+            if entry['type'] == 'gene' and 'Name' in attributes:
+                return attributes['Name'][0]
+            parent = attributes.get('Parent', [None])[0]
+            entry = by_id.get(parent)
+        return None
+
+    features = []
+    for (feature_type, entry_id), parts in groups.items():
+        first = parts[0]
+        if feature_type == 'mRNA' and entry_id in exons:
+            parts = exons[entry_id]
+        strand = first['strand']
+        offset = offsets[first['seqid']]
+
+        # Partes en orden de transcripción (descendente en la hebra -)
+        parts = sorted(parts, key=lambda p: p['start'], reverse=strand == -1)
+        locations = [SimpleLocation(offset + p['start'], offset + p['end'], strand) for p in parts]
+        location = locations[0] if len(locations) == 1 else CompoundLocation(locations)
+
+        attributes = first['attributes']
+        qualifiers = {}
+        name = gene_name(first)
+        if name:
+            qualifiers['gene'] = [name]
+        for gff_key, qualifier in (('product', 'product'), ('locus_tag', 'locus_tag'),
+                                   ('protein_id', 'protein_id'), ('Note', 'note'),
+                                   ('Dbxref', 'db_xref'), ('transl_table', 'transl_table')):
+            if gff_key in attributes:
+                qualifiers[qualifier] = attributes[gff_key]
+        if feature_type == 'CDS':
+            qualifiers['codon_start'] = [str(parts[0]['phase'] + 1)]
+
+        features.append(SeqFeature(location, type=feature_type, qualifiers=qualifiers))
+    return features
+
+
+def read_genome_file(path: str, annotation_path: Optional[str] = None,
+                     max_sequence_length: Optional[int] = None) -> SeqRecord:
+    """
+    Lee un genoma local como SeqRecord (mismo formato que los registros de NCBI)
+
+    Args:
+        path: GenBank, FASTA o GFF3 con sección ##FASTA, opcionalmente comprimido con gzip
+        annotation_path: GFF3 con las anotaciones de un FASTA (opcional)
+        max_sequence_length: Longitud máxima de secuencia que se carga (ver genbank_stream)
+
+    Raises:
+        ValueError: Si el formato no se reconoce, el archivo está dañado o la combinación
+                    de archivos no es válida
+    """
+    try:
+        return _read_genome_file(path, annotation_path, max_sequence_length)
+    except (EOFError, gzip.BadGzipFile) as e:
+        raise ValueError(f"Archivo comprimido dañado o incompleto: {e}")
+
+
+def _read_genome_file(path: str, annotation_path: Optional[str],
+                      max_sequence_length: Optional[int]) -> SeqRecord:
+    file_format = detect_format(path)
+    if file_format is None:
+        raise ValueError("Formato no reconocido: se admiten GenBank, FASTA y GFF3 "
+                         "(opcionalmente comprimidos con gzip)")
+    if annotation_path and file_format != FORMAT_FASTA:
+        raise ValueError("El archivo de anotaciones GFF3 sólo se admite junto a un FASTA")
+
+    with open_genbank(path) as handle:
+        if file_format == FORMAT_GENBANK:
+            return read_genbank(handle, max_sequence_length)
+
+        entries = read_gff3(handle) if file_format == FORMAT_GFF3 else []
+        record, offsets = read_fasta(handle, max_sequence_length)
+
+    if annotation_path:
+        if detect_format(annotation_path) != FORMAT_GFF3:
+            raise ValueError("El archivo de anotaciones debe ser GFF3 (##gff-version 3)")
+        with open_genbank(annotation_path) as handle:
+            entries = read_gff3(handle)
+
+    record.features = build_features(entries, offsets)
+    return record
@@ -0,0 +1,134 @@
+"""
+Compresión de respuestas (gzip / brotli) y ETags para GET condicionales (304 Not Modified)
+"""
+from typing import Optional
+import gzip
+import hashlib
+
+from flask import Request, Response
+
+from result_cache import is_versioned
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete brotli sólo se ofrece gzip
+    brotli = None
+
+
+# Respuestas más pequeñas no se comprimen (la cabecera gzip no compensa)
+COMPRESS_MIN_BYTES = 1024
+
+# Codificaciones en orden de preferencia del servidor
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+_COMPRESSIBLE_TYPES = ('application/javascript', 'image/svg+xml')
+
+
+def strong_etag(*parts) -> str:
+    """ETag fuerte (sin comillas) a partir de las partes que identifican la representación"""
+    raw = '\0'.join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def analysis_etag(accession_id: str, analyzer_version: str, *variant) -> Optional[str]:
+    """
+    ETag de un recurso derivado del análisis de una accesión, calculable sin analizarla
+
+    Args:
+        accession_id: ID de acceso NCBI
+        analyzer_version: GenomeAnalyzer.version (cambia con el código o la configuración)
+        *variant: Lo que distingue la representación (recurso, parámetros, formato)
+
+    Returns:
+        El ETag, o None si la accesión no tiene versión (su contenido puede cambiar en NCBI)
+    """
+    if not is_versioned(accession_id):
+        return None
+    return strong_etag(accession_id.strip().upper(), analyzer_version, *variant)
+
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """
+    Respuesta 304 si If-None-Match contiene el ETag
+
+    Las respuestas comprimidas llevan el ETag con la codificación como sufijo (ej:
+    "abc-gzip"), que también se acepta.
+
+    Returns:
+        Respuesta 304 con el ETag que envió el cliente, o None si hay que responder entera
+    """
+    if etag is None:
+        return None
+    if request.if_none_match.star_tag:
+        matched = etag
+    else:
+        matched = next((tag for tag in request.if_none_match.as_set()
+                        if _identity_etag(tag) == etag), None)
+    if matched is None:
+        return None
+    response = Response(status=304)
+    response.set_etag(matched)
+    response.cache_control.no_cache = True
+    return response
+
+
+def _identity_etag(tag: str) -> str:
+    """ETag sin el sufijo de codificación que añade compress_response"""
+    base, _, encoding = tag.rpartition('-')
+    return base if base and encoding in ('br', 'gzip') else tag
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    """Añade el ETag a una respuesta completa; el cliente debe revalidar antes de reutilizarla"""
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+    return response
+
+
+def _compressible(response: Response) -> bool:
+    mimetype = response.mimetype or ''
+    return (mimetype.startswith('text/') or mimetype.endswith('json') or
+            mimetype in _COMPRESSIBLE_TYPES)
+
+
+def compress_response(request: Request, response: Response, min_bytes: int = COMPRESS_MIN_BYTES,
+                      level: int = 6) -> Response:
+    """
+    Comprime el cuerpo con la codificación que acepte el cliente (Accept-Encoding)
+
+    No se comprimen las respuestas en streaming (NDJSON) ni los archivos enviados con
+    send_file (PDF, estáticos), ni las que ya tienen Content-Encoding.
+
+    Args:
+        request: Petición (para Accept-Encoding)
+        response: Respuesta de la vista
+        min_bytes: Tamaño mínimo del cuerpo para comprimirlo
+        level: Nivel de compresión de gzip (1-9); brotli usa un nivel equivalente
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304) or
+            response.direct_passthrough or response.is_streamed or
+            'Content-Encoding' in response.headers or not _compressible(response)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    if encoding == 'br':
+        body = brotli.compress(body, quality=min(11, level + 1))
+    else:
+        body = gzip.compress(body, compresslevel=level, mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+
+    # Cada codificación es una representación distinta: su propio ETag fuerte
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
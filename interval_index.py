@@ -0,0 +1,68 @@
+"""
+Índice de intervalos para consultas de pertenencia (ej: ¿esta posición cae dentro de un CDS?)
+"""
+from typing import Iterable, Tuple
+import numpy as np
+
+
+class IntervalIndex:
+    """
+    Intervalos semiabiertos [start, end) ordenados y fusionados.
+    Las consultas usan búsqueda binaria, O(log n) por posición.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]]):
+        """
+        Construye el índice
+
+        Args:
+            intervals: Pares (start, end) en coordenadas 0-based, end exclusivo.
+                       Pueden venir desordenados y solaparse entre sí.
+        """
+        pairs = np.array([(s, e) for s, e in intervals if e > s], dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+
+        starts = pairs[:, 0]
+        ends = np.maximum.accumulate(pairs[:, 1]) if len(pairs) else pairs[:, 1]
+
+        # Un intervalo abre un nuevo bloque si empieza después del máximo end acumulado anterior
+        new_block = np.ones(len(pairs), dtype=bool)
+        new_block[1:] = starts[1:] > ends[:-1]
+        block_ids = np.cumsum(new_block) - 1
+
+        self.starts = starts[new_block]
+        self.ends = np.zeros(len(self.starts), dtype=np.int64)
+        np.maximum.at(self.ends, block_ids, ends)
+
+    def __len__(self) -> int:
+        """Número de intervalos tras la fusión"""
+        return len(self.starts)
+
+    @property
+    def covered_length(self) -> int:
+        """Total de bases cubiertas por al menos un intervalo"""
+        return int((self.ends - self.starts).sum())
+
+    def contains(self, positions) -> np.ndarray:
+        """
+        Indica qué posiciones caen dentro de algún intervalo
+
+        Args:
+            positions: Arreglo (o lista) de posiciones 0-based
+
+        Returns:
+            Arreglo booleano del mismo tamaño que positions
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        slot = np.searchsorted(self.starts, positions, side='right') - 1
+        inside = slot >= 0
+        inside[inside] = positions[inside] < self.ends[slot[inside]]
+        return inside
+
+    def count_inside(self, positions) -> int:
+        """Cuántas de las posiciones caen dentro de algún intervalo"""
+        return int(np.count_nonzero(self.contains(positions)))
+
+    def __contains__(self, position: int) -> bool:
+        """Pertenencia de una sola posición"""
+        return bool(self.contains([position])[0])
@@ -0,0 +1,287 @@
+"""
+Cola persistente de trabajos de análisis (SQLite local, sin broker externo)
+"""
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from gene_columns import columns_json_default, json_object_hook
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    accession_id TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status);
+"""
+
+# Estados de un trabajo
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'error'
+
+
+class JobQueue:
+    """
+    Cola de trabajos guardada en un archivo SQLite y procesada por un pool acotado de hilos.
+
+    Varios procesos worker (mod_wsgi/gunicorn) pueden compartir el mismo archivo: cada
+    trabajo se reclama de forma atómica. Mientras se procesa, un latido renueva su lease; un
+    trabajo 'running' cuyo worker deja de dar señales durante lease_seconds se vuelve a
+    reclamar (ej: el proceso murió) y el worker anterior ya no puede escribir en él.
+    """
+
+    def __init__(self, db_path: str, run: Callable[[str, Callable[[str, float], None]], Dict],
+                 workers: int = 2, lease_seconds: float = 600, retention_seconds: float = 24 * 3600,
+                 max_attempts: int = 3, poll_interval: float = 1.0):
+        """
+        Args:
+            db_path: Archivo SQLite de la cola
+            run: Función (accession_id, progress) -> resultado; progress(stage, fraction)
+            workers: Hilos que procesan trabajos en este proceso
+            lease_seconds: Tiempo sin señales tras el cual un trabajo en curso se reasigna
+            retention_seconds: Tiempo que se conservan los trabajos terminados
+            max_attempts: Reintentos máximos de un trabajo cuyo worker desapareció
+            poll_interval: Segundos entre consultas a la cola cuando está vacía
+        """
+        self.db_path = db_path
+        self.run = run
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión nueva por operación (seguro entre hilos y procesos)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def start(self):
+        """Arranca los hilos worker de este proceso"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Detiene los hilos worker (los trabajos en curso terminan primero)"""
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, accession_id: str) -> Dict:
+        """
+        Encola el análisis de una accesión. Si ya hay un trabajo en curso o en cola
+        para la misma accesión, devuelve ese trabajo en lugar de crear otro.
+
+        Returns:
+            Estado del trabajo (ver get)
+        """
+        dedupe_key = accession_id.strip().upper()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND "
+                "(status = ? OR (status = ? AND updated_at >= ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (dedupe_key, QUEUED, RUNNING, now - self.lease_seconds)
+            ).fetchone()
+            if row:
+                job_id = row['id']
+            else:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, accession_id, dedupe_key, status, progress, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                    (job_id, accession_id, dedupe_key, QUEUED, now, now)
+                )
+            # Limpiar trabajos terminados antiguos
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, now - self.retention_seconds)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict]:
+        """
+        Estado de un trabajo
+
+        Returns:
+            Diccionario con job_id, accession_id, status, stage, progress, error,
+            created_at, updated_at y result (si terminó); None si no existe
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'accession_id': row['accession_id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'progress': round(row['progress'], 4),
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+        if include_result and row['status'] == DONE and row['result'] is not None:
+            job['result'] = json.loads(row['result'], object_hook=json_object_hook)
+        return job
+
+    def get_stats(self) -> Dict:
+        """Número de trabajos por estado (profundidad de la cola)"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        stats = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        stats.update({row['status']: row['n'] for row in rows})
+        stats['workers'] = len(self._threads)
+        return stats
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Reclama de forma atómica el trabajo más antiguo disponible"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Trabajos cuyo worker desapareció demasiadas veces: marcarlos como fallidos
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                (FAILED, 'El worker que procesaba el trabajo dejó de responder',
+                 now, RUNNING, now - self.lease_seconds, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now - self.lease_seconds)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, now, row['id'])
+                )
+            conn.execute('COMMIT')
+            return row
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, attempt: int, **fields) -> bool:
+        """
+        Actualiza un trabajo en curso y renueva su lease, sólo si sigue siendo de este worker
+
+        Args:
+            job_id: ID del trabajo
+            attempt: Intento con el que se reclamó (attempts tras _claim)
+
+        Returns:
+            False si el trabajo ya no pertenece a este intento (otro worker lo reclamó al
+            caducar el lease, o se marcó como fallido) y no se escribió nada
+        """
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND status = ? AND attempts = ?",
+                (*fields.values(), job_id, RUNNING, attempt)
+            )
+            return cursor.rowcount > 0
+
+    def _heartbeat(self, job_id: str, attempt: int, finished: threading.Event):
+        """Renueva el lease cada lease_seconds / 3 mientras run() no termina"""
+        while not finished.wait(self.lease_seconds / 3):
+            try:
+                if not self._update(job_id, attempt):
+                    print(f"Trabajo {job_id}: lease perdido, otro worker lo ha reclamado")
+                    return
+            except sqlite3.Error:
+                print(f"Error renovando el lease del trabajo {job_id}: {traceback.format_exc()}")
+
+    def _work_loop(self):
+        while not self._stopped.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error:
+                print(f"Error leyendo la cola de trabajos: {traceback.format_exc()}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._process(job)
+
+    def _process(self, job: sqlite3.Row):
+        job_id = job['id']
+        # La fila se leyó antes de que _claim incrementara attempts
+        attempt = job['attempts'] + 1
+
+        def progress(stage: str, fraction: float):
+            self._update(job_id, attempt, stage=stage, progress=fraction)
+
+        # Una etapa puede durar más que el lease (descarga o escaneo de un registro grande):
+        # el latido mantiene el trabajo reclamado mientras run() siga en marcha
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, attempt, finished),
+                                     name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.run(job['accession_id'], progress)
+            # Un resultado que no se puede serializar también marca el trabajo como fallido
+            result = json.dumps(result, ensure_ascii=False, separators=(',', ':'),
+                                default=columns_json_default)
+        except Exception as e:
+            print(f"Error en trabajo {job_id}: {traceback.format_exc()}")
+            self._update(job_id, attempt, status=FAILED, error=str(e))
+            return
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        if not self._update(job_id, attempt, status=DONE, stage='done', progress=1.0,
+                            result=result):
+            print(f"Trabajo {job_id}: resultado descartado, el trabajo ya no es de este worker")
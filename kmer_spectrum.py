@@ -0,0 +1,194 @@
+"""
+Espectro de k-mers (k = 1..12) de la secuencia completa, por hebra o canónico
+
+Cada k-mer se codifica con 2 bits por base (orden TCAG de sequence_scanner) en un entero;
+los índices de todas las posiciones se calculan de forma vectorizada, desplazando y
+combinando k vistas de la secuencia. Para k pequeño se cuenta con un arreglo denso de
+4^k contadores y para k grande con np.unique (sólo los k-mers presentes).
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from packed_sequence import PackedSequence
+from sequence_scanner import INVALID_BASE, NUCLEOTIDE_ORDER, SCAN_CHUNK_SIZE
+
+
+MAX_K = 12
+
+# Hasta este k se cuenta con un arreglo denso (4^10 contadores = 8 MB)
+DENSE_MAX_K = 10
+
+# Hasta este k el resumen incluye el vector completo de cuentas (4^6 = 4096 valores)
+DENSE_OUTPUT_MAX_K = 6
+
+# k-mers más frecuentes que se guardan en el resumen
+TOP_KMERS = 1000
+
+STRANDS = ('forward', 'reverse', 'both')
+
+
+def check_kmer_params(k: int, strand: str):
+    """
+    Valida los parámetros de count_kmers (antes de descargar o leer la secuencia)
+
+    Raises:
+        ValueError: Si k o strand no son válidos
+    """
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k debe estar entre 1 y {MAX_K}")
+    if strand not in STRANDS:
+        raise ValueError(f"Hebra no válida: {strand} (usar {', '.join(STRANDS)})")
+
+
+def kmer_indices(codes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índice de 2k bits del k-mer que empieza en cada posición
+
+    Args:
+        codes: Códigos de nucleótido (ver sequence_scanner.encode_sequence)
+        k: Longitud de los k-mers (1..MAX_K)
+
+    Returns:
+        Arreglo uint32 con los índices de los k-mers sin bases ambiguas, en orden
+    """
+    count = len(codes) - k + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint32)
+
+    # Las bases ambiguas (código 4) se enmascaran a 2 bits y sus k-mers se descartan después
+    bases = (codes & 3).astype(np.uint32)
+    indices = bases[:count].copy()
+    for offset in range(1, k):
+        indices <<= 2
+        indices |= bases[offset:offset + count]
+
+    ambiguous = codes == INVALID_BASE
+    if ambiguous.any():
+        seen = np.concatenate([[0], np.cumsum(ambiguous, dtype=np.int64)])
+        indices = indices[seen[k:] == seen[:-k]]
+    return indices
+
+
+def reverse_complement_indices(indices: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los reversos complementarios (en TCAG, complementar es invertir el bit alto)"""
+    complement = indices ^ np.asarray(int('10' * k, 2), dtype=indices.dtype)
+    reverse = np.zeros_like(complement)
+    for _ in range(k):
+        reverse <<= 2
+        reverse |= complement & 3
+        complement = complement >> 2
+    return reverse
+
+
+def _merge(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Suma las cuentas de las claves repetidas; devuelve las claves ordenadas"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=counts, minlength=len(unique)).astype(np.int64)
+
+
+def count_kmers(sequence: PackedSequence, k: int, strand: str = 'forward',
+                canonical: bool = False,
+                chunk_size: int = SCAN_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cuenta los k-mers de la secuencia completa, por ventanas
+
+    Args:
+        sequence: Secuencia empaquetada
+        k: Longitud de los k-mers (1..MAX_K)
+        strand: 'forward', 'reverse' (reverso complementario) o 'both' (suma de ambas)
+        canonical: Contar cada posición una vez con el menor entre el k-mer y su reverso
+                   complementario (no depende de strand)
+        chunk_size: Bases por ventana
+
+    Returns:
+        (índices de los k-mers presentes, ordenados; sus cuentas)
+
+    Raises:
+        ValueError: Si k o strand no son válidos
+    """
+    check_kmer_params(k, strand)
+
+    length = len(sequence)
+    dense = np.zeros(4 ** k, dtype=np.int64) if k <= DENSE_MAX_K else None
+    parts = []
+    # Cada ventana lleva k - 1 bases de más: cada k-mer se cuenta en la ventana donde empieza
+    for start in range(0, max(length - k + 1, 0), chunk_size):
+        indices = kmer_indices(sequence.codes(start, min(start + chunk_size + k - 1, length)), k)
+        if dense is not None:
+            dense += np.bincount(indices, minlength=len(dense))
+        else:
+            parts.append(np.unique(indices, return_counts=True))
+
+    if dense is not None:
+        keys = np.flatnonzero(dense).astype(np.uint32)
+        counts = dense[keys]
+    elif parts:
+        keys, counts = _merge(np.concatenate([p[0] for p in parts]),
+                              np.concatenate([p[1] for p in parts]))
+    else:
+        keys, counts = np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64)
+
+    if canonical:
+        return _merge(np.minimum(keys, reverse_complement_indices(keys, k)), counts)
+    if strand == 'reverse':
+        return _merge(reverse_complement_indices(keys, k), counts)
+    if strand == 'both':
+        return _merge(np.concatenate([keys, reverse_complement_indices(keys, k)]),
+                      np.concatenate([counts, counts]))
+    return keys, counts
+
+
+def kmer_string(index: int, k: int) -> str:
+    """Secuencia del k-mer con ese índice"""
+    return ''.join(NUCLEOTIDE_ORDER[(index >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def kmer_summary(keys: np.ndarray, counts: np.ndarray, k: int, strand: str,
+                 canonical: bool, top: int = TOP_KMERS) -> Dict:
+    """
+    Resumen serializable de un espectro (lo que se guarda en caché y devuelve la API)
+
+    Returns:
+        Diccionario con k, strand, canonical, total_kmers, distinct_kmers, possible_kmers,
+        top_kmers (los más frecuentes, empates en orden TCAG) y counts (vector completo en
+        orden TCAG, sólo hasta DENSE_OUTPUT_MAX_K)
+    """
+    possible = 4 ** k
+    if canonical:
+        # Pares (k-mer, reverso) más los palíndromos (sólo con k par)
+        possible = (possible + (4 ** (k // 2) if k % 2 == 0 else 0)) // 2
+
+    order = np.lexsort((keys, -counts))[:top]
+    dense = None
+    if k <= DENSE_OUTPUT_MAX_K and not canonical:
+        dense = np.zeros(4 ** k, dtype=np.int64)
+        dense[keys] = counts
+        dense = dense.tolist()
+
+    return {
+        'k': k,
+        'strand': None if canonical else strand,
+        'canonical': canonical,
+        'alphabet': NUCLEOTIDE_ORDER,
+        'total_kmers': int(counts.sum()),
+        'distinct_kmers': len(keys),
+        'possible_kmers': possible,
+        'top_kmers': [{'kmer': kmer_string(int(keys[i]), k), 'count': int(counts[i])}
+                      for i in order.tolist()],
+        'counts': dense
+    }
+
+
+def kmer_spectrum(sequence: Optional[PackedSequence], k: int, strand: str = 'forward',
+                  canonical: bool = False, top: int = TOP_KMERS) -> Dict:
+    """
+    Cuenta y resume los k-mers de una secuencia (ver count_kmers y kmer_summary)
+
+    Raises:
+        ValueError: Si no hay secuencia o los parámetros no son válidos
+    """
+    if sequence is None:
+        raise ValueError("El registro no incluye la secuencia (o supera la longitud máxima)")
+    keys, counts = count_kmers(sequence, k, strand, canonical)
+    return kmer_summary(keys, counts, k, strand, canonical, top)
@@ -0,0 +1,456 @@
+"""
+Métricas del servicio en el formato de texto de Prometheus (/metrics)
+
+Contadores e histogramas se acumulan por proceso. Con un directorio (configure) cada
+proceso escribe sus valores en un archivo propio mapeado en memoria y la exposición suma los
+archivos de todos los procesos, de modo que cualquier worker de mod_wsgi/gunicorn que
+atienda /metrics devuelve el total del servicio.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: sólo las métricas del proceso
+    fcntl = None
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites (segundos) de los histogramas de duración: de peticiones rápidas a análisis de minutos
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                    120.0, 300.0)
+
+# Archivos del directorio compartido: values_<pid>_<id>.db por proceso, y archive.json con la
+# suma de los procesos ya terminados
+VALUES_PREFIX = 'values_'
+VALUES_SUFFIX = '.db'
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+_HEADER = struct.Struct('<Q')  # bytes usados del archivo
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+
+def _entries(data, used: int) -> Iterator[Tuple[str, int, float]]:
+    """(clave, posición del valor, valor) de cada entrada completa de un archivo de valores"""
+    position = _HEADER.size
+    while position + _KEY_LENGTH.size <= used:
+        length = _KEY_LENGTH.unpack_from(data, position)[0]
+        key_start = position + _KEY_LENGTH.size
+        # El valor va alineado a 8 bytes
+        value_at = key_start + length + (-(key_start + length)) % 8
+        if value_at + _VALUE.size > used:
+            return
+        key = bytes(data[key_start:key_start + length]).decode('utf-8')
+        yield key, value_at, _VALUE.unpack_from(data, value_at)[0]
+        position = value_at + _VALUE.size
+
+
+def read_values(path: str) -> Dict[str, float]:
+    """Valores guardados en un archivo de un proceso (ver _MappedValues)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        return {}
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    return {key: value for key, _, value in _entries(data, used)}
+
+
+class _MemoryValues:
+    """Valores de este proceso, sólo en memoria"""
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+
+    def add(self, key: str, amount: float):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self) -> Dict[str, float]:
+        return dict(self._values)
+
+
+class _MappedValues:
+    """
+    Valores de este proceso en un archivo mapeado en memoria, que los demás leen sin bloqueo.
+
+    Cada entrada es (longitud de la clave, clave UTF-8, valor float64 alineado a 8 bytes). La
+    cabecera con los bytes usados se actualiza después de escribir la entrada completa, así
+    que un lector nunca ve una entrada a medias.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), _INITIAL_SIZE)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._offsets: Dict[str, int] = {}
+
+    def add(self, key: str, amount: float):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._append(key)
+        _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def items(self) -> Dict[str, float]:
+        return {key: _VALUE.unpack_from(self._map, offset)[0]
+                for key, offset in self._offsets.items()}
+
+    def _append(self, key: str) -> int:
+        """Añade una entrada a 0 al final del archivo; devuelve la posición de su valor"""
+        encoded = key.encode('utf-8')
+        key_start = self._used + _KEY_LENGTH.size
+        offset = key_start + len(encoded) + (-(key_start + len(encoded))) % 8
+        end = offset + _VALUE.size
+        if end > len(self._map):
+            self._grow(end)
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[key_start:key_start + len(encoded)] = encoded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, end)
+        self._offsets[key] = offset
+        return offset
+
+    def _grow(self, needed: int):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _add_all(totals: Dict[str, float], values: Dict[str, float]):
+    for key, value in values.items():
+        totals[key] = totals.get(key, 0.0) + value
+
+
+def collect_directory(directory: str) -> Dict[str, float]:
+    """
+    Suma los valores de todos los procesos de un directorio de métricas
+
+    Los archivos de los procesos que ya no existen se suman a archive.json y se borran (con
+    el directorio bloqueado), así que los contadores no retroceden cuando un worker se
+    reinicia y el número de archivos no crece sin límite. Los PID se comprueban en esta
+    máquina: el directorio no debe compartirse entre máquinas ni contenedores.
+    """
+    lock_fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        try:
+            with open(archive_path, 'r', encoding='utf-8') as f:
+                archived = json.load(f)
+        except (FileNotFoundError, ValueError):
+            archived = {}
+
+        totals = dict(archived)
+        finished = []
+        for name in os.listdir(directory):
+            if not (name.startswith(VALUES_PREFIX) and name.endswith(VALUES_SUFFIX)):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                values = read_values(path)
+            except FileNotFoundError:
+                continue
+            _add_all(totals, values)
+            pid = name[len(VALUES_PREFIX):].split('_', 1)[0]
+            if pid.isdigit() and not _process_alive(int(pid)):
+                finished.append((path, values))
+
+        if finished:
+            for _, values in finished:
+                _add_all(archived, values)
+            tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(archived, f)
+            os.replace(tmp_path, archive_path)
+            for path, _ in finished:
+                os.remove(path)
+        return totals
+    finally:
+        fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        os.close(lock_fd)
+
+
+class Registry:
+    """Métricas registradas y valores de este proceso (en memoria o en un archivo compartido)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, '_Metric'] = {}
+        self._lock = threading.Lock()
+        self._directory: Optional[str] = None
+        self._values = None
+        self._pid = None
+
+    def register(self, metric: '_Metric'):
+        """
+        Raises:
+            ValueError: Si ya hay una métrica con ese nombre
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def configure(self, directory: Optional[str]):
+        """
+        Directorio compartido por los procesos del servicio (None: sólo este proceso). Los
+        valores anteriores de este proceso no se trasladan.
+        """
+        if directory and fcntl is not None:
+            os.makedirs(directory, exist_ok=True)
+        else:
+            directory = None
+        with self._lock:
+            self._directory = directory
+            self._values = None
+
+    def add(self, *increments: Tuple[str, float]):
+        """Suma cada (clave, cantidad) a los valores de este proceso"""
+        with self._lock:
+            # Un proceso hijo (fork) no debe escribir en el archivo del padre
+            if self._values is None or self._pid != os.getpid():
+                self._values = self._open()
+                self._pid = os.getpid()
+            for key, amount in increments:
+                self._values.add(key, amount)
+
+    def _open(self):
+        if self._directory is None:
+            return _MemoryValues()
+        name = f"{VALUES_PREFIX}{os.getpid()}_{uuid.uuid4().hex[:8]}{VALUES_SUFFIX}"
+        return _MappedValues(os.path.join(self._directory, name))
+
+    def collect(self) -> Dict[str, float]:
+        """Valores de todos los procesos (o de este, sin directorio) por clave"""
+        with self._lock:
+            directory = self._directory
+            if directory is None:
+                return self._values.items() if self._values is not None else {}
+        return collect_directory(directory)
+
+    def exposition(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        grouped: Dict[str, Dict[Tuple[str, Tuple[str, ...]], float]] = {}
+        for key, value in self.collect().items():
+            name, suffix, *label_values = json.loads(key)
+            grouped.setdefault(name, {})[(suffix, tuple(label_values))] = value
+
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quotes=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample, labels, value in metric.samples(grouped.get(metric.name, {})):
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def configure(directory: Optional[str]):
+    """Directorio compartido de las métricas del proceso (ver Registry.configure)"""
+    REGISTRY.configure(directory)
+
+
+def _escape(text: str, quotes: bool = True) -> str:
+    text = text.replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quotes else text
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if math.isinf(bound) else repr(float(bound))
+
+
+class _Metric:
+    """Métrica con nombre, descripción y etiquetas fijas (se registra al crearla)"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        registry.register(self)
+
+    def _label_values(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        """
+        Raises:
+            ValueError: Si las etiquetas no son exactamente las de la métrica
+        """
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(f"Etiquetas de {self.name}: {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _key(self, suffix: str, values: Tuple[str, ...]) -> str:
+        return json.dumps([self.name, suffix, *values])
+
+    def samples(self, values: Dict[Tuple[str, Tuple[str, ...]], float]
+                ) -> List[Tuple[str, List[Tuple[str, str]], float]]:
+        """(nombre de la muestra, etiquetas, valor) a partir de los valores sumados"""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monótono (por convención el nombre acaba en _total)"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._registry.add((self._key('', self._label_values(labels)), amount))
+
+    def samples(self, values):
+        return [(self.name, list(zip(self.labelnames, label_values)), value)
+                for (_, label_values), value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Histograma acumulado por intervalos (buckets), con _sum y _count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS, registry: Registry = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._bounds = [_format_bound(bound) for bound in self.buckets]
+
+    def observe(self, value: float, **labels):
+        # Cada observación se guarda sólo en su intervalo; los acumulados se calculan al exponer
+        label_values = self._label_values(labels)
+        bound = self._bounds[bisect_left(self.buckets, value)]
+        self._registry.add((self._key('_bucket', label_values + (bound,)), 1.0),
+                           (self._key('_sum', label_values), value))
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observa la duración del bloque with en segundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self, values):
+        series = sorted({label_values[:len(self.labelnames)] if suffix == '_bucket' else label_values
+                         for suffix, label_values in values})
+        samples = []
+        for label_values in series:
+            labels = list(zip(self.labelnames, label_values))
+            cumulative = 0.0
+            for bound in self._bounds:
+                cumulative += values.get(('_bucket', label_values + (bound,)), 0.0)
+                samples.append((f"{self.name}_bucket", labels + [('le', bound)], cumulative))
+            samples.append((f"{self.name}_sum", labels, values.get(('_sum', label_values), 0.0)))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Gauge(_Metric):
+    """
+    Valor instantáneo que se calcula al exponer (ej: la profundidad de la cola), con la
+    función indicada en set_function; no se suma entre procesos
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Registry = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """function() devuelve {valores de las etiquetas: valor}"""
+        self._function = function
+
+    def samples(self, values):
+        if self._function is None:
+            return []
+        try:
+            current = self._function()
+        except Exception:
+            # Una fuente no disponible (ej: la base de datos de la cola) no rompe /metrics
+            return []
+        return [(self.name, list(zip(self.labelnames, map(str, label_values))), float(value))
+                for label_values, value in sorted(current.items())]
+
+
+# Métricas del servicio
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'Peticiones HTTP atendidas', ('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Duración de las peticiones HTTP hasta la respuesta (en streaming, hasta la cabecera)',
+    ('endpoint', 'method')
+)
+NCBI_REQUEST_DURATION = Histogram(
+    'ncbi_request_duration_seconds',
+    'Latencia de las peticiones a NCBI Entrez sin la espera del rate limit (download: '
+    'descarga completa del registro)',
+    ('operation',)
+)
+NCBI_REQUEST_ERRORS = Counter(
+    'ncbi_request_errors_total', 'Peticiones a NCBI Entrez fallidas', ('operation',)
+)
+GEMINI_REQUEST_DURATION = Histogram(
+    'gemini_request_duration_seconds', 'Latencia de las llamadas a Gemini', ('operation',)
+)
+GEMINI_REQUESTS = Counter(
+    'gemini_requests_total',
+    'Llamadas a Gemini por resultado: ok, rate_limited (429 o cuota) o error',
+    ('operation', 'outcome')
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Consultas a las cachés por resultado (hit o miss)', ('cache', 'result')
+)
+PDF_GENERATION_DURATION = Histogram(
+    'pdf_generation_duration_seconds', 'Tiempo de generación de los informes PDF', ('type',)
+)
+JOB_QUEUE_JOBS = Gauge(
+    'job_queue_jobs', 'Trabajos asíncronos por estado (cola compartida por los procesos)',
+    ('status',)
+)
@@ -0,0 +1,307 @@
+"""
+Almacenamiento compacto de secuencias: 2 bits por base más una tabla de tramos ambiguos
+"""
+from typing import List, Optional, Tuple, Union
+import io
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+from Bio.Seq import SequenceDataAbstractBaseClass
+
+from sequence_scanner import BASE_CODES, INVALID_BASE, NUCLEOTIDE_ORDER
+
+
+# Formato en disco: cabecera, tabla de tramos ambiguos y bytes empaquetados (mapeables con mmap)
+FILE_MAGIC = b'PSEQ2BIT'
+FILE_VERSION = 1
+HEADER = struct.Struct('<8sIQQQQ')  # magic, versión, longitud, tramos, tamaño e inodo del origen
+
+# Bases empaquetadas por bloque al construir o recorrer la secuencia
+PACK_CHUNK_SIZE = 4 * 1024 * 1024
+
+LETTERS = np.frombuffer(NUCLEOTIDE_ORDER.encode('ascii'), dtype=np.uint8)
+_UPPER = np.arange(256, dtype=np.uint8)
+_UPPER[ord('a'):ord('z') + 1] -= 32
+
+# Byte empaquetado -> sus cuatro códigos (la primera base en los bits altos)
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+UNPACK = (np.arange(256, dtype=np.uint8)[:, None] >> _SHIFTS) & 3
+
+# Byte empaquetado -> cuántas de sus cuatro bases son C/G (códigos 1 y 3 en orden TCAG)
+_GC_CODES = [NUCLEOTIDE_ORDER.index('C'), NUCLEOTIDE_ORDER.index('G')]
+GC_PER_BYTE = np.isin(UNPACK, _GC_CODES).sum(axis=1).astype(np.int64)
+
+
+def _pack_codes(codes: np.ndarray) -> np.ndarray:
+    """Empaqueta códigos 0-3 de cuatro en cuatro; el último byte se completa con ceros"""
+    padding = (-len(codes)) % 4
+    if padding:
+        codes = np.concatenate([codes, np.zeros(padding, dtype=np.uint8)])
+    quads = codes.reshape(-1, 4)
+    packed = quads[:, 0] << 6
+    packed |= quads[:, 1] << 4
+    packed |= quads[:, 2] << 2
+    packed |= quads[:, 3]
+    return packed
+
+
+def _ambiguous_runs(raw: np.ndarray, codes: np.ndarray,
+                    offset: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Tramos consecutivos de una misma base ambigua: (inicios, fines, letra)"""
+    positions = np.flatnonzero(codes == INVALID_BASE)
+    if len(positions) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.uint8)
+    letters = _UPPER[raw[positions]]
+    breaks = np.flatnonzero((np.diff(positions) != 1) | (letters[1:] != letters[:-1])) + 1
+    first = np.concatenate([[0], breaks])
+    last = np.concatenate([breaks - 1, [len(positions) - 1]])
+    return offset + positions[first], offset + positions[last] + 1, letters[first]
+
+
+def _merge_runs(starts: np.ndarray, ends: np.ndarray,
+                letters: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Une los tramos contiguos de la misma letra (los cortados entre bloques)"""
+    if len(starts) < 2:
+        return starts, ends, letters
+    continues = (starts[1:] == ends[:-1]) & (letters[1:] == letters[:-1])
+    first = np.flatnonzero(np.concatenate([[True], ~continues]))
+    last = np.concatenate([first[1:] - 1, [len(starts) - 1]])
+    return starts[first], ends[last], letters[first]
+
+
+def source_signature(path: str) -> Tuple[int, int]:
+    """Tamaño e inodo de un archivo: cambian cuando el archivo se reemplaza"""
+    st = os.stat(path)
+    return st.st_size, st.st_ino
+
+
+class PackedSequence(SequenceDataAbstractBaseClass):
+    """
+    Secuencia de nucleótidos con 2 bits por base (orden TCAG de sequence_scanner).
+
+    Las bases que no son T/C/A/G (N y demás códigos IUPAC) se guardan aparte como
+    tramos (inicio, fin, letra). Se puede usar como datos de un Seq de Biopython
+    (Seq(packed)): los cortes sólo desempaquetan la región pedida.
+    """
+    __slots__ = ('_length', 'packed', 'run_starts', 'run_ends', 'run_letters')
+
+    def __init__(self, length: int, packed: np.ndarray, run_starts: np.ndarray,
+                 run_ends: np.ndarray, run_letters: np.ndarray):
+        """
+        Args:
+            length: Número de bases
+            packed: Bytes empaquetados (ceil(length / 4)), en memoria o mapeados con mmap
+            run_starts, run_ends, run_letters: Tramos ambiguos ordenados (fin exclusivo)
+        """
+        self._length = length
+        self.packed = packed
+        self.run_starts = run_starts
+        self.run_ends = run_ends
+        self.run_letters = run_letters
+        super().__init__()
+
+    @classmethod
+    def from_bytes(cls, sequence: Union[str, bytes]) -> 'PackedSequence':
+        """Empaqueta una secuencia completa (mayúsculas o minúsculas)"""
+        builder = PackedSequenceBuilder()
+        builder.write(sequence.encode('ascii', 'replace') if isinstance(sequence, str) else sequence)
+        return builder.finish()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, end, step = key.indices(self._length)
+            if step == 1:
+                return self._decode(start, max(start, end))
+            return self._decode(0, self._length)[key]
+        index = key + self._length if key < 0 else key
+        if not 0 <= index < self._length:
+            raise IndexError("índice fuera de la secuencia")
+        return self._decode(index, index + 1)[0]
+
+    def upper(self) -> 'PackedSequence':
+        """Las bases se guardan siempre en mayúsculas"""
+        return self
+
+    def codes(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """
+        Códigos de nucleótido de una región, como los de sequence_scanner.encode_sequence
+
+        Args:
+            start: Posición inicial (0-based)
+            end: Posición final exclusiva (None = hasta el final)
+
+        Returns:
+            Arreglo uint8 con un código 0-3 por base, INVALID_BASE en bases ambiguas
+        """
+        end = self._length if end is None else min(end, self._length)
+        if end <= start:
+            return np.empty(0, dtype=np.uint8)
+        first_byte = start // 4
+        codes = UNPACK[self.packed[first_byte:(end + 3) // 4]].reshape(-1)
+        codes = codes[start - 4 * first_byte:end - 4 * first_byte]
+
+        mask, letters = self._ambiguous_in(start, end)
+        if letters is not None:
+            codes[mask] = INVALID_BASE
+        return codes
+
+    def _ambiguous_in(self, start: int, end: int) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Máscara de posiciones ambiguas de la región y sus letras en orden (None si no hay)"""
+        first = np.searchsorted(self.run_ends, start, side='right')
+        last = np.searchsorted(self.run_starts, end, side='left')
+        if first >= last:
+            return None, None
+        starts = np.clip(self.run_starts[first:last], start, end) - start
+        ends = np.clip(self.run_ends[first:last], start, end) - start
+        marks = np.zeros(end - start + 1, dtype=np.int32)
+        marks[starts] += 1
+        marks[ends] -= 1
+        mask = np.cumsum(marks[:-1]) > 0
+        return mask, np.repeat(self.run_letters[first:last], ends - starts)
+
+    def _decode(self, start: int, end: int) -> bytes:
+        """Letras de una región como bytes en mayúsculas"""
+        if end <= start:
+            return b""
+        first_byte = start // 4
+        codes = UNPACK[self.packed[first_byte:(end + 3) // 4]].reshape(-1)
+        letters = LETTERS[codes[start - 4 * first_byte:end - 4 * first_byte]]
+        mask, ambiguous = self._ambiguous_in(start, end)
+        if ambiguous is not None:
+            letters[mask] = ambiguous
+        return letters.tobytes()
+
+    def gc_fraction(self) -> float:
+        """
+        Fracción GC con la misma regla que Bio.SeqUtils.gc_fraction (ambiguous='remove'):
+        C, G y S cuentan como GC; el total es GC más A, T, W y U
+        """
+        gc = 0
+        acgt = 0
+        for offset in range(0, len(self.packed), PACK_CHUNK_SIZE):
+            counts = np.bincount(self.packed[offset:offset + PACK_CHUNK_SIZE], minlength=256)
+            gc += int(counts @ GC_PER_BYTE)
+            acgt += 4 * int(counts.sum())
+
+        # Las bases ambiguas y el relleno del último byte se empaquetaron como T (código 0)
+        run_lengths = self.run_ends - self.run_starts
+        acgt -= int(run_lengths.sum()) + (4 * len(self.packed) - self._length)
+
+        def run_total(letters: bytes) -> int:
+            return int(run_lengths[np.isin(self.run_letters, list(letters))].sum())
+
+        gc += run_total(b'S')
+        length = acgt + run_total(b'SWU')
+        return gc / length if length else 0
+
+    def save(self, path: str, source: Optional[str] = None):
+        """
+        Guarda la secuencia en un archivo mapeable (escritura atómica)
+
+        Args:
+            path: Archivo destino
+            source: Archivo del que se obtuvo la secuencia; load() descarta la copia
+                    si ese archivo se reemplaza después
+        """
+        source_size, source_ino = source_signature(source) if source else (0, 0)
+        run_count = len(self.run_starts)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(FILE_MAGIC, FILE_VERSION, self._length, run_count,
+                                    source_size, source_ino))
+                f.write(self.run_starts.astype('<i8').tobytes())
+                f.write(self.run_ends.astype('<i8').tobytes())
+                f.write(self.run_letters.tobytes())
+                f.write(b'\0' * ((-run_count) % 8))
+                for offset in range(0, len(self.packed), PACK_CHUNK_SIZE):
+                    f.write(self.packed[offset:offset + PACK_CHUNK_SIZE].tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, source: Optional[str] = None) -> Optional['PackedSequence']:
+        """
+        Abre un archivo creado con save(), mapeando los bytes empaquetados con mmap:
+        los procesos que abren el mismo archivo comparten sus páginas en la caché del sistema
+
+        Args:
+            path: Archivo de la secuencia
+            source: Archivo de origen esperado (ver save)
+
+        Returns:
+            La secuencia, o None si no existe, está dañada o su origen cambió
+        """
+        try:
+            with open(path, 'rb') as f:
+                magic, version, length, run_count, source_size, source_ino = HEADER.unpack(
+                    f.read(HEADER.size))
+                if magic != FILE_MAGIC or version != FILE_VERSION:
+                    return None
+                if source and (source_size, source_ino) != source_signature(source):
+                    return None
+                run_starts = np.fromfile(f, dtype='<i8', count=run_count).astype(np.int64)
+                run_ends = np.fromfile(f, dtype='<i8', count=run_count).astype(np.int64)
+                run_letters = np.fromfile(f, dtype=np.uint8, count=run_count)
+
+            offset = HEADER.size + 17 * run_count + (-run_count) % 8
+            packed_length = (length + 3) // 4
+            if os.path.getsize(path) != offset + packed_length:
+                return None
+            packed = (np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(packed_length,))
+                      if packed_length else np.empty(0, dtype=np.uint8))
+
+            # Marcar el acceso para la expulsión LRU de la caché de registros
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except (OSError, ValueError, struct.error):
+            return None
+        return cls(length, packed, run_starts, run_ends, run_letters)
+
+
+class PackedSequenceBuilder:
+    """Empaqueta una secuencia que llega por partes (ej: las líneas de un registro GenBank)"""
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._packed = io.BytesIO()
+        self._length = 0
+        self._runs: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def write(self, data: bytes):
+        """Añade bases al final de la secuencia"""
+        self._pending += data
+        if len(self._pending) >= PACK_CHUNK_SIZE:
+            self._flush(len(self._pending) - len(self._pending) % 4)
+
+    def _flush(self, size: int):
+        chunk = bytes(self._pending[:size])
+        del self._pending[:size]
+        raw = np.frombuffer(chunk, dtype=np.uint8)
+        codes = BASE_CODES[raw]
+        self._runs.append(_ambiguous_runs(raw, codes, self._length))
+        codes &= 3
+        self._packed.write(_pack_codes(codes).tobytes())
+        self._length += size
+
+    def finish(self) -> PackedSequence:
+        """Empaqueta lo pendiente y devuelve la secuencia completa"""
+        if self._pending:
+            self._flush(len(self._pending))
+        if self._runs:
+            starts, ends, letters = (np.concatenate(parts) for parts in zip(*self._runs))
+        else:
+            starts = ends = np.empty(0, dtype=np.int64)
+            letters = np.empty(0, dtype=np.uint8)
+        starts, ends, letters = _merge_runs(starts, ends, letters)
+        packed = np.frombuffer(self._packed.getvalue(), dtype=np.uint8)
+        return PackedSequence(self._length, packed, starts, ends, letters)
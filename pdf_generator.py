@@ -14,9 +14,12 @@ matplotlib.use('Agg')  # Backend sin GUI
 import matplotlib.pyplot as plt
 from io import BytesIO
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import os
 
+from report_format import format_percent
+from stage_timing import NULL_TIMER, StageTimer
+
 
 class PDFGenerator:
     """Genera PDFs profesionales con análisis genómico en formato IEGE"""
@@ -77,17 +80,20 @@ class PDFGenerator:
         ))
     
     def generate_single_genome_report(self, analysis: Dict, 
-                                     ai_interpretation: Optional[Dict] = None) -> str:
+                                     ai_interpretation: Optional[Dict] = None,
+                                     timer: Optional[StageTimer] = None) -> str:
         """
         Genera un reporte PDF de un genoma individual
         
         Args:
             analysis: Resultado de GenomeAnalyzer.analyze_genome()
             ai_interpretation: Interpretación de IA (opcional)
+            timer: Mide cada sección y la construcción del PDF (ver stage_timing)
             
         Returns:
             Ruta del archivo PDF generado
         """
+        timer = timer or NULL_TIMER
         doc = SimpleDocTemplate(self.output_path, pagesize=letter,
                                rightMargin=72, leftMargin=72,
                                topMargin=72, bottomMargin=18)
@@ -95,52 +101,56 @@ class PDFGenerator:
         story = []
         
         # Portada
-        story.extend(self._create_cover_page(analysis))
+        self._add_section(story, timer, 'cover', self._create_cover_page, analysis)
         story.append(PageBreak())
         
         # Índice
-        story.extend(self._create_table_of_contents())
+        self._add_section(story, timer, 'table_of_contents', self._create_table_of_contents)
         story.append(PageBreak())
         
         # Resumen Ejecutivo
-        story.extend(self._create_executive_summary(analysis))
+        self._add_section(story, timer, 'executive_summary', self._create_executive_summary, analysis)
         
         # Información Básica
-        story.extend(self._create_basic_info_section(analysis))
+        self._add_section(story, timer, 'basic_info', self._create_basic_info_section, analysis)
         story.append(PageBreak())
         
         # Análisis de Genes
-        story.extend(self._create_gene_analysis_section(analysis))
+        self._add_section(story, timer, 'genes', self._create_gene_analysis_section, analysis)
         
         # Análisis de Codones
-        story.extend(self._create_codon_analysis_section(analysis))
+        self._add_section(story, timer, 'codons', self._create_codon_analysis_section, analysis)
         
         # Frecuencia de los 64 Codones
         story.append(PageBreak())
-        story.extend(self._create_codon_frequency_section(analysis))
+        self._add_section(story, timer, 'codon_frequency', self._create_codon_frequency_section,
+                          analysis)
         
         # Distribución Genómica
-        story.extend(self._create_distribution_section(analysis))
+        self._add_section(story, timer, 'distribution', self._create_distribution_section, analysis)
         
         # Estructura Genómica (Intrones/Exones)
-        story.extend(self._create_structure_section(analysis))
+        self._add_section(story, timer, 'structure', self._create_structure_section, analysis)
         
         # Modificación Genómica
         story.append(PageBreak())
-        story.extend(self._create_genomic_modification_section())
+        self._add_section(story, timer, 'genomic_modification',
+                          self._create_genomic_modification_section)
         
         # Interpretación de IA
         if ai_interpretation:
             story.append(PageBreak())
-            story.extend(self._create_ai_interpretation_section(ai_interpretation))
+            self._add_section(story, timer, 'ai_interpretation',
+                              self._create_ai_interpretation_section, ai_interpretation)
         
         # Construir PDF
-        doc.build(story)
+        self._build(doc, story, timer)
         return self.output_path
     
     def generate_comparison_report(self, comparison: Dict, genome1: Dict, 
                                    genome2: Dict, 
-                                   ai_interpretation: Optional[Dict] = None) -> str:
+                                   ai_interpretation: Optional[Dict] = None,
+                                   timer: Optional[StageTimer] = None) -> str:
         """
         Genera un reporte PDF de comparación de genomas
         
@@ -149,10 +159,12 @@ class PDFGenerator:
             genome1: Análisis del primer genoma
             genome2: Análisis del segundo genoma
             ai_interpretation: Interpretación de IA (opcional)
+            timer: Mide cada sección y la construcción del PDF (ver stage_timing)
             
         Returns:
             Ruta del archivo PDF generado
         """
+        timer = timer or NULL_TIMER
         doc = SimpleDocTemplate(self.output_path, pagesize=letter,
                                rightMargin=72, leftMargin=72,
                                topMargin=72, bottomMargin=18)
@@ -160,24 +172,40 @@ class PDFGenerator:
         story = []
         
         # Portada
-        story.extend(self._create_comparison_cover(comparison, genome1, genome2))
+        self._add_section(story, timer, 'cover', self._create_comparison_cover,
+                          comparison, genome1, genome2)
         story.append(PageBreak())
         
         # Resumen de Comparación
-        story.extend(self._create_comparison_summary(comparison, genome1, genome2))
+        self._add_section(story, timer, 'comparison_summary', self._create_comparison_summary,
+                          comparison, genome1, genome2)
         story.append(PageBreak())
         
         # Comparación Detallada
-        story.extend(self._create_detailed_comparison(comparison, genome1, genome2))
+        self._add_section(story, timer, 'detailed_comparison', self._create_detailed_comparison,
+                          comparison, genome1, genome2)
         
         # Interpretación de IA
         if ai_interpretation:
             story.append(PageBreak())
-            story.extend(self._create_ai_interpretation_section(ai_interpretation))
+            self._add_section(story, timer, 'ai_interpretation',
+                              self._create_ai_interpretation_section, ai_interpretation)
         
-        doc.build(story)
+        self._build(doc, story, timer)
         return self.output_path
     
+    @staticmethod
+    def _add_section(story: list, timer, name: str, create: Callable[..., list], *args):
+        """Añade al story los elementos de una sección, midiendo su creación como etapa"""
+        with timer.stage(name):
+            story.extend(create(*args))
+    
+    def _build(self, doc: SimpleDocTemplate, story: list, timer):
+        """Construye el PDF (maquetación y escritura); bytes es el tamaño del archivo"""
+        with timer.stage('build') as entry:
+            doc.build(story)
+            entry['bytes'] = os.path.getsize(self.output_path)
+    
     def _create_cover_page(self, analysis: Dict) -> list:
         """Crea la portada del reporte"""
         elements = []
@@ -273,7 +301,7 @@ class PDFGenerator:
         <br/><br/>
         <b>Características Principales:</b><br/>
         • Longitud total: {analysis['length']:,} pares de bases<br/>
-        • Contenido GC: {analysis['gc_content']}%<br/>
+        • Contenido GC: {format_percent(analysis['gc_content'])}<br/>
         • Total de genes CDS: {analysis['genes_analysis']['total_cds']}<br/>
         • Distancia promedio entre genes: {analysis['genes_analysis']['average_gene_distance']:.2f} pb<br/>
         """
@@ -302,7 +330,7 @@ class PDFGenerator:
             ['Descripción', analysis['basic_info']['description'][:150] + '...'],
             ['Taxonomía (últimos 5 levels)', taxonomy],
             ['Longitud (pb)', f"{analysis['length']:,}"],
-            ['Contenido GC (%)', f"{analysis['gc_content']}%"]
+            ['Contenido GC (%)', format_percent(analysis['gc_content'])]
         ]
         
         table = Table(data, colWidths=[2.5*inch, 4*inch])
@@ -349,7 +377,11 @@ class PDFGenerator:
         
         # Lista detallada (Top 20 por longitud)
         elements.append(Paragraph("Top 20 Genes más largos:", self.styles['Section']))
-        cds_sorted = sorted(genes['cds_details'], key=lambda x: x['length'], reverse=True)[:20]
+        if 'top_genes' in genes:
+            # Calculado en el servidor (las respuestas de la API no incluyen cds_details)
+            cds_sorted = genes['top_genes'][:20]
+        else:
+            cds_sorted = sorted(genes['cds_details'], key=lambda x: x['length'], reverse=True)[:20]
         
         header = ['Gen', 'Producto', 'Longitud (pb)', 'Proteína (aa)']
         table_data = [header]
@@ -644,9 +676,9 @@ class PDFGenerator:
             ['Longitud (pb)', f"{comp['length']['genome1']:,}", 
              f"{comp['length']['genome2']:,}", 
              f"{comp['length']['difference']:,} ({comp['length']['percent_diff']}%)"],
-            ['Contenido GC (%)', f"{comp['gc_content']['genome1']}%", 
-             f"{comp['gc_content']['genome2']}%", 
-             f"{comp['gc_content']['difference']}%"],
+            ['Contenido GC (%)', format_percent(comp['gc_content']['genome1']), 
+             format_percent(comp['gc_content']['genome2']), 
+             format_percent(comp['gc_content']['difference'])],
             ['Genes CDS', str(comp['genes']['genome1_cds']), 
              str(comp['genes']['genome2_cds']), 
              str(comp['genes']['difference'])],
@@ -691,6 +723,11 @@ class PDFGenerator:
             comparison['similarity']['overall_similarity']
         ]
         
+        # Sin el GC de alguno de los genomas (registro sin secuencia) se omite esa barra
+        # en lugar de dibujarla como 0 %
+        if genome1['gc_content'] is None or genome2['gc_content'] is None:
+            del categories[1], genome1_values[1], genome2_values[1]
+        
         x = range(len(categories))
         width = 0.35
         
@@ -0,0 +1,129 @@
+"""
+Limitador de tasa (token bucket) para las peticiones a NCBI Entrez
+"""
+from typing import Dict, Optional, Tuple
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sólo se coordina dentro del proceso
+    fcntl = None
+
+
+# Límites publicados por NCBI E-utilities
+NCBI_RATE_WITHOUT_KEY = 3.0
+NCBI_RATE_WITH_KEY = 10.0
+
+
+def ncbi_rate(api_key: Optional[str]) -> float:
+    """Peticiones por segundo permitidas por NCBI según haya o no API key"""
+    return NCBI_RATE_WITH_KEY if api_key else NCBI_RATE_WITHOUT_KEY
+
+
+class TokenBucket:
+    """
+    Token bucket compartido entre hilos y, opcionalmente, entre procesos.
+
+    Cada petición consume un token; los tokens se reponen a `rate` por segundo
+    hasta un máximo de `capacity`. Si no hay token disponible, la llamada reserva
+    el siguiente y espera sólo el tiempo necesario.
+
+    Con `state_path`, el estado del bucket vive en un archivo protegido con flock,
+    de modo que todos los workers de mod_wsgi/gunicorn comparten el mismo límite.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, state_path: Optional[str] = None):
+        """
+        Args:
+            rate: Peticiones por segundo permitidas
+            capacity: Ráfaga máxima de peticiones seguidas
+            state_path: Archivo de estado compartido entre procesos (None = sólo este proceso)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.state_path = state_path if fcntl is not None else None
+        self._tokens = capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled_requests': 0, 'throttled_seconds': 0.0}
+        if self.state_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+
+    def acquire(self) -> float:
+        """
+        Consume un token, esperando si el bucket está vacío
+
+        Returns:
+            Segundos esperados
+        """
+        with self._lock:
+            if self.state_path:
+                wait = self._reserve_shared()
+            else:
+                self._tokens, self._updated, wait = self._reserve(self._tokens, self._updated)
+
+            self.stats['requests'] += 1
+            if wait > 0:
+                self.stats['throttled_requests'] += 1
+                self.stats['throttled_seconds'] += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _reserve(self, tokens: float, updated: float) -> Tuple[float, float, float]:
+        """Repone tokens según el tiempo transcurrido y reserva uno; devuelve el nuevo estado y la espera"""
+        now = time.time()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        # El token se reserva aunque quede en negativo: los siguientes esperan por turno
+        tokens -= 1
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, now, wait
+
+    def _reserve_shared(self) -> float:
+        """Reserva un token del estado guardado en state_path (bloqueo exclusivo entre procesos)"""
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 64).decode('ascii', 'ignore').split()
+            try:
+                tokens, updated = float(raw[0]), float(raw[1])
+            except (IndexError, ValueError):
+                tokens, updated = self.capacity, time.time()
+
+            tokens, updated, wait = self._reserve(tokens, updated)
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{tokens:.6f} {updated:.6f}".encode('ascii'))
+            return wait
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def get_stats(self) -> Dict:
+        """Peticiones atendidas y tiempo total de espera por el límite (en este proceso)"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['throttled_seconds'] = round(stats['throttled_seconds'], 3)
+        stats['rate'] = self.rate
+        stats['shared_between_processes'] = self.state_path is not None
+        return stats
+
+
+_shared_buckets: Dict[Tuple[float, Optional[str]], TokenBucket] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_bucket(rate: float, state_path: Optional[str] = None) -> TokenBucket:
+    """
+    Devuelve el bucket del proceso para esa tasa y archivo de estado, creándolo la primera vez.
+    Así todos los GenomeAnalyzer de un proceso comparten el mismo límite.
+    """
+    key = (rate, state_path)
+    with _shared_lock:
+        if key not in _shared_buckets:
+            _shared_buckets[key] = TokenBucket(rate, state_path=state_path)
+        return _shared_buckets[key]
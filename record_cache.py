@@ -0,0 +1,228 @@
+"""
+Caché persistente en disco de registros GenBank descargados de NCBI
+"""
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Optional, Tuple, Union
+import gzip
+import os
+import re
+import threading
+import time
+
+from metrics import CACHE_LOOKUPS
+
+
+RECORD_SUFFIX = '.gb.gz'
+# Secuencia empaquetada a 2 bits por base (packed_sequence), junto a cada registro
+SEQUENCE_SUFFIX = '.2bit'
+
+# Resultado de cada consulta en cache_lookups_total (una entrada caducada que se vuelve a
+# descargar cuenta como miss)
+LOOKUP_RESULTS = {'hits': 'hit', 'misses': 'miss', 'refreshes': 'miss'}
+
+
+class RecordCache:
+    """
+    Guarda el registro GenBank de cada accesión comprimido con gzip en un directorio.
+
+    - La clave es el ID de acceso tal como se pidió (incluye la versión, ej: NC_045512.2)
+    - mtime del archivo = última vez que la copia se validó contra NCBI (para el TTL)
+    - atime del archivo = último acceso (para la expulsión LRU por tamaño total)
+    - KEY.2bit = secuencia empaquetada del registro, mapeable con mmap; cuenta para el
+      tamaño total y se expulsa con el mismo criterio LRU
+
+    El estado vive por completo en el sistema de archivos, así que varios procesos
+    (workers de mod_wsgi/gunicorn) pueden compartir el mismo directorio.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3,
+                 ttl_seconds: float = 24 * 3600):
+        """
+        Args:
+            cache_dir: Directorio donde se guardan los registros
+            max_bytes: Tamaño máximo total (comprimido) antes de expulsar entradas
+            ttl_seconds: Antigüedad a partir de la cual una entrada se revalida con NCBI
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidations': 0, 'refreshes': 0, 'evictions': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, accession_id: str, suffix: str = RECORD_SUFFIX) -> str:
+        """Ruta del archivo de caché para una accesión"""
+        key = re.sub(r'[^A-Za-z0-9._-]', '_', accession_id.strip().upper())
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def sequence_path(self, accession_id: str) -> str:
+        """Ruta de la secuencia empaquetada de una accesión (ver packed_sequence)"""
+        return self.path_for(accession_id, SEQUENCE_SUFFIX)
+
+    def fetch(self, accession_id: str, download: Callable[[str, BinaryIO], None],
+              remote_update_date: Optional[Callable[[str], Optional[datetime]]] = None) -> str:
+        """
+        Devuelve la ruta del registro GenBank de la accesión, descargándolo sólo si
+        no hay copia local válida
+
+        Args:
+            accession_id: ID de acceso NCBI
+            download: Función download(accession_id, destino) que escribe el registro
+                      GenBank en un archivo binario (Entrez o un sustituto local)
+            remote_update_date: Función que devuelve la fecha de actualización del registro
+                                en NCBI; si es None las entradas caducadas se descargan de nuevo
+
+        Returns:
+            Ruta del archivo comprimido con gzip (leer con genbank_stream.open_genbank)
+        """
+        path = self.path_for(accession_id)
+        first_line = self._touch(path)
+
+        if first_line is None:
+            self._count('misses')
+            return self.store(accession_id, download)
+
+        if time.time() - os.path.getmtime(path) < self.ttl_seconds:
+            self._count('hits')
+            return path
+
+        # Entrada caducada: revalidar antes de volver a descargar
+        self._count('revalidations')
+        try:
+            remote_date = remote_update_date(accession_id) if remote_update_date else None
+        except Exception:
+            # NCBI no disponible: servir la copia local
+            self._count('hits')
+            return path
+
+        if remote_date is not None and remote_date == locus_date(first_line):
+            os.utime(path)
+            self._count('hits')
+            return path
+
+        self._count('refreshes')
+        return self.store(accession_id, download)
+
+    def get_fresh(self, accession_id: str) -> Optional[str]:
+        """
+        Ruta del registro si hay una copia local dentro del TTL, sin contactar con NCBI
+
+        Returns:
+            Ruta del archivo, o None si no existe o está caducado (hay que descargarlo
+            de nuevo, ej: en un grupo de efetch con varias accesiones)
+        """
+        path = self.path_for(accession_id)
+        if self._touch(path) is not None and time.time() - os.path.getmtime(path) < self.ttl_seconds:
+            self._count('hits')
+            return path
+        self._count('misses')
+        return None
+
+    def store(self, accession_id: str, download: Callable[[str, BinaryIO], None]) -> str:
+        """
+        Guarda de forma atómica el registro que download(accession_id, destino) escribe,
+        comprimiéndolo a medida que llega (nunca está entero en memoria)
+
+        Returns:
+            Ruta de la entrada guardada
+        """
+        path = self.path_for(accession_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                download(accession_id, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Elimina las entradas usadas hace más tiempo hasta respetar max_bytes
+
+        Args:
+            keep: Ruta de una entrada que no debe expulsarse (la recién guardada)
+        """
+        evicted = evict_lru_files(self.cache_dir, (RECORD_SUFFIX, SEQUENCE_SUFFIX),
+                                  self.max_bytes, keep)
+        if evicted:
+            with self._lock:
+                self.stats['evictions'] += evicted
+
+    def _touch(self, path: str) -> Optional[str]:
+        """Lee la línea LOCUS de una entrada y marca su último acceso; None si no existe o está corrupta"""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as f:
+                first_line = f.readline()
+            st = os.stat(path)
+            os.utime(path, (time.time(), st.st_mtime))
+            return first_line
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+        if key in LOOKUP_RESULTS:
+            CACHE_LOOKUPS.inc(cache='record', result=LOOKUP_RESULTS[key])
+
+    def get_stats(self) -> Dict:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            return dict(self.stats)
+
+
+def evict_lru_files(directory: str, suffix: Union[str, Tuple[str, ...]], max_bytes: int,
+                    keep: Optional[str] = None) -> int:
+    """
+    Borra los archivos con menor atime de un directorio hasta que el total quede bajo max_bytes
+
+    Args:
+        directory: Directorio de la caché
+        suffix: Sólo se consideran archivos con esta terminación (o alguna de ellas)
+        max_bytes: Tamaño total permitido
+        keep: Ruta de un archivo que nunca se borra (cuenta para el total)
+
+    Returns:
+        Número de archivos eliminados
+    """
+    entries = []
+    total = 0
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        total += st.st_size
+        if path != keep:
+            entries.append((st.st_atime, st.st_size, path))
+
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            evicted += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return evicted
+
+
+def locus_date(text: str) -> Optional[datetime]:
+    """Fecha de la línea LOCUS de un registro GenBank (ej: 18-JUL-2020)"""
+    first_line = text[:text.find('\n')] if '\n' in text else text
+    match = re.search(r'(\d{2}-[A-Z]{3}-\d{4})\s*$', first_line.strip())
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1).title(), '%d-%b-%Y')
+    except ValueError:
+        return None
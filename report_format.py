@@ -0,0 +1,8 @@
+"""
+Formato de los valores del análisis en el texto de los reportes PDF y de los prompts de la IA
+"""
+
+
+def format_percent(value) -> str:
+    """Porcentaje como texto ('N/D' si no se calculó, ej: GC de un registro sin secuencia)"""
+    return 'N/D' if value is None else f"{value}%"
@@ -0,0 +1,158 @@
+"""
+Caché de resultados de análisis con claves direccionadas por contenido
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from gene_columns import columns_json_default, json_object_hook
+from metrics import CACHE_LOOKUPS
+from record_cache import evict_lru_files
+
+
+logger = logging.getLogger('genome.cache')
+
+
+VERSIONED_ACCESSION = re.compile(r'^[A-Za-z0-9_]+\.\d+$')
+
+
+def source_hash(paths: Iterable[str], *params) -> str:
+    """
+    Hash del código fuente de los módulos de análisis más sus parámetros.
+    Cambia automáticamente cuando cambia cualquier archivo que afecta a los resultados.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    for param in params:
+        digest.update(repr(param).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def result_key(accession_id: str, analyzer_version: str, kind: str = 'analysis') -> str:
+    """Clave de caché: hash de (tipo de resultado, accesión con versión, versión del analizador)"""
+    raw = f"{kind}|{accession_id.strip().upper()}|{analyzer_version}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def is_versioned(accession_id: str) -> bool:
+    """
+    Sólo las accesiones con versión (ej: NC_045512.2) identifican un contenido inmutable;
+    las demás pueden apuntar a una versión nueva en cualquier momento
+    """
+    return bool(VERSIONED_ACCESSION.match(accession_id.strip()))
+
+
+class ResultCache:
+    """
+    Caché de dos niveles para resultados serializables a JSON:
+
+    - Memoria: LRU por número de entradas, privada de cada proceso
+    - Disco (opcional): JSON comprimido compartido entre workers, LRU por tamaño total
+
+    Los objetos devueltos se comparten entre peticiones y no deben modificarse.
+    """
+
+    def __init__(self, max_entries: int = 16, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 512 * 1024 ** 2, name: str = 'result'):
+        """
+        Args:
+            max_entries: Resultados que se mantienen en memoria
+            disk_dir: Directorio del nivel compartido en disco (None para desactivarlo)
+            disk_max_bytes: Tamaño máximo del nivel en disco
+            name: Nombre de la caché en las métricas (etiqueta cache de cache_lookups_total)
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el resultado cacheado o None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+                return self._memory[key]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.stats['misses'] += 1
+                CACHE_LOOKUPS.inc(cache=self.name, result='miss')
+                return None
+            self.stats['disk_hits'] += 1
+        CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Any):
+        """Guarda un resultado en ambos niveles"""
+        self._remember(key, value)
+        if self.disk_dir:
+            self._write_disk(key, value)
+
+    def get_stats(self) -> Dict:
+        """Contadores de aciertos/fallos y ocupación"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0
+        return stats
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json.gz")
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                value = json.load(f, object_hook=json_object_hook)
+            # Marcar el acceso para la expulsión LRU
+            os.utime(path)
+            return value
+        except (FileNotFoundError, OSError, EOFError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Any):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                # Tablas de gene_columns en forma columnar (se reconstruyen al leer)
+                json.dump(value, f, ensure_ascii=False, separators=(',', ':'),
+                          default=columns_json_default)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # El nivel en disco es opcional: un fallo de escritura o un valor que no se puede
+            # serializar no debe romper el análisis
+            logger.warning("Caché %s: no se pudo guardar %s en disco: %s", self.name, key, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        evict_lru_files(self.disk_dir, '.json.gz', self.disk_max_bytes, keep=path)
@@ -0,0 +1,268 @@
+"""
+Motor de escaneo de secuencias basado en operaciones vectorizadas con NumPy
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple, Union
+import numpy as np
+
+if TYPE_CHECKING:
+    # Sólo para las anotaciones: packed_sequence importa este módulo
+    from packed_sequence import PackedSequence
+
+
+# Orden TCAG: coincide con el orden de las tablas de traducción de NCBI,
+# de modo que el índice de codón (16*b1 + 4*b2 + b3) indexa directamente esas tablas
+NUCLEOTIDE_ORDER = 'TCAG'
+INVALID_BASE = 4
+INVALID_CODON = 64
+
+# Bases por ventana al recorrer secuencias largas (acota la memoria temporal)
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Tabla de 256 entradas: byte ASCII -> código 0-3 (T, C, A, G) o 4 (N, IUPAC u otro)
+BASE_CODES = np.full(256, INVALID_BASE, dtype=np.uint8)
+for _code, _base in enumerate(NUCLEOTIDE_ORDER):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+
+def encode_sequence(sequence: Union[str, bytes]) -> np.ndarray:
+    """
+    Convierte una secuencia en un arreglo compacto de códigos de nucleótido
+
+    Args:
+        sequence: Secuencia como str o bytes (mayúsculas o minúsculas)
+
+    Returns:
+        Arreglo uint8 con un código 0-3 por base, INVALID_BASE para bases ambiguas
+    """
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii', 'replace')
+    raw = np.frombuffer(sequence, dtype=np.uint8)
+    return BASE_CODES[raw]
+
+
+def codon_to_index(codon: str) -> int:
+    """Índice 0-63 de un codón en orden TCAG"""
+    codon = codon.upper()
+    return (NUCLEOTIDE_ORDER.index(codon[0]) * 16 +
+            NUCLEOTIDE_ORDER.index(codon[1]) * 4 +
+            NUCLEOTIDE_ORDER.index(codon[2]))
+
+
+def index_to_codon(index: int) -> str:
+    """Codón correspondiente a un índice 0-63 en orden TCAG"""
+    return (NUCLEOTIDE_ORDER[index // 16] +
+            NUCLEOTIDE_ORDER[(index // 4) % 4] +
+            NUCLEOTIDE_ORDER[index % 4])
+
+
+def codon_indices(codes: np.ndarray) -> np.ndarray:
+    """
+    Calcula el índice de codón que empieza en cada posición de la secuencia
+
+    Args:
+        codes: Arreglo devuelto por encode_sequence
+
+    Returns:
+        Arreglo uint8 de longitud len(codes) - 2 con valores 0-63,
+        o INVALID_CODON si alguna de las tres bases es ambigua
+    """
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.uint8)
+
+    # Operaciones en sitio: un solo arreglo temporal del tamaño de la secuencia
+    indices = codes[:-2] << 4
+    indices += codes[1:-1] << 2
+    indices += codes[2:]
+
+    # Las bases ambiguas son pocas: invalidar sólo los codones que las contienen
+    ambiguous = np.flatnonzero(codes == INVALID_BASE)
+    for offset in range(3):
+        positions = ambiguous - offset
+        positions = positions[(positions >= 0) & (positions < len(indices))]
+        indices[positions] = INVALID_CODON
+    return indices
+
+
+SequenceSource = Union[str, bytes, np.ndarray, 'PackedSequence']
+
+
+def _window_codes(sequence: SequenceSource, start: int, end: int) -> np.ndarray:
+    """Códigos de nucleótido de la región [start, end) de cualquier secuencia admitida"""
+    if isinstance(sequence, np.ndarray):
+        return sequence[start:end]
+    if hasattr(sequence, 'codes'):
+        # PackedSequence: sólo se desempaqueta la ventana
+        return sequence.codes(start, end)
+    return encode_sequence(sequence[start:end])
+
+
+def _forward_windows(sequence: SequenceSource,
+                     chunk_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Recorre la hebra directa por ventanas
+
+    Returns:
+        Iterador de (posición inicial, códigos); cada ventana lleva 2 bases de más
+        para que los codones que empiezan al final de la ventana estén completos
+    """
+    length = len(sequence)
+    for start in range(0, max(length - 2, 0), chunk_size):
+        yield start, _window_codes(sequence, start, min(start + chunk_size + 2, length))
+
+
+def _reverse_windows(sequence: SequenceSource,
+                     chunk_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Como _forward_windows, pero sobre el reverso complementario (en sus coordenadas)"""
+    length = len(sequence)
+    for start in range(0, max(length - 2, 0), chunk_size):
+        end = min(start + chunk_size + 2, length)
+        codes = _window_codes(sequence, length - end, length - start)
+        yield start, reverse_complement_codes(codes)
+
+
+def find_codon_positions(sequence: SequenceSource, codons: Iterable[str],
+                         chunk_size: int = SCAN_CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    """
+    Encuentra todas las posiciones (0-based) donde empieza cada codón buscado,
+    en las tres fases de lectura de la hebra directa
+
+    Args:
+        sequence: Secuencia como str/bytes, arreglo ya codificado con encode_sequence
+                  o PackedSequence (se recorre por ventanas, sin desempaquetarla entera)
+        codons: Codones a buscar (ej: ['ATG', 'TAA', 'TAG', 'TGA'])
+        chunk_size: Bases por ventana
+
+    Returns:
+        Diccionario codón -> arreglo ordenado de posiciones
+    """
+    targets = {codon: codon_to_index(codon) for codon in codons}
+    found: Dict[str, List[np.ndarray]] = {codon: [] for codon in targets}
+    for offset, codes in _forward_windows(sequence, chunk_size):
+        indices = codon_indices(codes)
+        for codon, index in targets.items():
+            found[codon].append(offset + np.flatnonzero(indices == index))
+    return {
+        codon: np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        for codon, parts in found.items()
+    }
+
+
+# Complemento en codificación TCAG: T<->A, C<->G; las bases ambiguas se mantienen
+COMPLEMENT_CODES = np.array([2, 3, 0, 1, INVALID_BASE], dtype=np.uint8)
+
+
+def reverse_complement_codes(codes: np.ndarray) -> np.ndarray:
+    """Reverso complementario de un arreglo devuelto por encode_sequence"""
+    return COMPLEMENT_CODES[codes[::-1]]
+
+
+def _orfs_on_strand(windows: Iterator[Tuple[int, np.ndarray]], start_index: int,
+                    stop_mask: np.ndarray, min_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Busca ORFs en las tres fases de una hebra, ventana a ventana
+
+    stop_mask tiene INVALID_CODON + 1 entradas (True en los índices de los STOP): los
+    STOP se localizan indexando la máscara con los índices de codón.
+
+    Para cada fase, cada codón STOP cierra como máximo un ORF: el que empieza en
+    el primer ATG posterior al STOP anterior (ORF más largo, sin anidados). El primer
+    ATG aún sin STOP de cada fase pasa a la ventana siguiente.
+
+    Returns:
+        (starts, stops): posición del ATG y posición del codón STOP que lo cierra
+    """
+    open_starts = [-1, -1, -1]
+    all_starts = []
+    all_stops = []
+    for offset, codes in windows:
+        indices = codon_indices(codes)
+        for frame in range(3):
+            first_codon = (frame - offset) % 3
+            frame_codons = indices[first_codon::3]
+            base = offset + first_codon
+            starts = base + 3 * np.flatnonzero(frame_codons == start_index)
+            stops = base + 3 * np.flatnonzero(stop_mask[frame_codons])
+            if open_starts[frame] >= 0:
+                starts = np.concatenate([[open_starts[frame]], starts])
+
+            if len(stops) == 0:
+                if open_starts[frame] < 0 and len(starts):
+                    open_starts[frame] = int(starts[0])
+                continue
+
+            # STOP siguiente a cada ATG; los ATG sin STOP posterior siguen abiertos
+            next_stop = np.searchsorted(stops, starts)
+            closed = next_stop < len(stops)
+            still_open = starts[~closed]
+            open_starts[frame] = int(still_open[0]) if len(still_open) else -1
+            starts, next_stop = starts[closed], next_stop[closed]
+
+            # Quedarse con el primer ATG de cada segmento entre STOPs
+            _, first = np.unique(next_stop, return_index=True)
+            orf_starts, orf_stops = starts[first], stops[next_stop[first]]
+            keep = orf_stops - orf_starts >= min_length
+            all_starts.append(orf_starts[keep])
+            all_stops.append(orf_stops[keep])
+
+    if not all_starts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(all_starts), np.concatenate(all_stops)
+
+
+def find_orfs(sequence: SequenceSource, min_length: int = 100, table: int = 1,
+              chunk_size: int = SCAN_CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    """
+    Encuentra ORFs (ATG ... STOP en fase, sin STOP internos) en las seis fases de lectura
+
+    Tiempo lineal en la longitud de la secuencia: cada fase se recorre una vez con
+    operaciones vectorizadas, sin reiniciar la búsqueda desde cada ATG. La memoria
+    temporal depende de chunk_size, no de la longitud del genoma.
+
+    Args:
+        sequence: Secuencia como str/bytes, arreglo ya codificado con encode_sequence
+                  o PackedSequence
+        min_length: Longitud mínima en nucleótidos desde el ATG hasta el STOP (sin contarlo)
+        table: Tabla de traducción de NCBI (transl_table) que define los codones STOP
+        chunk_size: Bases por ventana
+
+    Returns:
+        Diccionario de arreglos paralelos ordenados por posición:
+        'start' y 'end' (coordenadas 0-based de la hebra directa, end exclusivo e
+        incluyendo el STOP), 'strand' (1 / -1), 'frame' (0-2, relativa a la hebra) y
+        'length' (nucleótidos sin contar el STOP)
+
+    Raises:
+        ValueError: Si table no es un número de tabla válido
+    """
+    # Importación diferida: genetic_codes importa este módulo
+    from genetic_codes import STOP_LOOKUP
+
+    if not 0 <= table < len(STOP_LOOKUP):
+        raise ValueError(f"Tabla de traducción desconocida: {table}")
+    seq_length = len(sequence)
+    start_index = codon_to_index('ATG')
+    stop_mask = STOP_LOOKUP[table]
+
+    fwd_starts, fwd_stops = _orfs_on_strand(_forward_windows(sequence, chunk_size),
+                                            start_index, stop_mask, min_length)
+    rev_starts, rev_stops = _orfs_on_strand(_reverse_windows(sequence, chunk_size),
+                                            start_index, stop_mask, min_length)
+
+    lengths = np.concatenate([fwd_stops - fwd_starts, rev_stops - rev_starts])
+    # Convertir coordenadas del reverso complementario a la hebra directa
+    starts = np.concatenate([fwd_starts, seq_length - (rev_stops + 3)])
+    ends = np.concatenate([fwd_stops + 3, seq_length - rev_starts])
+    strands = np.concatenate([np.ones(len(fwd_starts), dtype=np.int8),
+                              -np.ones(len(rev_starts), dtype=np.int8)])
+    frames = np.concatenate([fwd_starts % 3, rev_starts % 3])
+
+    order = np.argsort(starts, kind='stable')
+    return {
+        'start': starts[order],
+        'end': ends[order],
+        'strand': strands[order],
+        'frame': frames[order],
+        'length': lengths[order]
+    }
@@ -0,0 +1,119 @@
+"""
+Perfilado por etapas del análisis y del PDF: duración, bytes procesados y aumento del pico
+de memoria (RSS) de cada etapa, para la respuesta (clave timings) y para los logs
+"""
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+import json
+import logging
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de RSS
+    resource = None
+
+
+# Una línea JSON por etapa, en nivel INFO (activar con PROFILE_STAGES)
+logger = logging.getLogger('genome.profile')
+
+
+def peak_rss() -> Optional[int]:
+    """Pico de memoria residente del proceso en bytes (None si no se puede medir)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB y macOS en bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageTimer:
+    """
+    Mide las etapas de una operación (un análisis, un PDF) en el orden en que se ejecutan.
+
+    peak_rss_delta es lo que la etapa elevó el pico de RSS del proceso: 0 si no superó el
+    máximo alcanzado antes (la memoria que libera al terminar no se descuenta). Con varios
+    hilos el pico es el del proceso entero.
+    """
+
+    def __init__(self, scope: str, subject: Optional[str] = None):
+        """
+        Args:
+            scope: Operación medida (ej: 'analysis', 'pdf'), para los logs
+            subject: Lo que se procesa (ej: el ID de acceso), para los logs
+        """
+        self.scope = scope
+        self.subject = subject
+        self.stages: List[Dict] = []
+        self._start = time.perf_counter()
+        self._start_rss = peak_rss()
+
+    @contextmanager
+    def stage(self, name: str, bytes_processed: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Mide el bloque with como una etapa
+
+        Args:
+            name: Nombre de la etapa
+            bytes_processed: Bytes (o bases) que procesa la etapa, si se conocen de antemano
+
+        Returns:
+            La entrada de la etapa; el bloque puede fijar entry['bytes'] cuando lo sabe
+        """
+        entry = {'stage': name, 'seconds': 0.0, 'bytes': bytes_processed, 'peak_rss_delta': None}
+        rss = peak_rss()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] = round(time.perf_counter() - start, 6)
+            if rss is not None:
+                entry['peak_rss_delta'] = peak_rss() - rss
+            self.stages.append(entry)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({'event': 'stage', 'scope': self.scope,
+                                        'subject': self.subject, **entry}))
+
+    def summary(self) -> Dict:
+        """Etapas medidas, duración total y pico de RSS (la clave timings de la respuesta)"""
+        rss = peak_rss()
+        return {
+            'scope': self.scope,
+            'total_seconds': round(time.perf_counter() - self._start, 6),
+            'peak_rss_bytes': rss,
+            'peak_rss_delta': rss - self._start_rss if rss is not None else None,
+            'stages': list(self.stages)
+        }
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (duraciones en ms)"""
+        return ', '.join(f"{entry['stage']};dur={entry['seconds'] * 1000:.1f}"
+                         for entry in self.stages)
+
+
+class _NullTimer:
+    """Perfilado desactivado: stage() no mide nada"""
+
+    def stage(self, name: str, bytes_processed: Optional[int] = None):
+        # Un diccionario nuevo por etapa: quien escribe en él (ej: entry['bytes']) no
+        # comparte estado con otras etapas ni otros hilos
+        return nullcontext({})
+
+    def summary(self) -> None:
+        return None
+
+    def server_timing(self) -> str:
+        return ''
+
+
+NULL_TIMER = _NullTimer()
+
+
+def configure_logging(stream=None):
+    """Envía los logs de las etapas (JSON, uno por línea) a stderr o al stream indicado"""
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
@@ -5,7 +5,7 @@
 
 window.renderNucleotideChart = function (analysis) {
     const ctx = document.getElementById('nucleotide-chart');
-    if (!ctx) return;
+    if (!ctx || analysis.gc_content === null) return;
 
     const gc = analysis.gc_content;
     const at = 100 - gc;
@@ -45,12 +45,71 @@ window.renderNucleotideChart = function (analysis) {
     });
 };
 
+window.renderGcWindowsChart = function (level, canvasId) {
+    const ctx = document.getElementById(canvasId);
+    if (!ctx || !level) return;
+
+    // Al cambiar de resolución se reemplaza el gráfico anterior
+    const previous = Chart.getChart(ctx);
+    if (previous) previous.destroy();
+
+    const kb = level.window_size / 1000;
+    const labels = level.gc.map((_, i) => (i * kb).toLocaleString() + ' kb');
+
+    new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'GC (%)',
+                data: level.gc,
+                borderColor: '#48bb78',
+                borderWidth: 1,
+                pointRadius: 0,
+                spanGaps: false,
+                yAxisID: 'y'
+            }, {
+                label: 'GC skew acumulado',
+                data: level.cumulative_skew,
+                borderColor: '#ed8936',
+                borderWidth: 1,
+                pointRadius: 0,
+                yAxisID: 'skew'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            animation: false,
+            interaction: { mode: 'index', intersect: false },
+            scales: {
+                y: {
+                    position: 'left',
+                    grid: { color: 'rgba(255, 255, 255, 0.1)' }
+                },
+                skew: {
+                    position: 'right',
+                    grid: { display: false }
+                },
+                x: {
+                    ticks: { maxTicksLimit: 12 },
+                    grid: { display: false }
+                }
+            },
+            plugins: {
+                legend: { labels: { color: '#e2e8f0' } }
+            }
+        }
+    });
+};
+
+// genes: lista de CDS o genes_analysis.strand_counts ({forward, reverse}) del resumen de la API
 window.renderStrandChart = function (genes, canvasId) {
     const ctx = document.getElementById(canvasId);
     if (!ctx) return;
 
-    const plus = genes.filter(g => g.location.strand === 1).length;
-    const minus = genes.filter(g => g.location.strand === -1).length;
+    const plus = Array.isArray(genes) ? genes.filter(g => g.location.strand === 1).length : genes.forward;
+    const minus = Array.isArray(genes) ? genes.filter(g => g.location.strand === -1).length : genes.reverse;
 
     new Chart(ctx, {
         type: 'bar',
@@ -89,25 +148,29 @@ window.renderStrandChart = function (genes, canvasId) {
     });
 };
 
+// genes: lista de CDS o genes_analysis.length_stats del resumen de la API (histogram ya agrupado)
 window.renderGeneLengthHistogram = function (genes, canvasId) {
     const ctx = document.getElementById(canvasId);
     if (!ctx) return;
 
-    const lengths = genes.map(g => g.location.end - g.location.start);
-
     // Create bins
     const bins = [0, 500, 1000, 2000, 5000, 10000];
-    const binCounts = new Array(bins.length).fill(0);
+    let binCounts = new Array(bins.length).fill(0);
     const labels = ['<500', '500-1k', '1k-2k', '2k-5k', '5k-10k', '>10k'];
 
-    lengths.forEach(l => {
-        if (l < 500) binCounts[0]++;
-        else if (l < 1000) binCounts[1]++;
-        else if (l < 2000) binCounts[2]++;
-        else if (l < 5000) binCounts[3]++;
-        else if (l < 10000) binCounts[4]++;
-        else binCounts[5]++;
-    });
+    if (Array.isArray(genes)) {
+        const lengths = genes.map(g => g.location.end - g.location.start);
+        lengths.forEach(l => {
+            if (l < 500) binCounts[0]++;
+            else if (l < 1000) binCounts[1]++;
+            else if (l < 2000) binCounts[2]++;
+            else if (l < 5000) binCounts[3]++;
+            else if (l < 10000) binCounts[4]++;
+            else binCounts[5]++;
+        });
+    } else {
+        binCounts = genes.histogram;
+    }
 
     new Chart(ctx, {
         type: 'line',
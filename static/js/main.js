@@ -94,16 +94,19 @@ document.addEventListener('DOMContentLoaded', () => {
                 formData.append('genome_id', genomeId); // Sending regular form data, but backend expects JSON? Let's check.
                 // Wait, the backend code shows request.get_json(), so we must send JSON.
 
-                const response = await fetch(endpoint, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        genome_id: genomeId,
-                        include_ai: includeAI
+                // Sin IA se usa GET: el navegador revalida con el ETag (304 si no cambió)
+                const response = includeAI
+                    ? await fetch(endpoint, {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json'
+                        },
+                        body: JSON.stringify({
+                            genome_id: genomeId,
+                            include_ai: includeAI
+                        })
                     })
-                });
+                    : await fetch(`/api/genome/${encodeURIComponent(genomeId)}`);
 
                 const data = await response.json();
 
@@ -221,7 +224,7 @@ document.addEventListener('DOMContentLoaded', () => {
                             ${createDataItem('Longitud', formatNumber(data.length) + ' pb')}
                             ${createDataItem('Tipo', data.molecule_type || 'N/A')}
                             ${createDataItem('Topología', data.topology || 'Lineal')}
-                            ${createDataItem('Contenido GC', data.gc_content + '%')}
+                            ${createDataItem('Contenido GC', data.gc_content === null ? 'N/D' : data.gc_content + '%')}
                             ${createDataItem('Genes Totales', data.genes_analysis ? data.genes_analysis.total_genes : 'N/A')}
                         </div>
                     </div>
@@ -256,12 +259,12 @@ document.addEventListener('DOMContentLoaded', () => {
                     <div class="col">
                         <h3 class="card-title">${data.genome1.accession_id}</h3>
                         <p>${formatNumber(data.genome1.length)} pb</p>
-                        <p>GC: ${data.genome1.gc_content}%</p>
+                        <p>GC: ${data.genome1.gc_content === null ? 'N/D' : data.genome1.gc_content + '%'}</p>
                     </div>
                     <div class="col">
                         <h3 class="card-title">${data.genome2.accession_id}</h3>
                         <p>${formatNumber(data.genome2.length)} pb</p>
-                        <p>GC: ${data.genome2.gc_content}%</p>
+                        <p>GC: ${data.genome2.gc_content === null ? 'N/D' : data.genome2.gc_content + '%'}</p>
                     </div>
                 </div>
 
@@ -292,7 +295,9 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function renderGenesTable(genesData) {
-        if (!genesData || !genesData.cds_details) return '<p>No se encontraron datos de genes.</p>';
+        // Sin cds_details (respuesta resumida de la API): mostrar los genes más largos
+        const genes = genesData && (genesData.cds_details || genesData.top_genes);
+        if (!genes) return '<p>No se encontraron datos de genes.</p>';
         return `
             <div style="overflow-x: auto;">
                 <table style="width: 100%; border-collapse: collapse; margin-top: 1rem;">
@@ -306,7 +311,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         </tr>
                     </thead>
                     <tbody>
-                        ${genesData.cds_details.slice(0, 10).map(g => `
+                        ${genes.slice(0, 10).map(g => `
                             <tr style="border-bottom: 1px solid rgba(255,255,255,0.05);">
                                 <td style="padding: 1rem; color: var(--primary); font-weight: 500;">${g.gene || '-'}</td>
                                 <td style="padding: 1rem;">${formatNumber(g.location.start)}</td>
@@ -317,7 +322,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         `).join('')}
                     </tbody>
                 </table>
-                <p style="margin-top: 1rem; color: var(--text-muted); font-size: 0.9rem;">Mostrando primeros 10 genes...</p>
+                <p style="margin-top: 1rem; color: var(--text-muted); font-size: 0.9rem;">${genesData.cds_details ? 'Mostrando primeros 10 genes...' : 'Mostrando los 10 genes más largos...'}</p>
             </div>
         `;
     }
@@ -22,13 +22,56 @@ document.addEventListener("DOMContentLoaded", () => {
         window.currentAnalysisData = analysis;
 
         // Agregar canvas a las pestañas después de un breve delay
-        setTimeout(() => {
-            addChartsToTabs(analysis);
-        }, 100);
+        setTimeout(() => addChartsToTabs(analysis), 100);
 
         return result;
     };
 
+    // La API envía sólo el resumen de genes (strand_counts, length_stats, top_genes). Los CDS
+    // completos sólo hacen falta para el genome browser: se cargan por páginas desde genes_url
+    // la primera vez que se abre la pestaña de genes
+    let pendingGenesAnalysis = null;
+
+    async function loadAnalysisGenes(analysis) {
+        const genesAnalysis = analysis && analysis.genes_analysis;
+        if (!genesAnalysis || genesAnalysis.cds_details || !genesAnalysis.genes_url) return;
+
+        const genes = [];
+        let cursor = null;
+        try {
+            do {
+                const params = new URLSearchParams({ limit: 1000 });
+                if (cursor) params.set('cursor', cursor);
+                const response = await fetch(`${genesAnalysis.genes_url}?${params}`);
+                const page = await response.json();
+                if (!response.ok) throw new Error(page.error || 'Error cargando genes');
+                genes.push(...page.genes);
+                cursor = page.next_cursor;
+            } while (cursor);
+            genesAnalysis.cds_details = genes;
+        } catch (error) {
+            console.error('No se pudieron cargar los genes:', error);
+        }
+    }
+
+    async function showGenomeBrowser(analysis) {
+        if (pendingGenesAnalysis !== analysis) return;
+        pendingGenesAnalysis = null;
+        await loadAnalysisGenes(analysis);
+        // Si mientras tanto se mostró otro análisis, no dibujar éste
+        if (window.currentAnalysisData === analysis) addChartsToTabs(analysis);
+    }
+
+    const originalShowTab = window.showTab;
+    window.showTab = function (tabId) {
+        if (originalShowTab) {
+            originalShowTab.call(this, tabId);
+        }
+        if (tabId === 'genes' && pendingGenesAnalysis) {
+            showGenomeBrowser(pendingGenesAnalysis);
+        }
+    };
+
     // Interceptar switchTab para redibujar genoma cuando se activa la pestaña
     const originalSwitchTab = window.switchTab;
     window.switchTab = function(event, tabId) {
@@ -51,7 +94,7 @@ document.addEventListener("DOMContentLoaded", () => {
     function addChartsToTabs(analysis) {
         // 1. Agregar canvas a pestaña "Información Básica"
         const basicTab = document.getElementById('basic');
-        if (basicTab && !document.getElementById('nucleotide-chart')) {
+        if (basicTab && analysis.gc_content !== null && !document.getElementById('nucleotide-chart')) {
             const gcContent = analysis.gc_content;
             const atContent = 100 - gcContent;
             const aPercent = (atContent / 2).toFixed(1);
@@ -93,25 +136,47 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         }
 
+        // 1b. GC y GC skew por ventanas (un nivel de la pirámide por resolución)
+        const gcLevels = analysis.gc_windows ? analysis.gc_windows.levels : [];
+        if (basicTab && gcLevels.length > 0 && !document.getElementById('gc-windows-chart')) {
+            const options = gcLevels.map((level, i) =>
+                `<option value="${i}">${(level.window_size / 1000).toLocaleString()} kb (${level.windows} ventanas)</option>`
+            ).join('');
+
+            basicTab.insertAdjacentHTML('beforeend', `
+                <h3 style="margin-top: 2rem; margin-bottom: 1rem;">📈 GC y GC skew a lo largo del genoma</h3>
+                <label style="color: rgba(255,255,255,0.8);">Resolución:
+                    <select id="gc-windows-level">${options}</select>
+                </label>
+                <div class="chart-container" style="height: 300px; margin-top: 1rem;">
+                    <canvas id="gc-windows-chart"></canvas>
+                </div>
+            `);
+
+            const select = document.getElementById('gc-windows-level');
+            select.addEventListener('change', () =>
+                renderGcWindowsChart(gcLevels[select.value], 'gc-windows-chart'));
+            if (window.renderGcWindowsChart) {
+                setTimeout(() => renderGcWindowsChart(gcLevels[0], 'gc-windows-chart'), 50);
+            }
+        }
+
         // 2. Agregar canvas a pestaña "Análisis de Genes"
         const genesTab = document.getElementById('genes');
         if (genesTab && !document.getElementById('strand-chart-default')) {
-            const genes = analysis.genes_analysis.cds_details || [];
-            
-            // Si no hay genes pero hay longitud, crear un array vacío para evitar errores
-            const safeGenes = genes || [];
-            
-            const plusStrand = safeGenes.filter(g => g.location.strand === 1).length;
-            const minusStrand = safeGenes.filter(g => g.location.strand === -1).length;
+            // Totales calculados en el servidor: no hace falta la lista de CDS
+            const strandCounts = analysis.genes_analysis.strand_counts || { forward: 0, reverse: 0 };
+            const lengthStats = analysis.genes_analysis.length_stats || { average: 0, min: 0, max: 0 };
+
+            const plusStrand = strandCounts.forward;
+            const minusStrand = strandCounts.reverse;
             const total = plusStrand + minusStrand;
             const plusPercent = total > 0 ? ((plusStrand / total) * 100).toFixed(1) : 0;
             const minusPercent = total > 0 ? ((minusStrand / total) * 100).toFixed(1) : 0;
 
-            // Calcular estadísticas de longitud
-            const lengths = safeGenes.map(g => g.location.end - g.location.start);
-            const avgLength = lengths.length > 0 ? (lengths.reduce((a, b) => a + b, 0) / lengths.length).toFixed(0) : 0;
-            const minLength = lengths.length > 0 ? Math.min(...lengths) : 0;
-            const maxLength = lengths.length > 0 ? Math.max(...lengths) : 0;
+            const avgLength = Number(lengthStats.average).toFixed(0);
+            const minLength = lengthStats.min;
+            const maxLength = lengthStats.max;
 
             const chartHTML = `
                 <h3 style="margin-top: 2rem; margin-bottom: 1rem;">🧬 Distribución por Hebra</h3>
@@ -161,23 +226,30 @@ document.addEventListener("DOMContentLoaded", () => {
             genesTab.insertAdjacentHTML('beforeend', chartHTML);
 
             // Renderizar gráficos
-            if (window.renderStrandChart && genes.length > 0) {
-                setTimeout(() => renderStrandChart(genes, 'strand-chart-default'), 50);
+            if (window.renderStrandChart && total > 0) {
+                setTimeout(() => renderStrandChart(strandCounts, 'strand-chart-default'), 50);
             }
-            if (window.renderGeneLengthHistogram && genes.length > 0) {
-                setTimeout(() => renderGeneLengthHistogram(genes, 'gene-length-chart-default'), 50);
+            if (window.renderGeneLengthHistogram && total > 0 && lengthStats.histogram) {
+                setTimeout(() => renderGeneLengthHistogram(lengthStats, 'gene-length-chart-default'), 50);
             }
         }
 
         // 2b. Mapa genómico lineal — genome browser estilo profesional
         if (genesTab && !document.getElementById('genome-browser-canvas')) {
             const genes = analysis.genes_analysis.cds_details || [];
+            // Sin cds_details (resumen de la API): pedir los CDS cuando se abra la pestaña
+            if (genes.length === 0 && analysis.genes_analysis.genes_url && analysis.genes_analysis.total_cds > 0) {
+                pendingGenesAnalysis = analysis;
+                if (genesTab.classList.contains('active')) {
+                    showGenomeBrowser(analysis);
+                }
+            }
             if (genes.length > 0) {
                 const sortedGenes = [...genes].sort((a, b) => a.location.start - b.location.start);
                 let genomeLen = analysis.length || Math.max(...genes.map(g => g.location.end));
                 if (!genomeLen || genomeLen < 100) genomeLen = 10000; // Fallback
                 
-                const top20 = [...genes].sort((a, b) => (b.location.end - b.location.start) - (a.location.end - a.location.start)).slice(0, 20);
+                const top20 = analysis.genes_analysis.top_genes || [...genes].sort((a, b) => (b.location.end - b.location.start) - (a.location.end - a.location.start)).slice(0, 20);
 
                 const mapHTML = `
                     <h3 style="margin-top: 2rem; margin-bottom: 1rem;">🗺️ Genome Browser — Mapa Lineal de Genes</h3>
@@ -1061,6 +1133,7 @@ document.addEventListener("DOMContentLoaded", () => {
     function addNucleotideComparison(genome1, genome2) {
         const basicTab = document.getElementById('basic');
         if (!basicTab || document.getElementById('nucleotide-comparison-g1')) return;
+        if (genome1.gc_content === null || genome2.gc_content === null) return;
 
         const chartHTML = `
             <h3 style="margin-top: 3rem; margin-bottom: 1rem; border-top: 2px solid rgba(255,255,255,0.1); padding-top: 2rem;">📊 Composición de Nucleótidos - Comparación</h3>
@@ -0,0 +1,93 @@
+"""
+Configuración de pytest: los módulos del proyecto están en la raíz del repositorio
+"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def genbank_text():
+    """Registro GenBank sintético (ver benchmark_pipeline.synthetic_record) como texto"""
+    from Bio import SeqIO
+    from benchmark_pipeline import synthetic_record
+
+    def make(accession_id: str, length: int = 20_000, seed: int = 1) -> str:
+        handle = io.StringIO()
+        SeqIO.write(synthetic_record(length, seed=seed, accession_id=accession_id), handle, 'genbank')
+        return handle.getvalue()
+    return make
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """
+    Módulo app con cachés, cola y métricas en un directorio temporal, análisis en el mismo
+    proceso (sin pool) y sin Gemini
+    """
+    base = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'GEMINI_API_KEY': '',
+        'ANALYSIS_PROCESSES': '0',
+        'JOB_WORKERS': '0',
+        'RECORD_CACHE_DIR': str(base / 'records'),
+        'RESULT_CACHE_DIR': str(base / 'results'),
+        'JOBS_DB_PATH': str(base / 'jobs.sqlite3'),
+        'NCBI_RATE_LIMIT_FILE': '',
+        'METRICS_DIR': '',
+    })
+    import app
+    yield app
+    app.job_queue.stop()
+
+
+class FakeNCBI:
+    """Registros GenBank en memoria en lugar de NCBI, con las descargas anotadas"""
+
+    def __init__(self):
+        self.records = {}
+        self.downloads = []
+        self.efetches = []
+
+    def download(self, accession_id: str, destination):
+        self.downloads.append(accession_id)
+        if accession_id not in self.records:
+            raise IOError(f"Accesión no encontrada en NCBI: {accession_id}")
+        destination.write(self.records[accession_id].encode('ascii'))
+
+    def efetch(self, accession_id):
+        """
+        Respuesta efetch de texto: con varias accesiones, los registros que existen uno tras
+        otro separados por una línea en blanco (las que no existen se omiten, como en NCBI)
+        """
+        accession_ids = [accession_id] if isinstance(accession_id, str) else list(accession_id)
+        self.efetches.append(accession_ids)
+        return io.StringIO('\n'.join(self.records[acc] for acc in accession_ids
+                                     if acc in self.records))
+
+
+@pytest.fixture
+def fake_ncbi(app_module, tmp_path, monkeypatch):
+    """
+    Sustituye las descargas de NCBI del analizador (_download_genbank y _efetch) por
+    registros en memoria, con cachés de registros, resultados e índices vacías para cada
+    prueba
+    """
+    from record_cache import RecordCache
+    from result_cache import ResultCache
+
+    ncbi = FakeNCBI()
+    analyzer = app_module.analyzer
+    result_cache = ResultCache(max_entries=4, disk_dir=str(tmp_path / 'results'))
+    monkeypatch.setattr(analyzer, '_download_genbank', ncbi.download)
+    monkeypatch.setattr(analyzer, '_efetch', ncbi.efetch)
+    monkeypatch.setattr(analyzer, '_remote_update_date', lambda accession_id: None)
+    monkeypatch.setattr(analyzer, 'record_cache', RecordCache(str(tmp_path / 'records')))
+    monkeypatch.setattr(analyzer, 'result_cache', result_cache)
+    monkeypatch.setattr(app_module, 'result_cache', result_cache)
+    monkeypatch.setattr(app_module, 'gene_indexes', ResultCache(max_entries=4, name='gene_index'))
+    return ncbi
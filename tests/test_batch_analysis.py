@@ -0,0 +1,119 @@
+"""
+Pruebas del análisis por lotes: reparto de una respuesta efetch con varios registros
+(_split_records) y líneas NDJSON por accesión, incluidas las que NCBI no devuelve
+"""
+import io
+import json
+
+import pytest
+
+from batch_analysis import _split_records, format_ndjson, read_accession_list
+
+
+@pytest.fixture
+def records(genbank_text):
+    return {accession_id: genbank_text(accession_id, length=3000, seed=seed)
+            for seed, accession_id in enumerate(('SYN_A.1', 'SYN_B.2', 'SYN_EXTRA.1'), 1)}
+
+
+def split(text, accession_ids, binary=False):
+    handle = io.BytesIO(text.encode('ascii')) if binary else io.StringIO(text)
+    copies = {}
+
+    def open_destination(accession_id, write_record):
+        destination = io.BytesIO()
+        write_record(accession_id, destination)
+        copies[accession_id] = destination.getvalue().decode('ascii')
+
+    return _split_records(handle, accession_ids, open_destination), copies
+
+
+@pytest.mark.parametrize('binary', [False, True], ids=['text', 'binary'])
+def test_split_concatenated_records(records, binary):
+    # Un registro no pedido en medio y una accesión pedida que no está en la respuesta
+    text = records['SYN_A.1'] + records['SYN_EXTRA.1'] + records['SYN_B.2']
+    found, copies = split(text, ['SYN_A.1', 'MISSING.1', 'syn_b'], binary)
+    assert found == {'SYN_A.1', 'syn_b'}
+    assert copies == {'SYN_A.1': records['SYN_A.1'], 'syn_b': records['SYN_B.2']}
+
+
+def test_split_keeps_blank_lines_between_records(records):
+    text = records['SYN_A.1'] + '\n' + records['SYN_B.2'] + '\n'
+    found, copies = split(text, ['SYN_A.1', 'SYN_B.2'])
+    assert found == {'SYN_A.1', 'SYN_B.2'}
+    assert copies['SYN_A.1'] == records['SYN_A.1']
+    assert copies['SYN_B.2'] == '\n' + records['SYN_B.2']
+
+
+def test_split_copies_repeated_record_once(records):
+    text = records['SYN_A.1'] + records['SYN_A.1'].replace('ORGANISM', 'ORGANISMO') + records['SYN_B.2']
+    found, copies = split(text, ['SYN_A.1', 'SYN_B.2'])
+    assert found == {'SYN_A.1', 'SYN_B.2'}
+    assert copies['SYN_A.1'] == records['SYN_A.1']
+    assert copies['SYN_B.2'] == records['SYN_B.2']
+
+
+def test_split_empty_response():
+    assert split('', ['SYN_A.1']) == (set(), {})
+
+
+def test_read_accession_list():
+    lines = ['# lote de prueba\n', 'SYN_A.1, SYN_B.2\n', '\n', 'SYN_A.1  # repetida\n', 'OTRA.1']
+    assert read_accession_list(lines) == ['SYN_A.1', 'SYN_B.2', 'OTRA.1']
+
+
+def batch(client, genome_ids):
+    response = client.post('/api/analyze/batch', json={'genome_ids': genome_ids})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    return {entry['accession_id']: entry for entry in map(json.loads, lines)}, len(lines)
+
+
+def test_batch_ndjson_reports_missing_accession(app_module, fake_ncbi, records):
+    fake_ncbi.records.update(records)
+    entries, lines = batch(app_module.app.test_client(), ['SYN_A.1', 'MISSING.1', 'SYN_B.2'])
+
+    assert lines == 3
+    assert entries['MISSING.1'] == {'accession_id': 'MISSING.1', 'success': False,
+                                    'error': 'NCBI no devolvió el registro (MISSING.1)'}
+    for accession_id in ('SYN_A.1', 'SYN_B.2'):
+        assert entries[accession_id]['success'] is True
+        analysis = entries[accession_id]['analysis']
+        assert analysis['accession_id'] == accession_id
+        assert analysis['length'] == 3000
+    # Una sola petición efetch para el grupo; nada por la descarga individual
+    assert fake_ncbi.efetches == [['SYN_A.1', 'MISSING.1', 'SYN_B.2']]
+    assert fake_ncbi.downloads == []
+
+
+def test_batch_efetch_error_fails_whole_group(app_module, fake_ncbi, records, monkeypatch):
+    def efetch(accession_ids):
+        raise IOError('HTTP Error 429: Too Many Requests')
+
+    monkeypatch.setattr(app_module.analyzer, '_efetch', efetch)
+    entries, lines = batch(app_module.app.test_client(), ['SYN_A.1', 'SYN_B.2'])
+    assert lines == 2
+    for accession_id, entry in entries.items():
+        assert entry['success'] is False
+        assert entry['error'] == (f"Error al obtener genoma: HTTP Error 429: Too Many Requests "
+                                  f"({accession_id})")
+
+
+def test_batch_repeated_request_uses_cache(app_module, fake_ncbi, records):
+    fake_ncbi.records.update(records)
+    client = app_module.app.test_client()
+    first, _ = batch(client, ['SYN_A.1', 'MISSING.1'])
+    second, lines = batch(client, ['SYN_A.1', 'MISSING.1', 'SYN_A.1'])
+
+    # Los duplicados se analizan una vez; sólo la accesión que faltaba se vuelve a pedir
+    assert lines == 2
+    assert second['SYN_A.1'] == first['SYN_A.1']
+    assert second['MISSING.1']['success'] is False
+    assert fake_ncbi.efetches == [['SYN_A.1', 'MISSING.1'], ['MISSING.1']]
+
+
+def test_format_ndjson_is_one_line():
+    line = format_ndjson({'accession_id': 'SYN_A.1', 'success': False, 'error': 'línea\nrota'})
+    assert line.endswith('\n') and line.count('\n') == 1
+    assert json.loads(line)['error'] == 'línea\nrota'
@@ -0,0 +1,189 @@
+"""
+Pruebas del uso de codones vectorizado (codon_usage) frente a un cálculo codón a codón
+a partir de las tablas de Biopython
+"""
+from collections import Counter
+import math
+import random
+
+import numpy as np
+import pytest
+from Bio.Data.CodonTable import unambiguous_dna_by_id
+
+from codon_usage import (REFERENCE_PSEUDOCOUNT, CodonUsage, codon_adaptation_index, codon_matrix,
+                         relative_adaptiveness, rscu)
+from genetic_codes import AMINO_ACIDS
+from sequence_scanner import index_to_codon
+
+
+CODONS = [index_to_codon(index) for index in range(64)]
+
+
+def amino_acid_of(table: int):
+    """Aminoácido (una letra, o 'Stop') de cada codón según Biopython"""
+    forward = unambiguous_dna_by_id[table].forward_table
+    return {codon: forward.get(codon, 'Stop') for codon in CODONS}
+
+
+def families_of(table: int):
+    amino_acids = amino_acid_of(table)
+    return {codon: [other for other in CODONS if amino_acids[other] == amino_acids[codon]]
+            for codon in CODONS}
+
+
+def reference_rscu(counts: dict, table: int = 1) -> dict:
+    result = {}
+    for codon, family in families_of(table).items():
+        mean = sum(counts.get(other, 0) for other in family) / len(family)
+        result[codon] = counts.get(codon, 0) / mean if mean else 0.0
+    return result
+
+
+def reference_weights(counts: dict, table: int = 1) -> dict:
+    amino_acids = amino_acid_of(table)
+    weights = {}
+    for codon, family in families_of(table).items():
+        if len(family) == 1 or amino_acids[codon] == 'Stop':
+            weights[codon] = None
+            continue
+        best = max(counts.get(other, 0) + REFERENCE_PSEUDOCOUNT for other in family)
+        weights[codon] = (counts.get(codon, 0) + REFERENCE_PSEUDOCOUNT) / best
+    return weights
+
+
+def reference_cai(sequence: str, weights: dict):
+    logs = [math.log(weights[codon]) for codon in split_codons(sequence)
+            if codon in weights and weights[codon] is not None]
+    return math.exp(sum(logs) / len(logs)) if logs else None
+
+
+def split_codons(sequence: str):
+    return [sequence[i:i + 3] for i in range(0, len(sequence) - 2, 3)]
+
+
+def codon_counts(sequences) -> dict:
+    counts = Counter()
+    for sequence in sequences:
+        counts.update(codon for codon in split_codons(sequence) if codon in CODONS)
+    return counts
+
+
+def as_vector(counts: dict) -> np.ndarray:
+    return np.array([counts.get(codon, 0) for codon in CODONS], dtype=np.int64)
+
+
+def random_cds(rng: random.Random, codons: int, alphabet=None) -> str:
+    choices = alphabet or [codon for codon in CODONS if codon not in ('TAA', 'TAG', 'TGA')]
+    return 'ATG' + ''.join(rng.choice(choices) for _ in range(codons)) + 'TAA'
+
+
+def test_codon_matrix_counts_in_frame_codons():
+    sequences = ['ATGAAATTTTAA', 'ATGNNNAAARAAGG', None, '', 'AT', 'ATGATGATGT', 'TGG' * 5]
+    matrix = codon_matrix(sequences)
+    assert matrix.shape == (len(sequences), 64)
+    for row, sequence in zip(matrix, sequences):
+        assert row.tolist() == as_vector(codon_counts([sequence or ''])).tolist()
+
+
+def test_rscu_matches_reference():
+    rng = random.Random(1)
+    counts = {codon: rng.randint(0, 50) for codon in CODONS}
+    # Familia sin ningún codón observado (Cys), sinónimo sin usar (GGG), Met y Trp, STOP
+    counts.update({'TGT': 0, 'TGC': 0, 'GGG': 0, 'ATG': 7, 'TGG': 3, 'TAA': 4, 'TAG': 0, 'TGA': 2})
+    values = rscu(as_vector(counts))
+    expected = reference_rscu(counts)
+    assert values.tolist() == pytest.approx([expected[codon] for codon in CODONS])
+
+    by_codon = dict(zip(CODONS, values.tolist()))
+    assert by_codon['TGT'] == by_codon['TGC'] == 0
+    assert by_codon['GGG'] == 0
+    assert by_codon['ATG'] == by_codon['TGG'] == 1
+    assert by_codon['TAA'] == pytest.approx(4 / 2)
+
+
+def test_rscu_of_gene_matrix_is_row_by_row():
+    rng = random.Random(2)
+    matrix = np.array([[rng.randint(0, 9) for _ in CODONS] for _ in range(5)])
+    matrix[0] = 0
+    values = rscu(matrix)
+    for row, expected_row in zip(values, matrix):
+        expected = reference_rscu(dict(zip(CODONS, expected_row.tolist())))
+        assert row.tolist() == pytest.approx([expected[codon] for codon in CODONS])
+
+
+@pytest.mark.parametrize('table', (1, 2, 4, 11, 25))
+def test_relative_adaptiveness_matches_reference(table):
+    rng = random.Random(table)
+    counts = {codon: rng.choice([0, 0, 1, 5, 20]) for codon in CODONS}
+    weights = relative_adaptiveness(as_vector(counts), AMINO_ACIDS[table])
+    expected = reference_weights(counts, table)
+    for codon, value in zip(CODONS, weights.tolist()):
+        if expected[codon] is None:
+            assert math.isnan(value), codon
+        else:
+            assert value == pytest.approx(expected[codon]), codon
+
+    by_codon = dict(zip(CODONS, weights.tolist()))
+    # Los STOP no cuentan; Met y Trp sólo si su familia tiene más de un codón (en la tabla 2
+    # ATA es Met y TGA es Trp; en la 4, TGA es Trp)
+    assert math.isnan(by_codon['TAA'])
+    assert math.isnan(by_codon['ATG']) == (table != 2)
+    assert math.isnan(by_codon['TGG']) == (table not in (2, 4))
+
+
+def test_codon_adaptation_index_matches_reference():
+    rng = random.Random(3)
+    sequences = [random_cds(rng, rng.randint(5, 60)) for _ in range(12)]
+    sequences.append('ATGTGGTAA')  # Sólo codones que no cuentan
+    counts = codon_counts(sequences)
+    weights = relative_adaptiveness(as_vector(counts))
+    values = codon_adaptation_index(codon_matrix(sequences), weights)
+
+    expected_weights = reference_weights(counts)
+    for value, sequence in zip(values.tolist(), sequences):
+        expected = reference_cai(sequence, expected_weights)
+        if expected is None:
+            assert math.isnan(value)
+        else:
+            assert value == pytest.approx(expected)
+
+
+def test_codon_usage_cai_uses_each_cds_table():
+    # Genes de la tabla 11 y de la tabla 4 (Mycoplasma, TGA = Trp) en el mismo registro
+    rng = random.Random(4)
+    trp_rich = [codon for codon in CODONS if codon not in ('TAA', 'TAG')]
+    standard = [random_cds(rng, 40) for _ in range(6)]
+    mycoplasma = [random_cds(rng, 40, trp_rich) + 'TGATGG' for _ in range(4)]
+    sequences = standard + mycoplasma + [None]
+    tables = [11] * len(standard) + [4] * len(mycoplasma) + [11]
+    usage = CodonUsage(sequences, ['hypothetical protein'] * len(sequences), tables)
+
+    assert usage.genetic_code == 11
+    assert usage.reference == 'all_cds'
+    assert usage.genetic_codes() == {'11': 7, '4': 4}
+
+    for table, genes in ((11, standard), (4, mycoplasma)):
+        expected_weights = reference_weights(codon_counts(genes), table)
+        for sequence in genes:
+            value = usage.cai[sequences.index(sequence)]
+            assert value == pytest.approx(reference_cai(sequence, expected_weights))
+    assert usage.gene_cai()[-1] is None
+
+    # RSCU de los totales con la tabla del registro
+    expected = reference_rscu(codon_counts(standard + mycoplasma), 11)
+    assert usage.codon_rscu().tolist() == pytest.approx([expected[codon] for codon in CODONS])
+
+
+def test_codon_usage_prefers_ribosomal_reference():
+    rng = random.Random(5)
+    ribosomal = [random_cds(rng, 30, ['GCT', 'AAA', 'GAA', 'CTG']) for _ in range(10)]
+    others = [random_cds(rng, 30) for _ in range(5)]
+    products = ['50S ribosomal protein L2'] * 10 + ['hypothetical protein'] * 5
+    usage = CodonUsage(ribosomal + others, products)
+
+    assert (usage.reference, usage.reference_genes) == ('ribosomal_proteins', 10)
+    expected_weights = reference_weights(codon_counts(ribosomal))
+    for index, sequence in enumerate(ribosomal + others):
+        assert usage.cai[index] == pytest.approx(reference_cai(sequence, expected_weights))
+    summary = usage.cai_summary()
+    assert summary['min'] <= summary['average'] <= summary['max']
@@ -0,0 +1,111 @@
+"""
+Pruebas de gc_windows frente a un recuento directo sobre el texto: límites de los bloques
+de PACK_CHUNK_SIZE, tramos de N y bases ambiguas, y secuencias sin G ni C
+"""
+import random
+
+import numpy as np
+import pytest
+
+import gc_windows as gc_module
+import packed_sequence
+from gc_windows import cumulative_gc_counts, gc_windows
+from packed_sequence import PackedSequence
+from report_format import format_percent
+
+
+def random_sequence(length: int, seed: int, alphabet: str = 'ACGT') -> str:
+    rng = random.Random(seed)
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+SEQUENCES = [
+    'G',
+    'ACGT',
+    'GGGGC',
+    'NNNNNNNNNNNN',
+    'ATATATATATATATATAT',
+    'NNNNATATNNNN' + 'AT' * 9,
+    'GGCCNNNNNNNNRYKMGGCC' + 'N' * 13 + 'CCGA',
+    # Tramos ambiguos que empiezan y acaban a mitad de byte y de bloque
+    'ACGTACGN' + 'NACGTACG' + 'ACGTACGT' + 'NNNNNNNN' + 'NNRACGTA' + 'SWSW',
+    random_sequence(997, 1, 'ACGTacgtNNNNRYKMSWBDHVn'),
+    random_sequence(400, 2) + 'N' * 101 + random_sequence(403, 3, 'acgt') + 'R' * 3,
+]
+
+WINDOW_SIZES = (4, 8, 12, 20, 100)
+
+
+@pytest.fixture(params=(4 * 1024 * 1024, 1, 2, 3, 5), ids=('default', 'chunk1', 'chunk2',
+                                                            'chunk3', 'chunk5'))
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(packed_sequence, 'PACK_CHUNK_SIZE', request.param)
+    monkeypatch.setattr(gc_module, 'PACK_CHUNK_SIZE', request.param)
+    return request.param
+
+
+def naive_counts(sequence: str, end: int):
+    prefix = sequence[:end].upper()
+    return (prefix.count('G'), prefix.count('C'),
+            sum(prefix.count(base) for base in 'ACGT'))
+
+
+def naive_level(sequence: str, size: int) -> dict:
+    gc, skew = [], []
+    for start in range(0, len(sequence), size):
+        window = sequence[start:start + size].upper()
+        g, c = window.count('G'), window.count('C')
+        acgt = sum(window.count(base) for base in 'ACGT')
+        gc.append(round((g + c) / acgt * 100, 2) if acgt else None)
+        skew.append((g - c) / (g + c) if g + c else 0.0)
+    return {'window_size': size, 'windows': len(gc), 'gc': gc, 'skew': skew,
+            'cumulative_skew': np.cumsum(skew).tolist()}
+
+
+@pytest.mark.parametrize('sequence', SEQUENCES)
+def test_cumulative_counts_match_naive(sequence, chunk_size):
+    packed = PackedSequence.from_bytes(sequence.encode('ascii'))
+    positions = np.append(np.arange(0, len(sequence), 4, dtype=np.int64), len(sequence))
+    g, c, acgt = cumulative_gc_counts(packed, positions)
+    expected = [naive_counts(sequence, int(p)) for p in positions]
+    assert list(zip(g.tolist(), c.tolist(), acgt.tolist())) == expected
+
+
+@pytest.mark.parametrize('sequence', SEQUENCES)
+def test_windows_match_naive(sequence, chunk_size):
+    result = gc_windows(PackedSequence.from_bytes(sequence.encode('ascii')), WINDOW_SIZES)
+    assert result['length'] == len(sequence)
+    assert [level['window_size'] for level in result['levels']] == list(WINDOW_SIZES)
+    for level, size in zip(result['levels'], WINDOW_SIZES):
+        expected = naive_level(sequence, size)
+        assert level['windows'] == expected['windows']
+        assert level['gc'] == expected['gc']
+        assert level['skew'] == pytest.approx(expected['skew'], abs=1e-4)
+        assert level['cumulative_skew'] == pytest.approx(expected['cumulative_skew'], abs=1e-3)
+
+
+def test_sequence_without_gc():
+    # Sin G ni C: GC 0 (no None) en las ventanas con bases y skew 0
+    result = gc_windows(PackedSequence.from_bytes(b'ATTA' * 5 + b'NNNN'), (4, 8))
+    fine, coarse = result['levels']
+    assert fine['gc'] == [0.0] * 5 + [None]
+    assert coarse['gc'] == [0.0, 0.0, 0.0]
+    assert fine['skew'] == [0.0] * 6
+    assert fine['cumulative_skew'] == [0.0] * 6
+
+
+def test_zero_gc_is_not_missing():
+    # Un GC de 0 % se muestra como tal; sólo el que no se calculó es N/D
+    assert format_percent(0.0) == '0.0%'
+    assert format_percent(0) == '0%'
+    assert format_percent(None) == 'N/D'
+    assert format_percent(41.5) == '41.5%'
+
+
+def test_empty_sequence_and_max_windows():
+    assert gc_windows(None) is None
+    assert gc_windows(PackedSequence.from_bytes(b'')) is None
+    result = gc_windows(PackedSequence.from_bytes(b'ACGT' * 10), (4, 8, 40), max_windows=5)
+    assert [level['window_size'] for level in result['levels']] == [8, 40]
+    with pytest.raises(ValueError):
+        gc_windows(PackedSequence.from_bytes(b'ACGT'), (6,))
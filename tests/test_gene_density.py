@@ -0,0 +1,113 @@
+"""
+Pruebas de gene_density frente a un recorrido directo de los intervalos: CDS que cruzan
+límites, solapes, genomas muy cortos y los niveles precalculados
+"""
+import random
+
+import pytest
+
+from gene_density import MAX_DENSITY_BINS, bin_edges, density_levels, gene_density
+from interval_index import IntervalIndex
+
+
+def naive_density(starts, ends, length, bin_size):
+    gene_count, covered_bp = [], []
+    for bin_start in range(0, length, bin_size):
+        bin_end = min(bin_start + bin_size, length)
+        gene_count.append(sum(1 for start, end in zip(starts, ends)
+                              if start < bin_end and end > bin_start))
+        covered_bp.append(sum(1 for position in range(bin_start, bin_end)
+                              if any(start <= position < end for start, end in zip(starts, ends))))
+    return gene_count, covered_bp
+
+
+def random_genes(length: int, count: int, seed: int):
+    rng = random.Random(seed)
+    starts, ends = [], []
+    for _ in range(count):
+        start = rng.randrange(length)
+        starts.append(start)
+        ends.append(min(length, start + rng.randint(1, max(1, length // 4))))
+    return starts, ends
+
+
+CASES = [
+    # (starts, ends, length)
+    ([], [], 50),
+    ([0], [50], 50),
+    ([0], [1], 1),
+    ([2, 5], [4, 9], 9),
+    ([0, 3, 3], [7, 5, 7], 7),
+    # CDS que empiezan o acaban justo en un límite de intervalo
+    ([10, 20, 25], [20, 30, 26], 40),
+    # Un CDS que cruza muchos intervalos y otros solapados con él
+    ([5, 0, 90, 40], [95, 10, 100, 41], 100),
+    (*random_genes(997, 40, 1), 997),
+    (*random_genes(1500, 3, 2), 1500),
+    (*random_genes(9, 5, 3), 9),
+]
+
+
+@pytest.mark.parametrize('starts, ends, length', CASES)
+@pytest.mark.parametrize('bins', [1, 2, 3, 7, 10, 100, 1000])
+def test_bins_match_naive(starts, ends, length, bins):
+    result = gene_density(starts, ends, length, bins=bins)
+    bin_size = max(1, -(-length // bins))
+    gene_count, covered_bp = naive_density(starts, ends, length, bin_size)
+    assert result['bin_size'] == bin_size
+    assert result['bins'] == len(gene_count)
+    assert result['gene_count'] == gene_count
+    assert result['covered_bp'] == covered_bp
+
+
+@pytest.mark.parametrize('starts, ends, length', CASES)
+@pytest.mark.parametrize('bin_size', [1, 4, 13, 64])
+def test_bin_size_matches_naive(starts, ends, length, bin_size):
+    # Con el índice ya construido (como desde FeatureTable.cds_index) y CDS desordenados
+    order = list(range(len(starts)))[::-1]
+    starts = [starts[i] for i in order]
+    ends = [ends[i] for i in order]
+    result = gene_density(starts, ends, length, bin_size=bin_size,
+                          index=IntervalIndex(zip(starts, ends)))
+    gene_count, covered_bp = naive_density(starts, ends, length, bin_size)
+    assert result['gene_count'] == gene_count
+    assert result['covered_bp'] == covered_bp
+    assert sum(result['covered_bp']) == IntervalIndex(zip(starts, ends)).covered_length
+
+
+@pytest.mark.parametrize('length', range(1, 10))
+def test_short_genomes(length):
+    starts, ends = [0, length - 1], [length, length]
+    levels = density_levels(starts, ends, length)
+    # Nunca más intervalos que pares de bases: un solo nivel de intervalos de 1 pb
+    assert [level['bins'] for level in levels] == [length]
+    assert levels[0]['bin_size'] == 1
+    assert levels[0]['gene_count'] == [1] * (length - 1) + [2]
+    assert levels[0]['covered_bp'] == [1] * length
+
+
+def test_density_levels():
+    starts, ends = random_genes(5000, 60, 4)
+    levels = density_levels(starts, ends, 5000)
+    assert [level['bins'] for level in levels] == [10, 100, 1000]
+    for level in levels:
+        gene_count, covered_bp = naive_density(starts, ends, 5000, level['bin_size'])
+        assert level['gene_count'] == gene_count
+        assert level['covered_bp'] == covered_bp
+    assert density_levels(starts, ends, 0) == []
+
+
+def test_bin_edges():
+    assert bin_edges(10, bins=3).tolist() == [0, 4, 8, 10]
+    assert bin_edges(10, bin_size=5).tolist() == [0, 5, 10]
+    assert bin_edges(3, bins=10).tolist() == [0, 1, 2, 3]
+    with pytest.raises(ValueError):
+        bin_edges(10)
+    with pytest.raises(ValueError):
+        bin_edges(10, bins=2, bin_size=5)
+    with pytest.raises(ValueError):
+        bin_edges(10, bins=0)
+    with pytest.raises(ValueError):
+        bin_edges(10, bin_size=0)
+    with pytest.raises(ValueError):
+        bin_edges(MAX_DENSITY_BINS + 1, bin_size=1)
@@ -0,0 +1,165 @@
+"""
+Pruebas de GeneIndex.query (orden con empates, filtros y cursores) y de la ida y vuelta de
+las tablas de gene_columns por la forma columnar
+"""
+import json
+import random
+
+import pytest
+
+from gene_columns import (CDSColumns, ExonColumns, GeneStructureColumns, IntronColumns,
+                          columns_json_default, json_default, json_object_hook)
+from gene_query import GeneIndex, check_query_params
+
+
+def make_cds(count: int, seed: int) -> CDSColumns:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        # Pocas posiciones y longitudes distintas: muchos empates en ambos órdenes
+        start = rng.randrange(0, 50, 10)
+        length = rng.choice((90, 300, 300, 1200))
+        strand = rng.choice((1, -1, None))
+        rows.append((f"gen{i % 7}", rng.choice(('DNA polymerase', '30S Ribosomal protein S1',
+                                                 'hypothetical protein')),
+                     start, start + length, strand, length, f"WP_{i}.1", f"LT_{i:04d}",
+                     [f"GeneID:{i}"], 1, length // 3 - 1, None, rng.choice((None, 0.5))))
+    return CDSColumns.from_rows(rows)
+
+
+def expected_order(cds: CDSColumns, sort: str, keep=lambda i: True) -> list:
+    values = cds.column('length' if sort.endswith('length') else 'start').tolist()
+    sign = -1 if sort.startswith('-') else 1
+    starts = cds.column('start').tolist()
+    return sorted((i for i in range(len(cds)) if keep(i)),
+                  key=lambda i: (sign * values[i], starts[i], i))
+
+
+def all_pages(index: GeneIndex, limit: int, **params) -> list:
+    rows, cursor = [], None
+    while True:
+        page = index.query(limit=limit, cursor=cursor, **params)
+        assert len(page['genes']) <= limit
+        rows += page['genes'].to_records()
+        cursor = page['next_cursor']
+        if cursor is None:
+            return rows
+
+
+@pytest.mark.parametrize('sort', ['position', '-position', 'length', '-length'])
+@pytest.mark.parametrize('limit', [1, 7, 1000])
+def test_sort_orders_with_ties(sort, limit):
+    cds = make_cds(60, 1)
+    rows = all_pages(GeneIndex(cds), limit, sort=sort)
+    assert rows == cds.take(expected_order(cds, sort)).to_records()
+
+
+@pytest.mark.parametrize('strand, keep', [
+    ('+', lambda cds, i: cds.column('strand')[i] == 1),
+    ('-1', lambda cds, i: cds.column('strand')[i] == -1),
+])
+def test_strand_filter(strand, keep):
+    cds = make_cds(40, 2)
+    rows = all_pages(GeneIndex(cds), 6, sort='-length', strand=strand)
+    assert rows == cds.take(expected_order(cds, '-length', lambda i: keep(cds, i))).to_records()
+
+
+def test_name_and_product_filters():
+    cds = make_cds(40, 3)
+    index = GeneIndex(cds)
+    page = index.query(name='GEN3', product='ribosomal', limit=1000)
+    expected = expected_order(cds, 'position', lambda i: cds.column('gene')[i] == 'gen3' and
+                              'Ribosomal' in cds.column('product')[i])
+    assert page['genes'].to_records() == cds.take(expected).to_records()
+    assert page['total'] == len(expected)
+    assert page['total_cds'] == 40
+    # El locus_tag también cuenta como nombre
+    assert index.query(name='lt_0012')['genes'].column('locus_tag') == ['LT_0012']
+
+
+@pytest.mark.parametrize('changed', [
+    {'sort': '-position'},
+    {'sort': 'length'},
+    {'strand': '+'},
+    {'name': 'gen1'},
+    {'product': 'protein'},
+])
+def test_cursor_rejected_for_other_query(changed):
+    index = GeneIndex(make_cds(30, 4))
+    cursor = index.query(limit=5)['next_cursor']
+    assert index.query(limit=5, cursor=cursor)['genes']
+    params = {'sort': 'position', **changed}
+    with pytest.raises(ValueError):
+        index.query(limit=5, cursor=cursor, **params)
+    with pytest.raises(ValueError):
+        check_query_params(cursor=cursor, **params)
+
+
+def test_cursor_keeps_filters_when_limit_changes():
+    index = GeneIndex(make_cds(30, 5))
+    first = index.query(sort='-length', limit=4)
+    rest = index.query(sort='-length', limit=100, cursor=first['next_cursor'])
+    full = index.query(sort='-length', limit=100)
+    assert (first['genes'].to_records() + rest['genes'].to_records() ==
+            full['genes'].to_records())
+
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0}, {'limit': 1001}, {'sort': 'name'}, {'sort': '--length'}, {'strand': '0'},
+    {'cursor': 'no-es-un-cursor'}, {'cursor': 'LTE6YWJj'},
+])
+def test_invalid_params(params):
+    with pytest.raises(ValueError):
+        GeneIndex(make_cds(5, 6)).query(**params)
+
+
+def test_empty_index():
+    page = GeneIndex(make_cds(0, 7)).query(sort='-length')
+    assert page['genes'].to_records() == []
+    assert page['total'] == 0 and page['next_cursor'] is None
+
+
+def make_structures() -> GeneStructureColumns:
+    return GeneStructureColumns(
+        exons=ExonColumns(start=[0, 50, 200, 400, 450, 600], end=[40, 90, 300, 420, 500, 700]),
+        introns=IntronColumns(start=[40, 420, 500], end=[50, 450, 600],
+                              donor=['GT', 'GT', 'GC'], acceptor=['AG', 'AG', 'AG'],
+                              is_canonical=[True, True, False]),
+        gene=['a', 'b', 'c'], strand=[1, None, -1], exon_count=[2, 1, 3],
+        intron_count=[1, 0, 2], all_canonical=[True, True, False])
+
+
+def round_trip(value):
+    return json.loads(json.dumps(value, default=columns_json_default), object_hook=json_object_hook)
+
+
+def test_cds_columns_round_trip():
+    cds = make_cds(25, 8)
+    restored = round_trip({'genes_analysis': {'cds_details': cds}})['genes_analysis']['cds_details']
+    assert isinstance(restored, CDSColumns)
+    assert restored.to_records() == cds.to_records()
+    for original, row in zip(cds.to_records(), restored):
+        assert row == original
+        assert [type(value) for value in row.values()] == [type(value) for value in original.values()]
+    # La forma de siempre (json_default) es la lista de objetos fila a fila
+    assert json.loads(json.dumps(cds, default=json_default)) == cds.to_records()
+
+
+def test_gene_structure_round_trip():
+    genes = make_structures()
+    restored = round_trip([genes])[0]
+    assert isinstance(restored, GeneStructureColumns)
+    assert restored.to_records() == genes.to_records()
+    assert [len(gene['exons']) for gene in restored] == [2, 1, 3]
+    assert restored.take([2, 0]).to_records() == [genes.to_records()[2], genes.to_records()[0]]
+    # Un gen sin intrones en medio de la tabla
+    single = round_trip(genes.take([1]))
+    assert single.to_records() == [genes.to_records()[1]]
+    assert len(single.exons) == 1 and len(single.introns) == 0
+
+
+def test_columns_from_older_format():
+    # Campos añadidos después (ej: cai) quedan en None al leer tablas guardadas antes
+    data = make_cds(3, 9).to_columns()
+    del data['cai']
+    assert CDSColumns.from_columns(data).column('cai') == [None, None, None]
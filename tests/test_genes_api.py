@@ -0,0 +1,56 @@
+"""
+Pruebas de /api/genome/<id>/genes: validación previa al análisis, paginación y caché del
+índice de CDS
+"""
+import pytest
+
+
+@pytest.mark.parametrize('query', [
+    'limit=0', 'limit=1001', 'sort=name', 'sort=-size', 'strand=x', 'cursor=no-es-un-cursor',
+])
+def test_invalid_parameters_fail_before_download(app_module, fake_ncbi, query):
+    client = app_module.app.test_client()
+    response = client.get(f'/api/genome/NC_000913.3/genes?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert fake_ncbi.downloads == []
+
+
+def test_cursor_from_other_query_fails_before_download(app_module, fake_ncbi, genbank_text):
+    fake_ncbi.records['SYN_GENES.1'] = genbank_text('SYN_GENES.1')
+    client = app_module.app.test_client()
+    cursor = client.get('/api/genome/SYN_GENES.1/genes?limit=5').get_json()['next_cursor']
+
+    response = client.get(f'/api/genome/OTHER.1/genes?limit=5&sort=-length&cursor={cursor}')
+    assert response.status_code == 400
+    assert fake_ncbi.downloads == ['SYN_GENES.1']
+
+
+def test_pages_cover_every_cds_once(app_module, fake_ncbi, genbank_text):
+    fake_ncbi.records['SYN_GENES.1'] = genbank_text('SYN_GENES.1')
+    client = app_module.app.test_client()
+
+    genes = []
+    cursor = None
+    while True:
+        url = '/api/genome/SYN_GENES.1/genes?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).get_json()
+        assert page['success']
+        genes += page['genes']
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(genes) == page['total_cds'] > 7
+    starts = [gene['location']['start'] for gene in genes]
+    assert starts == sorted(starts)
+    assert len({gene['locus_tag'] for gene in genes}) == len(genes)
+    # El índice se reutiliza: un solo análisis y una sola descarga
+    assert fake_ncbi.downloads == ['SYN_GENES.1']
+
+
+def test_unversioned_accession_index_is_not_cached(app_module, fake_ncbi, genbank_text):
+    fake_ncbi.records['SYN_GENES'] = genbank_text('SYN_GENES.1')
+    client = app_module.app.test_client()
+    assert client.get('/api/genome/SYN_GENES/genes?limit=1').status_code == 200
+    assert app_module.gene_indexes.get_stats()['memory_entries'] == 0
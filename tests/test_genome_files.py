@@ -0,0 +1,140 @@
+"""
+Pruebas de la lectura de genomas subidos (genome_files) con los archivos de tests/data:
+FASTA + GFF3 y GenBank del mismo genoma (dos contigs, un CDS partido en la hebra -) y
+archivos mal formados, directamente y a través de /api/analyze/upload
+"""
+import gzip
+import io
+import os
+
+import pytest
+
+from genome_files import CONTIG_SPACER, read_genome_file, read_gff3
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+FASTA = os.path.join(DATA_DIR, 'contigs.fasta')
+GFF3 = os.path.join(DATA_DIR, 'annotations.gff3')
+GENBANK = os.path.join(DATA_DIR, 'joined.gbk')
+MALFORMED_GFF3 = os.path.join(DATA_DIR, 'malformed.gff3')
+
+# CDS de los dos archivos: (gen, partes 0-based en orden de transcripción, hebra, proteína)
+EXPECTED_CDS = [
+    ('abcA', [(10, 100)], 1, 'MWLVSLRTVNIIAHFRVSGHLSPDVMRFP*'),
+    ('rplB', [(170, 230), (120, 150)], -1, 'MAQANSRTWSEVGNVPIIGHKSSGTHGAG*'),
+    # ctg2 empieza tras ctg1 (240 pb) y el separador de N
+    ('repA', [(240 + CONTIG_SPACER, 300 + CONTIG_SPACER)], 1, 'MADLVFPERRRTPPKSNLC*'),
+]
+
+
+def cds_summary(record):
+    return [
+        (feature.qualifiers['gene'][0],
+         [(int(part.start), int(part.end)) for part in feature.location.parts],
+         feature.location.strand,
+         str(feature.extract(record.seq).translate(table=11)))
+        for feature in record.features if feature.type == 'CDS'
+    ]
+
+
+@pytest.mark.parametrize('paths', [(FASTA, GFF3), (GENBANK, None)], ids=['fasta_gff3', 'genbank'])
+def test_joined_and_minus_strand_cds(paths):
+    record = read_genome_file(*paths)
+    assert len(record.seq) == 240 + CONTIG_SPACER + 90
+    assert cds_summary(record) == EXPECTED_CDS
+    rplb = [feature for feature in record.features if feature.type == 'CDS'][1]
+    assert rplb.qualifiers['product'] == ['50S ribosomal protein L2']
+    assert rplb.qualifiers['codon_start'] == ['1']
+
+
+def test_gff3_attributes_and_ignored_lines():
+    record = read_genome_file(FASTA, GFF3)
+    assert record.id == 'ctg1'
+    assert record.description == '2 secuencias (ctg1, ...)'
+    # region no se convierte; el CDS de una secuencia que no está en el FASTA se ignora
+    assert [feature.type for feature in record.features] == ['gene', 'CDS', 'gene', 'mRNA',
+                                                              'CDS', 'gene', 'CDS']
+    abca = record.features[1]
+    assert abca.qualifiers['product'] == ['ABC transporter']
+    assert abca.qualifiers['locus_tag'] == ['TST_0001']
+    # Las partes del mRNA salen de sus exones
+    mrna = record.features[3]
+    assert [(int(part.start), int(part.end)) for part in mrna.location.parts] == [(170, 230),
+                                                                                  (120, 150)]
+    assert mrna.qualifiers['gene'] == ['rplB']
+
+
+def test_gff3_phase_sets_codon_start():
+    entries = read_gff3(io.BytesIO(b'##gff-version 3\n'
+                                   b'ctg1\tprueba\tCDS\t3\t92\t.\t-\t2\tID=a;Dbxref=GeneID:1,UniProt:P1\n'))
+    assert entries[0]['start'] == 2 and entries[0]['end'] == 92
+    assert entries[0]['strand'] == -1 and entries[0]['phase'] == 2
+    assert entries[0]['attributes']['Dbxref'] == ['GeneID:1', 'UniProt:P1']
+
+
+def test_gzip_genbank(tmp_path):
+    path = tmp_path / 'joined.gbk.gz'
+    with open(GENBANK, 'rb') as f:
+        path.write_bytes(gzip.compress(f.read()))
+    assert cds_summary(read_genome_file(str(path))) == EXPECTED_CDS
+
+
+def upload(client, genome, annotation=None, **form):
+    data = dict(form)
+    with open(genome, 'rb') as f:
+        data['file'] = (io.BytesIO(f.read()), os.path.basename(genome))
+    if annotation is not None:
+        with open(annotation, 'rb') as f:
+            data['annotation'] = (io.BytesIO(f.read()), os.path.basename(annotation))
+    return client.post('/api/analyze/upload', data=data, content_type='multipart/form-data')
+
+
+def test_upload_formats_give_same_genes(app_module, fake_ncbi):
+    client = app_module.app.test_client()
+    results = [upload(client, FASTA, GFF3, name='TEST'), upload(client, GENBANK, name='TEST')]
+    for response in results:
+        assert response.status_code == 200
+    fasta, genbank = (response.get_json()['analysis'] for response in results)
+
+    genes = fasta['genes_analysis']
+    assert genes['strand_counts'] == {'forward': 2, 'reverse': 1}
+    assert [(gene['gene'], gene['location'], gene['length']) for gene in genes['cds_details']] == [
+        ('abcA', {'start': 10, 'end': 100, 'strand': 1}, 90),
+        ('rplB', {'start': 120, 'end': 230, 'strand': -1}, 90),
+        ('repA', {'start': 340, 'end': 400, 'strand': 1}, 60),
+    ]
+    assert genes['cds_details'] == genbank['genes_analysis']['cds_details']
+    assert fasta['introns_exons'] == genbank['introns_exons']
+    assert fasta['length'] == genbank['length'] == 430
+    assert fake_ncbi.downloads == []
+
+
+def write(tmp_path, name: str, content: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+@pytest.mark.parametrize('files', [
+    lambda tmp_path: (FASTA, MALFORMED_GFF3),
+    lambda tmp_path: (MALFORMED_GFF3, None),
+    lambda tmp_path: (GENBANK, GFF3),
+    lambda tmp_path: (FASTA, FASTA),
+    lambda tmp_path: (write(tmp_path, 'texto.txt', b'esto no es un genoma\n'), None),
+    lambda tmp_path: (FASTA, write(tmp_path, 'coords.gff3',
+                                   b'##gff-version 3\nctg1\tprueba\tCDS\tuno\t90\t.\t+\t0\tID=a\n')),
+    lambda tmp_path: (write(tmp_path, 'cortado.gbk.gz', gzip.compress(open(GENBANK, 'rb').read())[:200]),
+                      None),
+], ids=['gff3_columns', 'gff3_without_fasta', 'gff3_with_genbank', 'fasta_as_annotation',
+        'unknown_format', 'gff3_coordinates', 'truncated_gzip'])
+def test_malformed_upload_returns_400(app_module, fake_ncbi, tmp_path, files):
+    response = upload(app_module.app.test_client(), *files(tmp_path))
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['success'] is False and body['error']
+    assert 'details' not in body
+
+
+def test_upload_without_file_returns_400(app_module, fake_ncbi):
+    response = app_module.app.test_client().post('/api/analyze/upload', data={'name': 'x'})
+    assert response.status_code == 400
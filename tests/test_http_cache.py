@@ -0,0 +1,121 @@
+"""
+Pruebas de http_cache con el cliente de pruebas de Flask: ETags de los análisis, 304 con
+If-None-Match (también con los sufijos -gzip/-br) y compresión negociada
+"""
+import gzip
+import json
+
+import pytest
+
+from http_cache import _identity_etag, analysis_etag
+
+
+URL = '/api/genome/SYN_HTTP.1'
+
+
+@pytest.fixture
+def client(app_module, fake_ncbi, genbank_text):
+    fake_ncbi.records['SYN_HTTP.1'] = genbank_text('SYN_HTTP.1')
+    fake_ncbi.records['SYN_HTTP'] = genbank_text('SYN_HTTP.1')
+    return app_module.app.test_client()
+
+
+def test_analysis_etag_requires_version():
+    assert analysis_etag('SYN.1', 'v1', 'analysis') is not None
+    assert analysis_etag('SYN', 'v1', 'analysis') is None
+    # Misma accesión con otra grafía: mismo ETag; otra variante u otro analizador: distinto
+    assert analysis_etag(' syn.1 ', 'v1', 'analysis') == analysis_etag('SYN.1', 'v1', 'analysis')
+    assert analysis_etag('SYN.1', 'v1', 'genes') != analysis_etag('SYN.1', 'v1', 'analysis')
+    assert analysis_etag('SYN.1', 'v2', 'analysis') != analysis_etag('SYN.1', 'v1', 'analysis')
+
+
+@pytest.mark.parametrize('tag, expected', [
+    ('abc', 'abc'),
+    ('abc-gzip', 'abc'),
+    ('abc-br', 'abc'),
+    ('abc-deflate', 'abc-deflate'),
+    ('-gzip', '-gzip'),
+])
+def test_identity_etag(tag, expected):
+    assert _identity_etag(tag) == expected
+
+
+def test_full_response_has_etag(client):
+    response = client.get(URL)
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.cache_control.no_cache
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_gzip_response_has_suffixed_etag(client):
+    identity = client.get(URL)
+    response = client.get(URL, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert response.get_etag()[0] == identity.get_etag()[0] + '-gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == identity.get_json()
+
+
+@pytest.mark.parametrize('suffix', ['', '-gzip', '-br'])
+def test_if_none_match_returns_304(client, fake_ncbi, suffix):
+    etag = client.get(URL).get_etag()[0]
+    downloads = list(fake_ncbi.downloads)
+
+    response = client.get(URL, headers={'If-None-Match': f'"{etag}{suffix}"',
+                                         'Accept-Encoding': 'gzip'})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag + suffix
+    assert response.get_data() == b''
+    assert 'Content-Encoding' not in response.headers
+    assert fake_ncbi.downloads == downloads
+
+
+def test_if_none_match_among_several_tags(client):
+    etag = client.get(URL).get_etag()[0]
+    response = client.get(URL, headers={'If-None-Match': f'"otro", "{etag}-gzip"'})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag + '-gzip'
+
+
+def test_if_none_match_star_returns_304(client):
+    response = client.get(URL, headers={'If-None-Match': '*'})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize('tag', ['"otro"', '"otro-gzip"'])
+def test_other_etag_gets_full_response(client, tag):
+    response = client.get(URL, headers={'If-None-Match': tag})
+    assert response.status_code == 200
+    assert response.get_json()['success']
+
+
+def test_etag_depends_on_query(client):
+    summary = client.get(URL).get_etag()[0]
+    with_genes = client.get(URL + '?include_genes=1').get_etag()[0]
+    assert summary != with_genes
+    assert client.get(URL + '?include_genes=1',
+                      headers={'If-None-Match': f'"{summary}"'}).status_code == 200
+
+
+def test_unversioned_accession_has_no_etag(client):
+    response = client.get('/api/genome/SYN_HTTP')
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
+
+    response = client.get('/api/genome/SYN_HTTP', headers={'If-None-Match': '*'})
+    assert response.status_code == 200
+    response = client.get('/api/genome/SYN_HTTP', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_etag() == (None, None)
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.get('/api/jobs/no-existe', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 404
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert response.get_json()['success'] is False
@@ -0,0 +1,96 @@
+"""
+Pruebas del lease de la cola de trabajos (job_queue): un trabajo con una etapa más larga
+que el lease no se reasigna, un worker que perdió el trabajo no puede sobrescribirlo y un
+resultado que no se puede serializar marca el trabajo como fallido
+"""
+from contextlib import closing
+import threading
+import time
+
+from job_queue import DONE, FAILED, RUNNING, JobQueue
+
+
+LEASE_SECONDS = 0.3
+
+
+def wait_for(queue: JobQueue, job_id: str, status: str, timeout: float = 10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"el trabajo no llegó a '{status}': {queue.get(job_id)}")
+
+
+def test_long_stage_keeps_lease_and_runs_once(tmp_path):
+    runs = []
+    lock = threading.Lock()
+
+    def run(accession_id, progress):
+        with lock:
+            runs.append(threading.current_thread().name)
+        progress('download', 0.1)
+        # Una sola etapa que dura varias veces el lease, sin llamar a progress
+        time.sleep(LEASE_SECONDS * 5)
+        return {'accession': accession_id}
+
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    queues = [JobQueue(db_path, run, workers=2, lease_seconds=LEASE_SECONDS, max_attempts=1,
+                       poll_interval=0.02) for _ in range(2)]
+    for queue in queues:
+        queue.start()
+    try:
+        job_id = queues[0].submit('NC_045512.2')['job_id']
+        job = wait_for(queues[0], job_id, DONE)
+    finally:
+        for queue in queues:
+            queue.stop()
+
+    assert len(runs) == 1
+    assert job['result'] == {'accession': 'NC_045512.2'}
+    assert job['error'] is None
+
+
+def test_worker_that_lost_the_job_cannot_write(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def run(accession_id, progress):
+        started.set()
+        release.wait(10)
+        return {'stale': True}
+
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), run, workers=1,
+                     lease_seconds=LEASE_SECONDS, poll_interval=0.02)
+    queue.start()
+    try:
+        job_id = queue.submit('NC_045512.2')['job_id']
+        assert started.wait(10)
+        # Otro worker reclamó el trabajo (siguiente intento) mientras éste seguía en marcha
+        with closing(queue._connect()) as conn:
+            conn.execute("UPDATE jobs SET attempts = attempts + 1, stage = 'otro' WHERE id = ?",
+                         (job_id,))
+        release.set()
+        time.sleep(LEASE_SECONDS)
+    finally:
+        queue.stop()
+
+    job = queue.get(job_id)
+    assert job['status'] == RUNNING
+    assert job['stage'] == 'otro'
+    assert 'result' not in job
+
+
+def test_unserializable_result_fails_job(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lambda accession_id, progress: {'x': object()},
+                     workers=1, lease_seconds=LEASE_SECONDS, max_attempts=1, poll_interval=0.02)
+    queue.start()
+    try:
+        job_id = queue.submit('NC_045512.2')['job_id']
+        job = wait_for(queue, job_id, FAILED)
+    finally:
+        queue.stop()
+
+    assert 'not JSON serializable' in job['error']
+    assert 'result' not in job
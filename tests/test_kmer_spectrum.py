@@ -0,0 +1,91 @@
+"""
+Pruebas del conteo de k-mers a nivel de bits (kmer_spectrum) frente a un Counter sobre
+la secuencia como texto y su reverso complementario
+"""
+from collections import Counter
+import random
+
+import numpy as np
+import pytest
+
+from kmer_spectrum import (MAX_K, count_kmers, kmer_indices, kmer_string,
+                           reverse_complement_indices)
+from packed_sequence import PackedSequence
+from sequence_scanner import NUCLEOTIDE_ORDER, encode_sequence
+
+
+def random_sequence(length: int, seed: int, alphabet: str = 'ACGT') -> str:
+    rng = random.Random(seed)
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def reverse_complement(sequence: str) -> str:
+    return sequence.translate(str.maketrans('ACGT', 'TGCA'))[::-1]
+
+
+def counter_kmers(sequence: str, k: int) -> Counter:
+    """k-mers sin bases ambiguas de un texto en mayúsculas"""
+    return Counter(kmer for kmer in (sequence[i:i + k] for i in range(len(sequence) - k + 1))
+                   if set(kmer) <= set('ACGT'))
+
+
+def tcag_key(kmer: str):
+    """Orden de los índices de k-mer (TCAG), para elegir el canónico"""
+    return [NUCLEOTIDE_ORDER.index(base) for base in kmer]
+
+
+def reference_counts(sequence: str, k: int, strand: str, canonical: bool) -> dict:
+    sequence = sequence.upper()
+    forward = counter_kmers(sequence, k)
+    if canonical:
+        result = Counter()
+        for kmer, count in forward.items():
+            result[min(kmer, reverse_complement(kmer), key=tcag_key)] += count
+        return dict(result)
+    reverse = counter_kmers(reverse_complement(sequence), k)
+    return dict({'forward': forward, 'reverse': reverse, 'both': forward + reverse}[strand])
+
+
+def as_dict(keys: np.ndarray, counts: np.ndarray, k: int) -> dict:
+    assert np.all(np.diff(keys.astype(np.int64)) > 0)
+    assert np.all(counts > 0)
+    return {kmer_string(int(key), k): int(count) for key, count in zip(keys, counts)}
+
+
+SEQUENCE = (random_sequence(300, 1, 'ACGTacgt') + 'NNNN' + random_sequence(200, 2, 'ACGTRY')
+            + 'n' + random_sequence(150, 3) + 'N')
+CASES = [('forward', False), ('reverse', False), ('both', False), ('forward', True)]
+
+
+@pytest.mark.parametrize('chunk_size', (1, 5, 64, 4 * 1024 * 1024))
+@pytest.mark.parametrize('strand, canonical', CASES)
+@pytest.mark.parametrize('k', range(1, MAX_K + 1))
+def test_count_kmers_matches_counter(k, strand, canonical, chunk_size):
+    packed = PackedSequence.from_bytes(SEQUENCE)
+    keys, counts = count_kmers(packed, k, strand=strand, canonical=canonical,
+                               chunk_size=chunk_size)
+    assert as_dict(keys, counts, k) == reference_counts(SEQUENCE, k, strand, canonical)
+
+
+@pytest.mark.parametrize('sequence', ['', 'A', 'NNNN', 'ACGTNACGTN', 'acgtNNNNNNNNNNNNacgt'])
+@pytest.mark.parametrize('k', (1, 4, 11))
+def test_count_kmers_short_and_ambiguous_sequences(sequence, k):
+    keys, counts = count_kmers(PackedSequence.from_bytes(sequence), k, strand='both',
+                               chunk_size=3)
+    assert as_dict(keys, counts, k) == reference_counts(sequence, k, 'both', False)
+
+
+@pytest.mark.parametrize('k', range(1, MAX_K + 1))
+def test_reverse_complement_indices(k):
+    sequence = random_sequence(200, k)
+    indices = kmer_indices(encode_sequence(sequence), k)
+    reverse = reverse_complement_indices(indices, k)
+    assert [kmer_string(int(i), k) for i in reverse] == [
+        reverse_complement(sequence[i:i + k]) for i in range(len(sequence) - k + 1)]
+    assert np.array_equal(reverse_complement_indices(reverse, k), indices)
+
+
+@pytest.mark.parametrize('k, strand', [(0, 'forward'), (MAX_K + 1, 'forward'), (3, 'sense')])
+def test_count_kmers_rejects_invalid_params(k, strand):
+    with pytest.raises(ValueError):
+        count_kmers(PackedSequence.from_bytes('ACGT'), k, strand=strand)
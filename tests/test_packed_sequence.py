@@ -0,0 +1,149 @@
+"""
+Pruebas de la secuencia empaquetada a 2 bits (packed_sequence): ida y vuelta con tramos
+ambiguos en cualquier posición y el formato en disco PSEQ2BIT
+"""
+import os
+import random
+
+import numpy as np
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqUtils import gc_fraction
+
+import packed_sequence
+from packed_sequence import FILE_MAGIC, PackedSequence, PackedSequenceBuilder
+from sequence_scanner import encode_sequence
+
+
+def random_sequence(length: int, seed: int, alphabet: str = 'ACGT') -> str:
+    rng = random.Random(seed)
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+SEQUENCES = [
+    '',
+    'A',
+    'n',
+    'ACG',
+    'ACGT',
+    'ACGTA',
+    'NNNNACGTACGTNNNN',
+    'nnACGTRYacgtKMnn',
+    'N' * 9 + 'ACGT' * 5 + 'RRYY' + 'N' * 7,
+    # Tramos ambiguos en los bordes de los bloques de 8 bases (PACK_CHUNK_SIZE reducido)
+    'ACGTACGN' + 'NACGTACG' + 'ACGTACGT' + 'NNNNNNNN' + 'NNRACGTA' + 'SWSW',
+    random_sequence(2000, 1, 'ACGTacgtNNNNRYKMSWBDHVn'),
+    random_sequence(1000, 2) + 'N' * 100 + random_sequence(1001, 3, 'acgt') + 'R' * 3,
+]
+
+
+@pytest.fixture(params=(4 * 1024 * 1024, 8, 12), ids=('default', 'block8', 'block12'))
+def block_size(request, monkeypatch):
+    monkeypatch.setattr(packed_sequence, 'PACK_CHUNK_SIZE', request.param)
+    return request.param
+
+
+def windows(length: int, seed: int):
+    rng = random.Random(seed)
+    edges = [(0, length), (0, 0), (length, length), (0, 1), (max(length - 1, 0), length)]
+    edges += [(start, start + size) for start in range(0, length, 7) for size in (1, 3, 8)]
+    edges += sorted((rng.randint(0, length), rng.randint(0, length)) for _ in range(50))
+    return [(start, end) for start, end in edges if start <= end]
+
+
+@pytest.mark.parametrize('sequence', SEQUENCES)
+def test_round_trip(sequence, block_size):
+    packed = PackedSequence.from_bytes(sequence.encode('ascii'))
+    expected = sequence.upper().encode('ascii')
+    assert len(packed) == len(sequence)
+    assert packed[:] == expected
+    for start, end in windows(len(sequence), len(sequence)):
+        assert packed[start:end] == expected[start:end]
+        assert packed.codes(start, end).tolist() == encode_sequence(sequence[start:end]).tolist()
+    assert packed.codes().tolist() == encode_sequence(sequence).tolist()
+    if sequence:
+        assert packed[0] == expected[0]
+        assert packed[-1] == expected[-1]
+        assert packed[::3] == expected[::3]
+
+
+@pytest.mark.parametrize('sequence', SEQUENCES)
+def test_builder_with_uneven_parts(sequence, block_size):
+    # Las partes no caen en múltiplos de 4 ni del bloque: los tramos se cortan y se unen
+    rng = random.Random(len(sequence))
+    builder = PackedSequenceBuilder()
+    data = sequence.encode('ascii')
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, 11)
+        builder.write(data[position:position + size])
+        position += size
+    packed = builder.finish()
+    assert packed[:] == sequence.upper().encode('ascii')
+
+    # Tramos ordenados, sin solapes y sin dos contiguos de la misma letra
+    starts, ends, letters = packed.run_starts, packed.run_ends, packed.run_letters
+    assert np.all(starts < ends)
+    assert np.all(ends[:-1] <= starts[1:])
+    assert not np.any((ends[:-1] == starts[1:]) & (letters[:-1] == letters[1:]))
+
+
+@pytest.mark.parametrize('sequence', SEQUENCES)
+def test_gc_fraction_matches_biopython(sequence):
+    packed = PackedSequence.from_bytes(sequence)
+    assert packed.gc_fraction() == pytest.approx(gc_fraction(sequence.upper(), ambiguous='remove'))
+
+
+def test_biopython_seq_over_packed_data():
+    sequence = random_sequence(500, 4, 'ACGTN')
+    seq = Seq(PackedSequence.from_bytes(sequence))
+    assert str(seq) == sequence
+    assert str(seq[100:200].reverse_complement()) == str(Seq(sequence[100:200]).reverse_complement())
+
+
+@pytest.mark.parametrize('sequence', SEQUENCES)
+def test_save_and_mmap_load(tmp_path, sequence):
+    path = str(tmp_path / 'record.2bit')
+    PackedSequence.from_bytes(sequence).save(path)
+    loaded = PackedSequence.load(path)
+    assert loaded is not None
+    assert len(loaded) == len(sequence)
+    assert loaded[:] == sequence.upper().encode('ascii')
+    for start, end in windows(len(sequence), 5):
+        assert loaded.codes(start, end).tolist() == encode_sequence(sequence[start:end]).tolist()
+    if len(sequence) >= 4:
+        assert isinstance(loaded.packed, np.memmap)
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_load_discards_stale_copy(tmp_path):
+    source = tmp_path / 'record.gb.gz'
+    source.write_bytes(b'registro original')
+    path = str(tmp_path / 'record.2bit')
+    PackedSequence.from_bytes('ACGTNNACGT').save(path, source=str(source))
+    assert PackedSequence.load(path, source=str(source))[:] == b'ACGTNNACGT'
+
+    # El registro de origen se reemplaza (nueva descarga): la copia empaquetada ya no vale
+    replacement = tmp_path / 'record.gb.gz.tmp'
+    replacement.write_bytes(b'registro actualizado con otro contenido')
+    os.replace(replacement, source)
+    assert PackedSequence.load(path, source=str(source)) is None
+    # Sin origen no hay comprobación
+    assert PackedSequence.load(path) is not None
+
+
+def test_load_rejects_missing_or_damaged_files(tmp_path):
+    path = tmp_path / 'record.2bit'
+    assert PackedSequence.load(str(path)) is None
+
+    PackedSequence.from_bytes(random_sequence(100, 6, 'ACGTN')).save(str(path))
+    data = path.read_bytes()
+
+    path.write_bytes(data[:-1])
+    assert PackedSequence.load(str(path)) is None
+
+    path.write_bytes(b'X' * len(FILE_MAGIC) + data[len(FILE_MAGIC):])
+    assert PackedSequence.load(str(path)) is None
+
+    path.write_bytes(data[:10])
+    assert PackedSequence.load(str(path)) is None
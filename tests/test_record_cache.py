@@ -0,0 +1,153 @@
+"""
+Pruebas de la caché de registros GenBank (record_cache) con un sustituto local de Entrez
+"""
+from datetime import datetime
+import gzip
+import os
+import time
+
+import pytest
+
+from record_cache import RecordCache, locus_date
+
+
+def genbank_text(accession_id: str, date: str, body: str = '') -> str:
+    return (f"LOCUS       {accession_id.split('.')[0]}   30 bp    DNA     linear   BCT {date}\n"
+            f"ACCESSION   {accession_id.split('.')[0]}\nVERSION     {accession_id}\n"
+            f"ORIGIN\n        1 atgaaaccct gggtttaaac ccgggtttaa\n{body}//\n")
+
+
+class FakeEntrez:
+    """Sustituto de efetch/esummary: registros en memoria y llamadas contadas"""
+
+    def __init__(self, date: str = '18-JUL-2020', body: str = ''):
+        self.date = date
+        self.body = body
+        self.downloads = []
+        self.summaries = []
+        self.summary_error = None
+
+    def download(self, accession_id: str, destination):
+        self.downloads.append(accession_id)
+        destination.write(genbank_text(accession_id, self.date, self.body).encode('ascii'))
+
+    def update_date(self, accession_id: str):
+        self.summaries.append(accession_id)
+        if self.summary_error:
+            raise self.summary_error
+        return datetime.strptime(self.date.title(), '%d-%b-%Y')
+
+
+def read_record(path: str) -> str:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def expire(cache: RecordCache, accession_id: str):
+    """Lleva la última validación de una entrada más allá del TTL"""
+    path = cache.path_for(accession_id)
+    past = time.time() - cache.ttl_seconds - 60
+    os.utime(path, (past, past))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RecordCache(str(tmp_path / 'records'), ttl_seconds=3600)
+
+
+def test_miss_then_hit(cache):
+    entrez = FakeEntrez()
+    path = cache.fetch('NC_045512.2', entrez.download, entrez.update_date)
+    assert read_record(path) == genbank_text('NC_045512.2', entrez.date)
+
+    assert cache.fetch('NC_045512.2', entrez.download, entrez.update_date) == path
+    assert entrez.downloads == ['NC_045512.2']
+    assert entrez.summaries == []
+    stats = cache.get_stats()
+    assert (stats['misses'], stats['hits']) == (1, 1)
+
+
+def test_expired_entry_with_same_date_is_revalidated_without_download(cache):
+    entrez = FakeEntrez()
+    path = cache.fetch('NC_045512.2', entrez.download, entrez.update_date)
+    expire(cache, 'NC_045512.2')
+
+    assert cache.fetch('NC_045512.2', entrez.download, entrez.update_date) == path
+    assert entrez.downloads == ['NC_045512.2']
+    assert entrez.summaries == ['NC_045512.2']
+    # La revalidación renueva el TTL: la siguiente consulta no contacta con NCBI
+    assert time.time() - os.path.getmtime(path) < cache.ttl_seconds
+    cache.fetch('NC_045512.2', entrez.download, entrez.update_date)
+    assert entrez.summaries == ['NC_045512.2']
+    assert cache.get_stats()['revalidations'] == 1
+
+
+def test_expired_entry_with_new_date_is_downloaded_again(cache):
+    entrez = FakeEntrez()
+    cache.fetch('NC_045512.2', entrez.download, entrez.update_date)
+    expire(cache, 'NC_045512.2')
+
+    entrez.date = '02-FEB-2024'
+    path = cache.fetch('NC_045512.2', entrez.download, entrez.update_date)
+    assert entrez.downloads == ['NC_045512.2', 'NC_045512.2']
+    assert locus_date(read_record(path)) == datetime(2024, 2, 2)
+    assert cache.get_stats()['refreshes'] == 1
+
+
+def test_esummary_failure_serves_local_copy(cache):
+    entrez = FakeEntrez()
+    path = cache.fetch('NC_045512.2', entrez.download, entrez.update_date)
+    expire(cache, 'NC_045512.2')
+
+    entrez.summary_error = IOError('NCBI no disponible')
+    entrez.date = '02-FEB-2024'
+    assert cache.fetch('NC_045512.2', entrez.download, entrez.update_date) == path
+    assert entrez.downloads == ['NC_045512.2']
+    assert locus_date(read_record(path)) == datetime(2020, 7, 18)
+
+
+def test_expired_entry_without_update_date_is_downloaded_again(cache):
+    entrez = FakeEntrez()
+    cache.fetch('NC_045512.2', entrez.download)
+    expire(cache, 'NC_045512.2')
+    cache.fetch('NC_045512.2', entrez.download)
+    assert entrez.downloads == ['NC_045512.2', 'NC_045512.2']
+
+
+def test_failed_download_leaves_no_entry(cache):
+    def broken(accession_id, destination):
+        destination.write(b'LOCUS parcial')
+        raise IOError('conexión cortada')
+
+    with pytest.raises(IOError):
+        cache.fetch('NC_045512.2', broken)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_lru_eviction_under_max_bytes(tmp_path):
+    # Contenido aleatorio para que cada entrada ocupe lo mismo comprimida
+    entrez = FakeEntrez(body=os.urandom(3000).hex())
+    cache = RecordCache(str(tmp_path / 'records'), max_bytes=10 ** 9)
+    paths = {accession: cache.fetch(accession, entrez.download)
+             for accession in ('A_1.1', 'B_1.1', 'C_1.1')}
+    entry_size = max(os.path.getsize(path) for path in paths.values())
+
+    # Último acceso: B hace más tiempo, luego A, luego C
+    now = time.time()
+    for accession, age in (('A_1.1', 200), ('B_1.1', 300), ('C_1.1', 100)):
+        os.utime(paths[accession], (now - age, os.path.getmtime(paths[accession])))
+
+    cache.max_bytes = 3 * entry_size
+    path_d = cache.fetch('D_1.1', entrez.download)
+    remaining = sorted(os.listdir(cache.cache_dir))
+    assert remaining == sorted(os.path.basename(p) for p in
+                               (paths['A_1.1'], paths['C_1.1'], path_d))
+    assert cache.get_stats()['evictions'] == 1
+
+    # Un acceso renueva la entrada: ahora A es la más reciente y C la siguiente en salir
+    cache.fetch('A_1.1', entrez.download)
+    os.utime(paths['C_1.1'], (now - 1000, os.path.getmtime(paths['C_1.1'])))
+    cache.fetch('E_1.1', entrez.download)
+    assert not os.path.exists(paths['C_1.1'])
+    assert os.path.exists(paths['A_1.1'])
+    assert entrez.downloads.count('A_1.1') == 1
@@ -0,0 +1,45 @@
+"""
+Pruebas del nivel en disco de ResultCache: un valor que no se puede guardar no rompe put()
+ni deja archivos temporales
+"""
+import logging
+import os
+
+import pytest
+
+from result_cache import ResultCache
+
+
+def circular():
+    value = {'a': 1}
+    value['self'] = value
+    return value
+
+
+def test_disk_round_trip(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put('k', {'gc': 50.5, 'genes': [1, 2]})
+    assert ResultCache(disk_dir=str(tmp_path)).get('k') == {'gc': 50.5, 'genes': [1, 2]}
+
+
+@pytest.mark.parametrize('make_value', [lambda: {'x': object()}, circular, lambda: {(1, 2): 'x'}])
+def test_unserializable_value_stays_in_memory(tmp_path, caplog, make_value):
+    cache = ResultCache(disk_dir=str(tmp_path), name='prueba')
+    value = make_value()
+    with caplog.at_level(logging.WARNING, logger='genome.cache'):
+        cache.put('k', value)
+
+    assert cache.get('k') is value
+    assert os.listdir(tmp_path) == []
+    assert ResultCache(disk_dir=str(tmp_path)).get('k') is None
+    assert 'prueba' in caplog.text and 'k' in caplog.text
+
+
+def test_write_error_is_logged(tmp_path, caplog):
+    cache = ResultCache(disk_dir=str(tmp_path / 'results'))
+    # El directorio desaparece: la escritura del temporal falla con OSError
+    os.rmdir(tmp_path / 'results')
+    with caplog.at_level(logging.WARNING, logger='genome.cache'):
+        cache.put('k', {'gc': 1})
+
+    assert cache.get('k') == {'gc': 1}
+    assert 'no se pudo guardar' in caplog.text
@@ -0,0 +1,183 @@
+"""
+Pruebas del motor de escaneo vectorizado (sequence_scanner) frente a las implementaciones
+de referencia recorriendo la secuencia posición a posición
+"""
+import random
+
+import numpy as np
+import pytest
+
+from packed_sequence import PackedSequence
+from genetic_codes import STOP_CODONS
+from sequence_scanner import encode_sequence, find_codon_positions, find_orfs
+
+
+SCAN_CODONS = ('ATG', 'TAA', 'TAG', 'TGA')
+CHUNK_SIZES = (1, 2, 3, 7, 64, 4 * 1024 * 1024)
+
+
+def scan_per_position(sequence: str):
+    """Barrido original de análisis de codones: una comparación por posición"""
+    sequence_upper = sequence.upper()
+    positions = {codon: [] for codon in SCAN_CODONS}
+    for i in range(len(sequence_upper) - 2):
+        codon = sequence_upper[i:i + 3]
+        if codon in positions:
+            positions[codon].append(i)
+    return positions
+
+
+def random_sequence(length: int, seed: int, alphabet: str = 'ACGT') -> str:
+    rng = random.Random(seed)
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+FIXED_SEQUENCES = [
+    '',
+    'A',
+    'AT',
+    'ATG',
+    'ATGTAATAGTGA',
+    'atgtaatagtga',
+    'AtGtAaTaGtGa',
+    'NNNATGNNNTAANTAGNTGANNN',
+    'ATNGTAARTAGYTGAATG',
+    'ATGRYSWKMBDHVN' * 3 + 'TGATAG',
+    'ATGATGATGTAATAATAG',
+    # Mezcla de bases válidas, minúsculas, N y códigos IUPAC
+    random_sequence(5000, 1, 'ACGTacgtNRYK'),
+    random_sequence(5000, 2, 'ACGT') + 'N' * 50 + random_sequence(5000, 3, 'acgt'),
+]
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('sequence', FIXED_SEQUENCES)
+def test_codon_positions_match_per_position_scan(sequence, chunk_size):
+    expected = scan_per_position(sequence)
+    found = find_codon_positions(sequence, SCAN_CODONS, chunk_size=chunk_size)
+    for codon in SCAN_CODONS:
+        assert found[codon].tolist() == expected[codon], codon
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_codon_positions_accept_bytes_and_codes(chunk_size):
+    sequence = random_sequence(3000, 4, 'ACGTNacgtn')
+    expected = scan_per_position(sequence)
+    for source in (sequence.encode('ascii'), encode_sequence(sequence)):
+        found = find_codon_positions(source, SCAN_CODONS, chunk_size=chunk_size)
+        for codon in SCAN_CODONS:
+            assert found[codon].tolist() == expected[codon], codon
+
+
+def test_codon_positions_are_sorted_integers():
+    found = find_codon_positions(random_sequence(2000, 5), SCAN_CODONS, chunk_size=13)
+    for positions in found.values():
+        assert np.issubdtype(positions.dtype, np.integer)
+        assert np.all(np.diff(positions) > 0)
+
+
+def reverse_complement(sequence: str) -> str:
+    return sequence.upper().translate(str.maketrans('ACGT', 'TGCA'))[::-1]
+
+
+def orfs_per_frame(sequence: str, min_length: int, stop_codons=STOP_CODONS[1]):
+    """
+    ORFs de una hebra recorriendo cada fase codón a codón: cada STOP cierra el ORF que
+    empieza en el primer ATG posterior al STOP anterior de la misma fase
+
+    Returns:
+        Lista de (posición del ATG, posición del STOP)
+    """
+    sequence = sequence.upper()
+    orfs = []
+    for frame in range(3):
+        open_start = None
+        for i in range(frame, len(sequence) - 2, 3):
+            codon = sequence[i:i + 3]
+            if codon in stop_codons:
+                if open_start is not None and i - open_start >= min_length:
+                    orfs.append((open_start, i))
+                open_start = None
+            elif codon == 'ATG' and open_start is None:
+                open_start = i
+    return orfs
+
+
+def six_frame_reference(sequence: str, min_length: int, stop_codons=STOP_CODONS[1]):
+    """(start, end, strand, frame, length) de cada ORF, en coordenadas de la hebra directa"""
+    length = len(sequence)
+    orfs = [(start, stop + 3, 1, start % 3, stop - start)
+            for start, stop in orfs_per_frame(sequence, min_length, stop_codons)]
+    orfs += [(length - (stop + 3), length - start, -1, start % 3, stop - start)
+             for start, stop in orfs_per_frame(reverse_complement(sequence), min_length,
+                                               stop_codons)]
+    return sorted(orfs)
+
+
+def as_tuples(orfs):
+    return sorted(zip(*(orfs[key].tolist()
+                        for key in ('start', 'end', 'strand', 'frame', 'length'))))
+
+
+# Ventanas de 1, 2, 3 y 7 bases: casi todos los ORFs empiezan en una ventana y acaban en otra
+ORF_CHUNK_SIZES = (1, 2, 3, 7, 4 * 1024 * 1024)
+
+
+def orf_sequences():
+    sequences = [random_sequence(length, seed) for seed, length in
+                 enumerate((0, 2, 3, 5, 60, 301, 1000, 2003), start=10)]
+    # Genes largos incrustados para tener ORFs por encima del mínimo en ambas hebras
+    rng = random.Random(20)
+    for seed in range(21, 25):
+        body = ''.join(rng.choice(['GCT', 'CGA', 'AAA', 'TTC', 'GGG', 'CAT'])
+                       for _ in range(rng.randint(40, 120)))
+        gene = 'ATG' + body + rng.choice(STOP_CODONS[1])
+        if seed % 2:
+            gene = reverse_complement(gene)
+        sequences.append(random_sequence(500, seed) + gene + random_sequence(500, seed + 100))
+    sequences.append(random_sequence(1500, 30, 'ACGTNacgtR'))
+    return sequences
+
+
+@pytest.mark.parametrize('chunk_size', ORF_CHUNK_SIZES)
+@pytest.mark.parametrize('min_length', (0, 30, 100))
+@pytest.mark.parametrize('packed', (False, True), ids=('str', 'packed'))
+def test_find_orfs_matches_six_frame_reference(chunk_size, min_length, packed):
+    for sequence in orf_sequences():
+        source = PackedSequence.from_bytes(sequence) if packed else sequence
+        found = find_orfs(source, min_length=min_length, chunk_size=chunk_size)
+        assert as_tuples(found) == six_frame_reference(sequence, min_length)
+        assert np.all(np.diff(found['start']) >= 0)
+
+
+@pytest.mark.parametrize('chunk_size', ORF_CHUNK_SIZES)
+def test_find_orfs_keeps_first_start_across_windows(chunk_size):
+    # El primer ATG queda en la primera ventana y el STOP muchas ventanas después;
+    # los ATG internos de la misma fase no abren ORFs anidados
+    sequence = 'CC' + 'ATG' + 'GCC' * 5 + 'ATG' + 'GCC' * 5 + 'TAA' + 'CC'
+    found = find_orfs(sequence, min_length=0, chunk_size=chunk_size)
+    forward = [orf for orf in as_tuples(found) if orf[2] == 1]
+    assert forward == [(2, 2 + 3 * 13, 1, 2, 3 * 12)]
+
+
+@pytest.mark.parametrize('chunk_size', ORF_CHUNK_SIZES)
+def test_find_orfs_reverse_strand_coordinates(chunk_size):
+    gene = 'ATG' + 'GCT' * 40 + 'TGA'
+    sequence = 'GG' + reverse_complement(gene) + 'CCCC'
+    found = find_orfs(sequence, min_length=100, chunk_size=chunk_size)
+    assert as_tuples(found) == [(2, 2 + len(gene), -1, 1, len(gene) - 3)]
+    assert sequence[2:2 + len(gene)] == reverse_complement(gene)
+
+
+@pytest.mark.parametrize('chunk_size', ORF_CHUNK_SIZES)
+@pytest.mark.parametrize('table', (1, 2, 4, 11))
+def test_find_orfs_uses_table_stop_codons(chunk_size, table):
+    # Tabla 4 (Mycoplasma): TGA codifica triptófano; tabla 2: AGA y AGG son STOP
+    sequence = random_sequence(3000, 40)
+    found = find_orfs(sequence, min_length=30, table=table, chunk_size=chunk_size)
+    assert as_tuples(found) == six_frame_reference(sequence, 30, STOP_CODONS[table])
+
+
+def test_find_orfs_rejects_unknown_table():
+    with pytest.raises(ValueError):
+        find_orfs('ATGAAATAA', table=99)